@@ -12,7 +12,7 @@ from pandas import DataFrame
 
 from lib import logger
 from lib.strace import manager
-from lib.strace.classes import ParameterMapping, RestoreCheckpoint, Strace
+from lib.strace.classes import ParameterMapping, Strace
 from lib.strace.comparison.preprocessing import (
     AnsibleStripLastWrite,
     GenerateSyntheticValues,
@@ -42,7 +42,6 @@ preprocessors = [
 ]
 
 
-@RestoreCheckpoint()
 def run(collector: str = PARAMETER_MATCHING) -> Tuple[
             DataFrame,
             List[Tuple[Strace, Strace, ParameterMapping]]
@@ -71,6 +70,9 @@ def run(collector: str = PARAMETER_MATCHING) -> Tuple[
     logger.info('Loading traces.')
     all_traces = manager.traces(where=t_straces.c.collector == collector)
 
+    # Preprocess snapshots of the loaded traces.
+    all_traces = manager.snapshots(all_traces)[0]
+
     # Preprocess
     logger.info('Performing global preprocessing')
     for trace in all_traces:
@@ -18,7 +18,7 @@ from lib.experiments.dockerfile_top_100.data import (
     SYSTEM as DOCKERFILE_SYSTEM,
 )
 from lib.strace import manager, search
-from lib.strace.classes import MigrationResult, RestoreCheckpoint, Strace
+from lib.strace.classes import MigrationResult, Strace
 from lib.strace.collection.ansible_playbook import (
     COLLECTOR_NAME as ANSIBLE_PLAYBOOK_COLLECTOR
 )
@@ -56,7 +56,6 @@ preprocessors = (
 )
 
 
-@RestoreCheckpoint()
 def run(server: int = 1,
         of: int = 1,
         baseline: bool = False) -> List[Tuple[Strace, List[ScoringResult]]]:
@@ -156,6 +155,12 @@ def run(server: int = 1,
     )
     logger.info(f'{len(dockerfile_traces)} dockerfile traces loaded.')
 
+    # Preprocess snapshots of the loaded traces. Traces are binned and
+    # filtered first, which does not deserialize them.
+    traces, ansible_traces, dockerfile_traces = manager.snapshots(
+        traces, ansible_traces, dockerfile_traces
+    )
+
     # Preprocess if not baseline.
     if not baseline:
         logger.info('Preprocessing...')
@@ -2,28 +2,32 @@
 
 
 # Imports
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
-from itertools import chain, groupby
+from itertools import chain, groupby, islice
 from typing import (
     Any, Callable, Dict, Iterable, List, Optional, Set, Sequence, Union
 )
 import json
-import pickle
 import shutil
 
-from sqlalchemy.sql import and_, cast, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import and_, func, select, tuple_
 from sqlalchemy.sql.functions import count
-from sqlalchemy.types import JSON
 
-from lib import logger
-from lib.strace import parser, util
+from lib import logger, mysql_engine
+from lib.strace import parser, serialization, util
 from lib.strace.classes import (
     Strace, Syscall, StringLiteral
 )
-from lib.strace.classes import StraceJSONEncoder, from_object
+from lib.strace.classes import (
+    FlyweightStore, StraceJSONEncoder, from_object
+)
 from lib.strace.collection import (
     ansible_playbook, argument_holes, parameter_matching, untraced
 )
+from lib.strace.collection import run_ingest_job, with_text
 from lib.strace.paths import (
     COMPUTED,
     STRACE,
@@ -42,12 +46,20 @@ StraceDict = Dict[Any, Union['StraceDict', List[Strace], Strace]]
 StraceKeys = Sequence[Union[str, Callable[[Strace], Any]]]
 
 
+# Constants
+# Straces added to the database per transaction, and the maximum size of the
+# values in a single insert statement, which must stay below the server's
+# max_allowed_packet.
+INGEST_BATCH_SIZE = 100
+INSERT_MAX_BYTES = 2 ** 24
+
+
 # Collector Parsers
 COLLECTORS = {
-    'debops': ansible_playbook.parse_debops,
-    'argument_holes': argument_holes.parse,
-    'parameter_matching': parameter_matching.parse,
-    'untraced': untraced.parse
+    'debops': ansible_playbook.parse_debops_jobs,
+    'argument_holes': argument_holes.parse_jobs,
+    'parameter_matching': parameter_matching.parse_jobs,
+    'untraced': untraced.parse_jobs
 }
 
 
@@ -62,16 +74,29 @@ class _Manager:
     unless the trace files present on the system change at runtime. If the
     this happens, and the manager needs the updated state, call
     manager.reset_cache().
+
+    If the manager is created with ``flyweights=True``, deserialized traces
+    share identical tracelines through a flyweight store. This saves memory
+    when many traces are loaded, but shared tracelines must not be modified
+    in place, see ``FlyweightStore``.
     """
 
-    def __init__(self):
-        """Initialize an strace manager."""
+    def __init__(self, flyweights: bool = False):
+        """Initialize an strace manager.
+
+        Parameters
+        ----------
+        flyweights : bool
+            Whether deserialized traces share identical tracelines. Only
+            enable this for code that does not modify tracelines in place.
+        """
         self._traces = {}
         self._holes = None
+        self._flyweights = FlyweightStore() if flyweights else None
 
     def reset_cache(self):
         """Reset the manager strace cache."""
-        self.__init__()
+        self.__init__(flyweights=self._flyweights is not None)
 
     def clean(self, raw: bool = None, parsed: bool = None):
         """Clean strace data.
@@ -120,19 +145,72 @@ class _Manager:
                 self._holes[hole.syscall].add(hole.index)
         return self._holes
 
-    def trace_argument_holes(self):
-        """Generate straces for argument holes."""
-        argument_holes.collect()
+    def trace_argument_holes(self, compression: Optional[str] = None):
+        """Generate straces for argument holes.
 
-    def trace_debops(self):
-        """Generate debops traces."""
-        ansible_playbook.collect_debops()
+        Parameters
+        ----------
+        compression : Optional[str]
+            Trace file compression format, ``gzip`` or ``xz``.
+        """
+        argument_holes.collect(compression=compression)
+
+    def trace_debops(self,
+                     output_dir: str = 'debops',
+                     live: bool = False,
+                     parse_options: Optional[Dict[str, Any]] = None,
+                     compression: Optional[str] = None):
+        """Generate debops traces.
 
-    def trace_parameter_matching(self):
-        """Generate straces for parameter matching."""
-        parameter_matching.collect()
+        Parameters
+        ----------
+        output_dir : str
+            Collection output directory.
+        live : bool
+            If true, parse each module trace while it is being collected and
+            add it to the database as soon as the module exits.
+        parse_options : Optional[Dict[str, Any]]
+            Parser ``engine`` and ``recover`` options for live parsing.
+        compression : Optional[str]
+            Trace file compression format, ``gzip`` or ``xz``. Not supported
+            for live parsing.
+
+        Raises
+        ------
+        ValueError
+            Raised if compression is requested for live parsing.
+        """
+        if not live:
+            ansible_playbook.collect_debops(
+                output_dir=output_dir,
+                compression=compression,
+            )
+            return
+        if compression:
+            raise ValueError('Live traces cannot be compressed.')
 
-    def trace_untraced(self, subset: Optional[list] = None):
+        self.reset_cache()
+        self._add_straces(
+            ansible_playbook.collect_debops_live(
+                output_dir=output_dir,
+                parse_options=parse_options,
+            ),
+            batch_size=1,
+        )
+
+    def trace_parameter_matching(self, compression: Optional[str] = None):
+        """Generate straces for parameter matching.
+
+        Parameters
+        ----------
+        compression : Optional[str]
+            Trace file compression format, ``gzip`` or ``xz``.
+        """
+        parameter_matching.collect(compression=compression)
+
+    def trace_untraced(self,
+                       subset: Optional[list] = None,
+                       compression: Optional[str] = None):
         """Generate straces for untraced executables.
 
         Parameters
@@ -141,23 +219,34 @@ class _Manager:
             List of executable definitions. Each object must have `system`,
             `executable`, and `arguments` attributes. If provided, untraced
             executables must also appear in this list.
+        compression : Optional[str]
+            Trace file compression format, ``gzip`` or ``xz``.
         """
-        untraced.collect(subset=subset)
+        untraced.collect(subset=subset, compression=compression)
+
+    def generate_traces(self, compression: Optional[str] = None):
+        """Generate all traces.
 
-    def generate_traces(self):
-        """Generate all traces."""
-        self.trace_argument_holes()
-        self.trace_parameter_matching()
-        self.trace_debops()
-        self.trace_untraced()
+        Parameters
+        ----------
+        compression : Optional[str]
+            Trace file compression format, ``gzip`` or ``xz``.
+        """
+        self.trace_argument_holes(compression=compression)
+        self.trace_parameter_matching(compression=compression)
+        self.trace_debops(compression=compression)
+        self.trace_untraced(compression=compression)
 
     def traces(self, where: Optional = None) -> List[Strace]:
         """Load trace definitions.
 
-        By default, this method deserializes and caches all known straces.
-        Caching is performed by saving the strace ``id`` from the database.
-        Because of caching, traces will only be deserialized once. Call
-        ``self.reset_cache`` if traces need to be reloaded.
+        By default, this method loads and caches all known straces. Straces
+        are loaded as ``LazyStrace`` objects, which are only deserialized when
+        their tracelines are first accessed, so filtering and binning by
+        executable does not deserialize any. Caching is performed by saving
+        the strace ``id`` from the database. Because of caching, traces will
+        only be deserialized once. Call ``self.reset_cache`` if traces need
+        to be reloaded.
 
         Parameters
         ----------
@@ -196,14 +285,16 @@ class _Manager:
         # Execute the query
         res = query.execute()
 
-        # Deserialize traces
+        # Load traces. Deserialization is deferred until tracelines are used.
         for trace in res:
             logger.info(
-                f'Deserializing trace ({trace.collector}, {trace.system}, '
+                f'Loading trace ({trace.collector}, {trace.system}, '
                 f'{trace.executable}, {trace.arguments}, '
                 f'{trace.collector_assigned_id})'
             )
-            self._traces[trace.id] = from_object(trace)
+            self._traces[trace.id] = from_object(
+                trace, self._flyweights, lazy=True
+            )
 
         # Return the requested traces
         if where is not None:
@@ -223,6 +314,35 @@ class _Manager:
         else:
             return list(self._traces.values())
 
+    def snapshots(self, *trace_lists: Iterable[Strace]) -> List[List[Strace]]:
+        """Create snapshots of loaded traces for preprocessing.
+
+        Loaded traces are cached by the manager, so code that preprocesses
+        them must preprocess snapshots instead, see ``Strace.snapshot``. A
+        strace that is in several lists is replaced by the same snapshot in
+        each of them.
+
+        Parameters
+        ----------
+        *trace_lists : Iterable[Strace]
+            Lists of traces.
+
+        Returns
+        -------
+        List[List[Strace]]
+            Snapshot lists, in the order of ``trace_lists``.
+        """
+        snapshots = {}
+        result = []
+        for traces in trace_lists:
+            trace_snapshots = []
+            for trace in traces:
+                if id(trace) not in snapshots:
+                    snapshots[id(trace)] = trace.snapshot()
+                trace_snapshots.append(snapshots[id(trace)])
+            result.append(trace_snapshots)
+        return result
+
     def traces_by(self,
                   keys: StraceKeys = (),
                   sort_keys: StraceKeys = (),
@@ -334,7 +454,9 @@ class _Manager:
         return strace_bins['root']
 
     def parse(self, collectors: Set[str] = frozenset(COLLECTORS),
-              start_at: Optional[Dict[str, str]] = None):
+              start_at: Optional[Dict[str, str]] = None,
+              parse_options: Optional[Dict[str, Any]] = None,
+              jobs: int = 1):
         """Parse available traces.
 
         This method will reset the manager, since the serialized traces are
@@ -347,12 +469,20 @@ class _Manager:
         start_at : Optional[Dict[str, str]]
             Optional starting positions for parsing keyed by collector. Can
             be used to resume parsing.
+        parse_options : Optional[Dict[str, Any]]
+            Optional keyword arguments passed to ``parser.parse`` for every
+            trace, such as the parser ``engine``.
+        jobs : int
+            Number of processes used for parsing. Traces are always added to
+            the database by this process, in collector order.
         """
         self.reset_cache()
-        self._parse(collectors, start_at)
+        self._parse(collectors, start_at, parse_options, jobs)
 
     def _parse(self, collectors: Set[str] = frozenset(COLLECTORS),
-               start_at: Optional[Dict[str, str]] = None):
+               start_at: Optional[Dict[str, str]] = None,
+               parse_options: Optional[Dict[str, Any]] = None,
+               jobs: int = 1):
         """Parse all available traces.
 
         Parameters
@@ -362,6 +492,10 @@ class _Manager:
         start_at : Optional[Dict[str, str]]
             Optional starting positions for parsing keyed by collector. Can
             be used to resume parsing.
+        parse_options : Optional[Dict[str, Any]]
+            Optional keyword arguments passed to ``parser.parse``.
+        jobs : int
+            Number of processes used for parsing.
         """
         # Normalize names
         collectors = set(c.replace('-', '_') for c in collectors)
@@ -370,23 +504,47 @@ class _Manager:
         if start_at is None:
             start_at = {}
 
-        # Iterator for all parsed traces
-        traces = chain.from_iterable(
-            collector_parser(start_at=start_at.get(collector, None))
-            for collector, collector_parser in COLLECTORS.items()
+        # Iterator for all parse jobs
+        parse_jobs = chain.from_iterable(
+            collector_jobs(start_at=start_at.get(collector, None))
+            for collector, collector_jobs in COLLECTORS.items()
             if collector in collectors
         )
+        run_job = partial(run_ingest_job, parse_options=parse_options)
+
+        # Parse in this process
+        if jobs <= 1:
+            self._add_straces(map(with_text, map(run_job, parse_jobs)))
+            return
+
+        # Parse in a process pool. Results are returned in job order and
+        # only this process writes to the database.
+        logger.info(f'Parsing with {jobs} processes.')
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            self._add_straces(map(
+                with_text,
+                util.ordered_imap(executor, run_job, parse_jobs, 2 * jobs)
+            ))
 
-        # Add to database
-        for strace in traces:
-
-            # Normalize the trace. The collector should normalize its straces
-            # when it parses them, but normalizing an already normalized strace
-            # is a noop, so it doesn't hurt us to check.
-            strace = strace.normalize()
+    def _add_straces(self,
+                     traces: Iterable[Strace],
+                     batch_size: int = INGEST_BATCH_SIZE):
+        """Add parsed straces to the database.
 
-            # Add the trace to the database
-            self.idempotent_add_strace(strace)
+        Parameters
+        ----------
+        traces : Iterable[Strace]
+            Parsed straces.
+        batch_size : int
+            Number of straces added per transaction.
+        """
+        # Normalize the traces. The collector should normalize its straces
+        # when it parses them, but normalizing an already normalized strace
+        # is a noop, so it doesn't hurt us to check.
+        self.add_straces(
+            (strace.normalize() for strace in traces),
+            batch_size=batch_size,
+        )
 
     def find_holes(self):
         """Find all syscall argument holes."""
@@ -457,45 +615,8 @@ class _Manager:
         int
             Executable id.
         """
-        # Get sha1 hash for arguments
-        arguments_sha1 = strace.arguments_hash
-
-        # Executable query
-        q_executable = t_executables.select().where(and_(
-            t_executables.c.system == strace.system,
-            t_executables.c.executable == strace.executable,
-            t_executables.c.arguments_hash == arguments_sha1,
-            t_executables.c.arguments == cast(
-                strace.arguments, JSON
-            ),
-        ))
-
-        # Query for an existing executable
-        executable = q_executable.execute().first()
-
-        # Return the executable id if it already exists
-        if executable:
-            return executable.id
-
-        logger.info(
-            f'Adding executable ({strace.system}, '
-            f'{strace.executable}, {strace.arguments}) to the '
-            f'database'
-        )
-
-        # Create the executable if it does not exist.
-        insert = (
-            t_executables.insert({
-                'system': strace.system,
-                'executable': strace.executable,
-                'arguments_hash': arguments_sha1,
-                'arguments': strace.arguments,
-            })
-            .execute()
-        )
-
-        # Return executable id
-        return insert.inserted_primary_key
+        with mysql_engine.begin() as connection:
+            return self._add_executables(connection, [strace])[0]
 
     def idempotent_add_strace(self, strace: Strace) -> int:
         """Ensure an strace is stored by the manager.
@@ -510,57 +631,290 @@ class _Manager:
         int
             Strace id.
         """
-        # Add executable if it does not already exist
-        # Get executable id
-        executable_id = self.idempotent_add_executable(strace)
-
-        # Query for existing strace
-        existing_strace = (
-            t_straces.select().where(and_(
-                t_straces.c.collector == strace.collector,
-                t_straces.c.collector_assigned_id
-                == strace.collector_assigned_id,
-            ))
-            .execute()
-            .first()
-        )
+        return self.add_straces([strace])[0]
 
-        # If the strace exists, validate it belongs to the correct executable
-        if existing_strace:
-            if existing_strace.executable != executable_id:
-                raise Exception(
-                    f'An strace with the key ({strace.collector}, '
-                    f'{strace.collector_assigned_id}) already exists and '
-                    f'has a different executable.'
+    def add_straces(self,
+                    straces: Iterable[Strace],
+                    batch_size: int = INGEST_BATCH_SIZE) -> List[int]:
+        """Ensure straces are stored by the manager.
+
+        Straces are added in batches. Each batch is added in one transaction
+        with a constant number of queries, so a batch is either added
+        completely or not at all. Straces that are already stored are not
+        added again.
+
+        Parameters
+        ----------
+        straces : Iterable[Strace]
+            Strace objects.
+        batch_size : int
+            Number of straces added per transaction.
+
+        Raises
+        ------
+        Exception
+            Raised if an strace with the same collector key is already
+            stored for a different executable.
+
+        Returns
+        -------
+        List[int]
+            Strace ids, in the order of ``straces``.
+        """
+        ids = []
+        straces = iter(straces)
+        while True:
+            batch = list(islice(straces, batch_size))
+            if not batch:
+                return ids
+            with mysql_engine.begin() as connection:
+                ids += self._add_strace_batch(connection, batch)
+
+    def _add_executables(self,
+                         connection: Connection,
+                         straces: List[Strace]) -> List[int]:
+        """Ensure the executables of straces are stored.
+
+        Executables are looked up by their arguments hash in one query, and
+        the missing ones are inserted in one statement.
+
+        Parameters
+        ----------
+        connection : Connection
+            Database connection of the current transaction.
+        straces : List[Strace]
+            Strace objects.
+
+        Returns
+        -------
+        List[int]
+            Executable id of each strace.
+        """
+        def _key(system, executable, arguments):
+            return (
+                system, executable, json.dumps(arguments, sort_keys=True)
+            )
+
+        def _query(hashes):
+            return {
+                _key(row.system, row.executable, row.arguments): row.id
+                for row in connection.execute(
+                    select([
+                        t_executables.c.id,
+                        t_executables.c.system,
+                        t_executables.c.executable,
+                        t_executables.c.arguments,
+                    ])
+                    .where(t_executables.c.arguments_hash.in_(hashes))
+                )
+            }
+
+        # Query for existing executables
+        keys = [
+            _key(strace.system, strace.executable, strace.arguments)
+            for strace in straces
+        ]
+        executable_ids = _query({strace.arguments_hash for strace in straces})
+
+        # Create the executables that do not exist
+        missing = {
+            key: strace
+            for key, strace in zip(keys, straces)
+            if key not in executable_ids
+        }
+        if missing:
+            for strace in missing.values():
+                logger.info(
+                    f'Adding executable ({strace.system}, '
+                    f'{strace.executable}, {strace.arguments}) to the '
+                    f'database'
                 )
-            logger.info(f'Existing strace found with id {existing_strace.id}')
-            return existing_strace.id
+            connection.execute(t_executables.insert().values([
+                {
+                    'system': strace.system,
+                    'executable': strace.executable,
+                    'arguments_hash': strace.arguments_hash,
+                    'arguments': strace.arguments,
+                }
+                for strace in missing.values()
+            ]))
+            executable_ids.update(_query({
+                strace.arguments_hash for strace in missing.values()
+            }))
 
-        logger.info(
-            f'Adding strace ({strace.collector}, '
-            f'{strace.collector_assigned_id}) to strace database'
-        )
+        return [executable_ids[key] for key in keys]
 
-        # Get original strace text
-        with open(strace.strace_file, 'r') as fd:
-            strace_text = fd.read()
+    def _add_strace_batch(self,
+                          connection: Connection,
+                          straces: List[Strace]) -> List[int]:
+        """Ensure a batch of straces is stored.
 
-        # Create new strace
-        insert = (
-            t_straces.insert({
+        Parameters
+        ----------
+        connection : Connection
+            Database connection of the current transaction.
+        straces : List[Strace]
+            Strace objects.
+
+        Raises
+        ------
+        Exception
+            Raised if an strace with the same collector key is already
+            stored for a different executable.
+
+        Returns
+        -------
+        List[int]
+            Strace ids, in the order of ``straces``.
+        """
+        def _query(keys):
+            return {
+                (row.collector, row.collector_assigned_id): row
+                for row in connection.execute(
+                    select([
+                        t_straces.c.id,
+                        t_straces.c.executable,
+                        t_straces.c.collector,
+                        t_straces.c.collector_assigned_id,
+                    ])
+                    .where(tuple_(
+                        t_straces.c.collector,
+                        t_straces.c.collector_assigned_id,
+                    ).in_(keys))
+                )
+            }
+
+        # Add executables if they do not already exist
+        executable_ids = self._add_executables(connection, straces)
+
+        # Query for existing straces
+        keys = [
+            (strace.collector, strace.collector_assigned_id)
+            for strace in straces
+        ]
+        existing = _query(set(keys))
+        for key, row in existing.items():
+            logger.info(f'Existing strace found with id {row.id}')
+
+        # Create new straces. Each strace is only serialized if it is new.
+        rows = {}
+        for key, strace, executable_id in zip(keys, straces, executable_ids):
+            if key in existing or key in rows:
+                continue
+            logger.info(
+                f'Adding strace ({strace.collector}, '
+                f'{strace.collector_assigned_id}) to strace database'
+            )
+            rows[key] = {
                 'executable': executable_id,
                 'collector': strace.collector,
                 'collector_assigned_id': strace.collector_assigned_id,
-                'strace': strace_text,
+                'strace': self._strace_text(strace),
                 'metadata': strace.metadata,
                 'json': json.loads(json.dumps(strace, cls=StraceJSONEncoder)),
-                'pickle': pickle.dumps(strace)
-            })
-            .execute()
-        )
+                'pickle': serialization.dumps(strace)
+            }
+        for values in self._insert_batches(rows.values()):
+            statement = insert(t_straces).values(values)
+            connection.execute(
+                statement.on_duplicate_key_update(id=t_straces.c.id)
+            )
+        if rows:
+            existing.update(_query(set(rows)))
 
-        # Return primary key
-        return insert.inserted_primary_key
+        # Validate that the straces belong to the correct executables
+        for key, executable_id in zip(keys, executable_ids):
+            if existing[key].executable != executable_id:
+                raise Exception(
+                    f'An strace with the key {key} already exists and has '
+                    f'a different executable.'
+                )
+
+        return [existing[key].id for key in keys]
+
+    @staticmethod
+    def _strace_text(strace: Strace) -> str:
+        """Get the original text of an strace.
+
+        Parameters
+        ----------
+        strace : Strace
+            Strace object.
+
+        Returns
+        -------
+        str
+            Raw strace text, read from the strace file if the parser did not
+            keep it.
+        """
+        if strace.text is not None:
+            return strace.text
+        with util.open_trace(strace.strace_file, 'rt') as fd:
+            return fd.read()
+
+    @staticmethod
+    def _insert_batches(rows: Iterable[Dict[str, Any]]
+                        ) -> Iterable[List[Dict[str, Any]]]:
+        """Split rows into batches that fit in a single insert statement.
+
+        Parameters
+        ----------
+        rows : Iterable[Dict[str, Any]]
+            Strace rows.
+
+        Yields
+        ------
+        List[Dict[str, Any]]
+            Rows whose text and pickle sizes are at most
+            ``INSERT_MAX_BYTES`` in total, or a single larger row.
+        """
+        batch = []
+        size = 0
+        for row in rows:
+            row_size = len(row['strace']) + len(row['pickle'])
+            if batch and size + row_size > INSERT_MAX_BYTES:
+                yield batch
+                batch = []
+                size = 0
+            batch.append(row)
+            size += row_size
+        if batch:
+            yield batch
+
+    def migrate_serialization(self):
+        """Convert pickled straces in the database to the binary format.
+
+        Straces added before the binary format was introduced are stored as
+        pickles. Both formats can be loaded, but the binary format loads
+        faster and is smaller. Straces that are already converted are
+        skipped, so the migration can be resumed if it is interrupted.
+        """
+        magic = serialization.MAGIC
+        ids = [
+            row.id for row in (
+                select([t_straces.c.id])
+                .where(
+                    func.substring(t_straces.c.pickle, 1, len(magic)) != magic
+                )
+                .execute()
+            )
+        ]
+        logger.info(f'Converting {len(ids)} pickled straces.')
+        for strace_id in ids:
+            row = (
+                select([t_straces.c.pickle])
+                .where(t_straces.c.id == strace_id)
+                .execute()
+                .first()
+            )
+            strace = from_object(row)
+            (
+                t_straces.update()
+                .where(t_straces.c.id == strace_id)
+                .values(pickle=serialization.dumps(strace))
+                .execute()
+            )
+        self.reset_cache()
 
     def idempotent_add_hole(self, syscall: str, index: int) -> int:
         """Add a syscall hole.
@@ -0,0 +1,215 @@
+"""On-disk cache of the warmed up strace lexer and parser ATNs.
+
+The generated lexer and parser deserialize their ATNs when imported and then
+build the DFA for each decision lazily while parsing, so every new process
+pays to warm up the DFAs again before it parses at full speed. This module
+saves the ATNs together with their DFAs after parsing and reloads them in
+later processes. Entries are keyed by the hash of the generated recognizer
+sources, the ANTLR runtime version, and the Python version, so regenerating
+the grammar invalidates the cache.
+
+The ATN and DFAs of a recognizer are pickled together because DFA states
+reference ATN states by identity. The runtime also compares some shared
+objects, such as the error DFA state, by identity, so these are pickled by
+name and resolved to the objects of the running process when loading.
+"""
+
+
+# Imports
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+import atexit
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import sys
+import tempfile
+
+from antlr4.PredictionContext import PredictionContext
+from antlr4.atn.ATN import ATN
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.dfa.DFA import DFA
+
+from lib import LIB, logger
+from lib.antlr_generated.strace.StraceLexer import StraceLexer
+from lib.antlr_generated.strace.StraceParser import StraceParser
+from lib.strace.paths import ATN_CACHE
+
+
+# Constants
+RECOGNIZERS = (StraceLexer, StraceParser)
+VERSION_FILES = sorted((LIB / 'antlr_generated' / 'strace').glob('*.py'))
+
+# Cache entry format, included in the key
+FORMAT_VERSION = 2
+
+# Runtime objects that are compared by identity, pickled by name
+SHARED_OBJECTS = {
+    'ATNSimulator.ERROR': ATNSimulator.ERROR,
+    'LexerATNSimulator.ERROR': LexerATNSimulator.ERROR,
+    'PredictionContext.EMPTY': PredictionContext.EMPTY,
+    'SemanticContext.NONE': SemanticContext.NONE,
+}
+SHARED_OBJECT_NAMES = {id(v): k for k, v in SHARED_OBJECTS.items()}
+
+
+# Cache state
+_loaded = False
+_loaded_size = 0
+
+
+def _key() -> str:
+    """Compute the cache key.
+
+    Returns
+    -------
+    str
+        Hash of the generated sources and runtime versions.
+    """
+    key_hash = hashlib.sha256(str(FORMAT_VERSION).encode())
+    for path in VERSION_FILES:
+        key_hash.update(path.name.encode())
+        key_hash.update(path.read_bytes())
+    key_hash.update(
+        importlib.metadata.version('antlr4-python3-runtime').encode()
+    )
+    key_hash.update(sys.version.encode())
+    return key_hash.hexdigest()
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler that references shared runtime objects by name."""
+
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        """Get the name of a shared runtime object.
+
+        Parameters
+        ----------
+        obj : Any
+            Object being pickled.
+
+        Returns
+        -------
+        Optional[str]
+            Shared object name, or None to pickle the object normally.
+        """
+        return SHARED_OBJECT_NAMES.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler that resolves shared runtime objects by name."""
+
+    def persistent_load(self, pid: str) -> Any:
+        """Get a shared runtime object by name.
+
+        Parameters
+        ----------
+        pid : str
+            Shared object name.
+
+        Returns
+        -------
+        Any
+            Shared object of the running process.
+        """
+        return SHARED_OBJECTS[pid]
+
+
+def _path() -> Path:
+    """Get the path of the cache entry for the current recognizers.
+
+    Returns
+    -------
+    Path
+        Cache entry path.
+    """
+    return ATN_CACHE / f'{_key()}.pickle'
+
+
+def dfa_size() -> int:
+    """Count the DFA states of all recognizers.
+
+    Returns
+    -------
+    int
+        Total number of DFA states.
+    """
+    return sum(
+        len(dfa._states)
+        for recognizer in RECOGNIZERS
+        for dfa in recognizer.decisionsToDFA
+    )
+
+
+def load() -> bool:
+    """Load the cached ATNs and DFAs into the recognizer classes.
+
+    Only the first call in a process has any effect. A handler is registered
+    to save the DFAs when the process exits if they grew in the meantime.
+
+    Returns
+    -------
+    bool
+        True if a cache entry was loaded.
+    """
+    global _loaded, _loaded_size
+    if _loaded:
+        return False
+    _loaded = True
+    atexit.register(save)
+
+    # Load ATNs and DFAs
+    path = _path()
+    try:
+        with open(path, 'rb') as fd:
+            entries: List[Tuple[ATN, List[DFA]]] = _Unpickler(fd).load()
+    except FileNotFoundError:
+        return False
+    except Exception:
+        logger.warning('Removing unreadable ATN cache entry.')
+        path.unlink(missing_ok=True)
+        return False
+
+    # Replace the class attributes that new recognizers are created from
+    for recognizer, (atn, decisions_to_dfa) in zip(RECOGNIZERS, entries):
+        recognizer.atn = atn
+        recognizer.decisionsToDFA = decisions_to_dfa
+
+    _loaded_size = dfa_size()
+    logger.debug(f'Loaded {_loaded_size} DFA states from the ATN cache.')
+    return True
+
+
+def save():
+    """Save the ATNs and DFAs if they grew since they were loaded.
+
+    The entry is written to a temporary file and renamed into place, so
+    concurrent processes never see partial entries.
+    """
+    global _loaded_size
+    size = dfa_size()
+    if size <= _loaded_size:
+        return
+
+    path = _path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_fd:
+            _Pickler(tmp_fd, pickle.HIGHEST_PROTOCOL).dump(
+                [(r.atn, r.decisionsToDFA) for r in RECOGNIZERS]
+            )
+        os.replace(tmp, path)
+    except RecursionError:
+        Path(tmp).unlink(missing_ok=True)
+        logger.warning('DFAs are too deep to save to the ATN cache.')
+        return
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    _loaded_size = size
+    logger.debug(f'Saved {size} DFA states to the ATN cache.')
@@ -0,0 +1,257 @@
+"""Content addressed cache for parsed straces.
+
+Parsed straces are cached on disk keyed by the hash of the raw trace bytes,
+the parser version, and any options that affect parsing. The parser version
+is derived from the generated ANTLR sources and the parser modules, so
+changing the grammar or visitor invalidates all entries. Entries are evicted
+least recently used first once the cache exceeds its maximum size.
+"""
+
+
+# Imports
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from lib import LIB, logger
+from lib.strace.classes import Strace
+from lib.strace.paths import PARSE_CACHE
+
+
+# Constants
+DEFAULT_MAX_SIZE = 10 * 2 ** 30
+ENTRY_SUFFIX = '.pickle'
+
+
+# Files that determine the parser version. These are the generated sources
+# and every strace module that the parsers use to build tracelines.
+VERSION_FILES = [
+    *sorted((LIB / 'antlr_generated' / 'strace').glob('*.py')),
+    *sorted((LIB / 'antlr_generated' / 'strace').glob('*.interp')),
+    LIB / 'strace' / 'parser.py',
+    LIB / 'strace' / 'fast_parser.py',
+    LIB / 'strace' / 'classes.py',
+    LIB / 'strace' / 'records.py',
+    LIB / 'strace' / 'util.py',
+]
+
+
+class ParseCache:
+    """On-disk cache of parsed straces.
+
+    Entries are pickled straces stored in ``directory``, sharded by the first
+    two characters of their key. The modification time of an entry is
+    updated on every hit and used as its last access time for eviction.
+    """
+
+    def __init__(self,
+                 directory: Path = PARSE_CACHE,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        """Create a new parse cache.
+
+        Parameters
+        ----------
+        directory : Path
+            Cache directory.
+        max_size : int
+            Maximum total size of all entries in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._version = None
+        self._size = None
+
+    @property
+    def version(self) -> str:
+        """Get the parser version.
+
+        Returns
+        -------
+        str
+            Hash of all files that affect parse results.
+        """
+        if self._version is None:
+            version_hash = hashlib.sha256()
+            for path in VERSION_FILES:
+                version_hash.update(path.name.encode())
+                version_hash.update(path.read_bytes())
+            self._version = version_hash.hexdigest()
+        return self._version
+
+    def key(self, data: bytes, options: Dict[str, Any]) -> str:
+        """Compute the cache key for a trace.
+
+        Parameters
+        ----------
+        data : bytes
+            Raw trace file contents.
+        options : Dict[str, Any]
+            Options that affect parsing. Must be JSON serializable.
+
+        Returns
+        -------
+        str
+            Cache key.
+        """
+        key_hash = hashlib.sha256()
+        key_hash.update(hashlib.sha256(data).digest())
+        key_hash.update(self.version.encode())
+        key_hash.update(json.dumps(options, sort_keys=True).encode())
+        return key_hash.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        """Get the path of an entry.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+
+        Returns
+        -------
+        Path
+            Entry path.
+        """
+        return self.directory / key[:2] / f'{key}{ENTRY_SUFFIX}'
+
+    def get(self, key: str) -> Optional[Strace]:
+        """Load a cached strace.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+
+        Returns
+        -------
+        Optional[Strace]
+            Cached strace, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fd:
+                strace = pickle.load(fd)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning(f'Removing unreadable parse cache entry {key}.')
+            path.unlink(missing_ok=True)
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+        return strace
+
+    def put(self, key: str, strace: Strace):
+        """Store a parsed strace.
+
+        The entry is written to a temporary file and renamed into place, so
+        concurrent writers and readers never see partial entries.
+
+        Parameters
+        ----------
+        key : str
+            Cache key.
+        strace : Strace
+            Parsed strace.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_fd:
+                pickle.dump(strace, tmp_fd)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        # Evict old entries if needed
+        if self._size is None:
+            self._size = sum(e['size'] for e in self.entries())
+        else:
+            self._size += path.stat().st_size
+        if self._size > self.max_size:
+            self.prune()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """List all cache entries.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Entries with ``path``, ``size``, and ``accessed`` keys, least
+            recently used first.
+        """
+        entries = []
+        for path in self.directory.glob(f'*/*{ENTRY_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append({
+                'path': path,
+                'size': stat.st_size,
+                'accessed': stat.st_mtime,
+            })
+        return sorted(entries, key=lambda e: e['accessed'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Summarize the cache contents.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Cache directory, parser version, entry count, total size, maximum
+            size, and oldest and newest access times.
+        """
+        entries = self.entries()
+        return {
+            'directory': str(self.directory),
+            'version': self.version,
+            'entries': len(entries),
+            'size': sum(e['size'] for e in entries),
+            'max_size': self.max_size,
+            'oldest': entries[0]['accessed'] if entries else None,
+            'newest': entries[-1]['accessed'] if entries else None,
+        }
+
+    def prune(self, max_size: Optional[int] = None) -> int:
+        """Evict least recently used entries until the cache fits.
+
+        Parameters
+        ----------
+        max_size : Optional[int]
+            Size to prune to in bytes. Defaults to the cache maximum size. Use
+            0 to remove every entry.
+
+        Returns
+        -------
+        int
+            Number of entries removed.
+        """
+        if max_size is None:
+            max_size = self.max_size
+
+        entries = self.entries()
+        size = sum(e['size'] for e in entries)
+        removed = 0
+        for entry in entries:
+            if size <= max_size:
+                break
+            entry['path'].unlink(missing_ok=True)
+            size -= entry['size']
+            removed += 1
+
+        self._size = size
+        if removed:
+            logger.info(f'Pruned {removed} parse cache entries.')
+        return removed
+
+
+# Default parse cache
+parse_cache = ParseCache()
@@ -6,16 +6,19 @@ Classes implemented here represent values parsed from an strace file.
 
 # Imports
 from __future__ import annotations
-from collections import defaultdict
+from collections import defaultdict, deque
 from contextlib import (
     AbstractContextManager, ContextDecorator, contextmanager, ExitStack,
 )
 from copy import copy
 from dataclasses import dataclass
+from itertools import count
 from pathlib import Path
 from json import JSONEncoder
+from threading import get_ident
 from typing import (
-    runtime_checkable, Any, Generator, List, Optional, Protocol, Tuple, Union
+    runtime_checkable, Any, Deque, Dict, Generator, List, Optional, Protocol,
+    Set, Tuple, Union,
 )
 import json
 import hashlib
@@ -23,12 +26,34 @@ import pickle
 
 
 from lib import logger
-from lib.strace import util, parser
+from lib.strace import util, parser, serialization
 
 # Types
 ParameterMapping = List[Tuple[Tuple[str, ...], Tuple[str, ...]]]
 
 
+# Objects whose repr is being computed, by id and thread
+_repr_running: Set[Tuple[int, int]] = set()
+
+# Cached structural hash state. See StructuralHash.
+_HASH_ATTRIBUTE_PREFIX = '_hash_'
+_hash_stamps = count(1)
+_hash_generation = 0
+_hashes_cached = False
+_parameter_hashes = 0
+
+# Key part of values that FlyweightStore cannot share
+_UNSHAREABLE = object()
+
+
+def _invalidate_hashes():
+    """Invalidate all cached structural hashes."""
+    global _hash_generation, _hashes_cached
+    if _hashes_cached:
+        _hash_generation = next(_hash_stamps)
+        _hashes_cached = False
+
+
 @dataclass(eq=True, frozen=True)
 class MigrationResult:
     """The result of creating a migration of an strace.
@@ -54,7 +79,9 @@ class MigrationResult:
     migration: Strace
 
 
-def from_object(obj: Any) -> Strace:
+def from_object(obj: Any,
+                flyweights: Optional[FlyweightStore] = None,
+                lazy: bool = False) -> Strace:
     """Create an Strace from an object.
 
     This is really a convenience method to help with deserializing straces
@@ -65,10 +92,19 @@ def from_object(obj: Any) -> Strace:
     obj : Any
         Object used as the source for a new strace. This object must have one
         of the following attributes.
-        - ``obj.pickle`` containing a pickled strace.
+        - ``obj.pickle`` containing a serialized strace, either in the
+          binary format of ``serialization`` or pickled.
         - ``obj.json`` containing a JSON serialized strace.
         - ``obj.strace`` containing the raw text of an strace. In this case,
           the object may also provide each of the other strace attributes.
+    flyweights : Optional[FlyweightStore]
+        If set, tracelines identical to ones already in the store are
+        replaced with the shared instances.
+    lazy : bool
+        If true and ``obj.pickle`` is set, return a ``LazyStrace`` that only
+        deserializes it when its tracelines are first accessed. The strace
+        attributes that ``obj`` provides, such as ``system``, are available
+        without deserializing.
 
     Returns
     -------
@@ -77,11 +113,21 @@ def from_object(obj: Any) -> Strace:
     """
     # Construct strace object
     if hasattr(obj, 'pickle') and isinstance(obj.pickle, bytes):
-        return pickle.loads(obj.pickle)
+        if lazy:
+            return LazyStrace(
+                obj.pickle,
+                flyweights=flyweights,
+                **{
+                    name: getattr(obj, name)
+                    for name in LazyStrace.row_attributes
+                    if hasattr(obj, name)
+                }
+            )
+        strace = _loads(obj.pickle)
     elif hasattr(obj, 'json') and isinstance(obj.json, str):
-        return json.loads(obj.json, object_hook=from_dict)
+        strace = json.loads(obj.json, object_hook=from_dict)
     elif hasattr(obj, 'strace') and isinstance(obj.strace, str):
-        return parser.parse_string(
+        strace = parser.parse_string(
             obj.strace,
             system=getattr(obj, 'system', None),
             executable=getattr(obj, 'executable', None),
@@ -96,6 +142,29 @@ def from_object(obj: Any) -> Strace:
     else:
         raise ValueError('Object does not provide an strace.')
 
+    # Share tracelines
+    if flyweights is not None:
+        flyweights.share(strace)
+    return strace
+
+
+def _loads(data: bytes) -> Strace:
+    """Deserialize an strace stored in the database.
+
+    Parameters
+    ----------
+    data : bytes
+        Strace in the binary format of ``serialization``, or pickled.
+
+    Returns
+    -------
+    Strace
+        Deserialized strace.
+    """
+    if serialization.is_serialized(data):
+        return serialization.loads(data)
+    return pickle.loads(data)
+
 
 def from_dict(d: dict) -> Union[Strace, TraceLine, OmittedArguments, Literal,
                                 LiteralValue, dict]:
@@ -125,7 +194,7 @@ def from_dict(d: dict) -> Union[Strace, TraceLine, OmittedArguments, Literal,
         o = object.__new__(globals()[d['type']])
 
         # Overwrite the object's writable attributes.
-        o.__dict__ = d['value']
+        o.__setstate__(d['value'])
 
         # Return deserialized object
         return o
@@ -146,7 +215,9 @@ class StraceJSONEncoder(JSONEncoder):
         """
         if isinstance(o, (Strace, TraceLine, OmittedArguments, Literal,
                           LiteralValue)):
-            return {'type': type(o).__name__, 'value': o.__dict__}
+            # Getting the state first turns lazy straces into plain straces
+            state = o.__getstate__()
+            return {'type': type(o).__name__, 'value': state}
         elif isinstance(o, Path):
             return str(o)
         else:
@@ -154,7 +225,100 @@ class StraceJSONEncoder(JSONEncoder):
 
 
 class DictRepr:
-    """Mixin providing __str__ and __repr__ based on __dict__,"""
+    """Mixin providing __str__, __repr__, and pickling based on attributes.
+
+    Most trace classes declare their attributes in ``__slots__`` so that
+    parsed tracelines stay small. The object state is the dict of set slot
+    attributes, in declaration order from base to subclass, followed by any
+    ``__dict__`` attributes. This is the same dict that ``__dict__`` held
+    before the classes were slotted, so pickles and JSON remain compatible in
+    both directions.
+    """
+
+    __slots__ = ()
+
+    # Slot attribute names of each class, from base to subclass.
+    _slot_names: Dict[type, Tuple[str, ...]] = {}
+
+    @classmethod
+    def _slots(cls) -> Tuple[str, ...]:
+        """Get the slot attribute names of the class.
+
+        Returns
+        -------
+        Tuple[str, ...]
+            Slot attribute names, from base to subclass.
+        """
+        try:
+            return DictRepr._slot_names[cls]
+        except KeyError:
+            names = tuple(
+                name
+                for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get('__slots__', ())
+                if not name.startswith(_HASH_ATTRIBUTE_PREFIX)
+            )
+            DictRepr._slot_names[cls] = names
+            return names
+
+    def __getstate__(self) -> dict:
+        """Get the object state.
+
+        Returns
+        -------
+        dict
+            Set attributes by name.
+        """
+        state = {}
+        for name in self._slots():
+            try:
+                state[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        try:
+            state.update(
+                (name, value)
+                for name, value in object.__getattribute__(
+                    self, '__dict__'
+                ).items()
+                if not name.startswith(_HASH_ATTRIBUTE_PREFIX)
+            )
+        except AttributeError:
+            pass
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restore object state.
+
+        Parameters
+        ----------
+        state : dict
+            Attributes by name.
+        """
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def replace(self, **changes):
+        """Create a shallow copy of self with some attributes replaced.
+
+        Trace objects may be shared between an strace and its snapshots, so
+        code that modifies a snapshot replaces objects with modified copies
+        instead of changing them in place.
+
+        Parameters
+        ----------
+        **changes
+            New attribute values by name.
+
+        Returns
+        -------
+        DictRepr
+            New object of the same type.
+        """
+        new = copy(self)
+        for name, value in changes.items():
+            object.__setattr__(new, name, value)
+        return new
 
     def __str__(self) -> str:
         """Return self as a string. This method delegates to __repr__.
@@ -170,19 +334,58 @@ class DictRepr:
         """Return a representation of self.
 
         Representation will be in the format
-        ``<self.__class__.__name__ self.__dict__>``.
+        ``<self.__class__.__name__ self.__getstate__()>``. Objects that
+        contain themselves are represented as ``<self.__class__.__name__
+        {...}>`` where they recur, like dicts are.
 
         Returns
         -------
         str
             String representation of self.
         """
-        return f'<{self.__class__.__name__} {self.__dict__}>'
+        key = (id(self), get_ident())
+        if key in _repr_running:
+            return f'<{self.__class__.__name__} {{...}}>'
+        _repr_running.add(key)
+        try:
+            return f'<{self.__class__.__name__} {self.__getstate__()}>'
+        finally:
+            _repr_running.discard(key)
+
+
+class InternedAttributes:
+    """String attributes are interned when an object is deserialized.
+
+    The names of interned attributes are listed in ``_interned``. Parsers
+    intern these values when creating objects, and unpickling or loading from
+    JSON interns them through ``__setstate__``.
+    """
+
+    __slots__ = ()
+
+    _interned: Tuple[str, ...] = ()
+
+    def __setstate__(self, state: dict):
+        """Restore object state, interning string attributes.
+
+        Parameters
+        ----------
+        state : dict
+            Object attributes.
+        """
+        # Attributes are set one at a time so slotted instances can be
+        # restored and other instances keep sharing their attribute keys.
+        for name, value in state.items():
+            if name in self._interned:
+                value = util.intern(value)
+            object.__setattr__(self, name, value)
 
 
 class RestorableHelperMixin:
     """A helper mixin for common private methods of restorable classes."""
 
+    __slots__ = ()
+
     # Dictionary of attributes pushed by checkpoint contexts.
     _methods = defaultdict(list)
 
@@ -231,6 +434,8 @@ class RestorableHelperMixin:
 class RestorableAttributes(RestorableHelperMixin):
     """Instance attributes can be restored to a checkpoint."""
 
+    __slots__ = ()
+
     @classmethod
     @contextmanager
     def checkpoint(cls) -> Generator[None, None, None]:
@@ -288,6 +493,8 @@ class RestorableAttributes(RestorableHelperMixin):
 class RestorableMutableSequence(RestorableHelperMixin):
     """Sequence items can be restored to a checkpoint."""
 
+    __slots__ = ()
+
     @classmethod
     @contextmanager
     def checkpoint(cls):
@@ -412,13 +619,182 @@ class RestorableMutableSequence(RestorableHelperMixin):
                     proxy.insert(name, value)
 
 
-class RestorableList(RestorableAttributes, RestorableMutableSequence, list):
+class VersionedList(list):
+    """A list that records a new version whenever it is modified.
+
+    Cached structural hashes of objects that own a list are only valid if
+    they are newer than the list version. Versions are drawn from the global
+    hash stamp counter. Lists may be nested in the hashed values of other
+    objects, so modifying a list also invalidates all cached hashes, unless
+    the list is stored in an ``UnnestedList`` attribute.
+
+    See collections.abc for documentation on list methods.
+    https://docs.python.org/3/library/collections.abc.html#module-collections.abc.
+    """
+
+    # Version of unmodified lists
+    _version = 0
+
+    # Whether the list may be nested in other hashed values
+    _nested = True
+
+    def _modified(self):
+        """Record a new version and invalidate cached hashes if nested."""
+        object.__setattr__(self, '_version', next(_hash_stamps))
+        if self._nested:
+            _invalidate_hashes()
+
+    def __getstate__(self) -> None:
+        """Get the list state. Versions are not part of it."""
+        return None
+
+    def __setitem__(self, index, value):
+        self._modified()
+        return super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self._modified()
+        return super().__delitem__(index)
+
+    def __iadd__(self, values):
+        self._modified()
+        return super().__iadd__(values)
+
+    def __imul__(self, n):
+        self._modified()
+        return super().__imul__(n)
+
+    def append(self, value):
+        self._modified()
+        return super().append(value)
+
+    def extend(self, values):
+        self._modified()
+        return super().extend(values)
+
+    def insert(self, index, value):
+        self._modified()
+        return super().insert(index, value)
+
+    def pop(self, *args):
+        self._modified()
+        return super().pop(*args)
+
+    def remove(self, value):
+        self._modified()
+        return super().remove(value)
+
+    def clear(self):
+        self._modified()
+        return super().clear()
+
+    def reverse(self):
+        self._modified()
+        return super().reverse()
+
+    def sort(self, *args, **kwargs):
+        self._modified()
+        return super().sort(*args, **kwargs)
+
+
+class RestorableList(RestorableAttributes, RestorableMutableSequence,
+                     VersionedList):
     """A restorable list class."""
     pass
 
 
+class UnnestedList:
+    """Descriptor for a list attribute that is not nested in other hashes.
+
+    Objects that are never hashed as part of other values check the version
+    of such a list in ``_hash_version``, so modifying it only needs to
+    invalidate their own hash. Versioned lists stored in the attribute are
+    marked as not nested. The list is kept in the instance dictionary under
+    the attribute name, so it is part of the object state.
+    """
+
+    def __set_name__(self, owner: type, name: str):
+        """Set the attribute name.
+
+        Parameters
+        ----------
+        owner : type
+            Owner class.
+        name : str
+            Attribute name.
+        """
+        self.name = name
+
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        """Get the list.
+
+        Parameters
+        ----------
+        obj : Any
+            Owner instance, or None for class access.
+        objtype : Optional[type]
+            Owner class.
+
+        Returns
+        -------
+        Any
+            The list, or the descriptor for class access.
+
+        Raises
+        ------
+        AttributeError
+            Raised if the attribute is not set.
+        """
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(
+                f'{type(obj).__name__!r} object has no attribute '
+                f'{self.name!r}'
+            ) from None
+
+    def __set__(self, obj: Any, value: Any):
+        """Set the list, marking versioned lists as not nested.
+
+        Parameters
+        ----------
+        obj : Any
+            Owner instance.
+        value : Any
+            New list.
+        """
+        if isinstance(value, VersionedList):
+            object.__setattr__(value, '_nested', False)
+        obj.__dict__[self.name] = value
+
+    def __delete__(self, obj: Any):
+        """Delete the list.
+
+        Parameters
+        ----------
+        obj : Any
+            Owner instance.
+
+        Raises
+        ------
+        AttributeError
+            Raised if the attribute is not set.
+        """
+        try:
+            del obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+
 class RestoreCheckpoint(ContextDecorator, AbstractContextManager):
-    """Create a context manager for all restorable types."""
+    """Create a context manager for all restorable types.
+
+    While a checkpoint is active, every attribute and list write to a
+    restorable object is journaled so that it can be undone. Comparison code
+    uses ``Strace.snapshot`` instead, which does not slow down writes.
+    """
 
     def __init__(self):
         """Create a new checkpoint."""
@@ -435,7 +811,109 @@ class RestoreCheckpoint(ContextDecorator, AbstractContextManager):
         return self.exit_stack.__exit__(*args)
 
 
-class Strace(RestorableAttributes, DictRepr):
+class StructuralHash:
+    """Structural hashes are cached until the hashed values change.
+
+    Trace objects hash by value, so hashing a syscall walks all of its
+    arguments. Classes that hash with ``_cached_hash`` compute the hash once
+    with ``_structural_hash`` and store it in their ``_hash_value`` slot,
+    together with a ``_hash_stamp`` taken from a global counter. Neither is
+    part of the object state. The cached hash is valid while the stamp is
+    newer than:
+
+    - the hash generation, which starts when an attribute of any trace
+      object is replaced or deleted, or a ``VersionedList`` that may be
+      nested in other values is modified. Objects may be shared by many
+      parents, so this invalidates all cached hashes.
+    - the version returned by ``_hash_version``, which classes that own lists
+      use to return the list version.
+
+    Setting attributes that are not yet set, as constructors do, and creating
+    modified copies with ``replace`` do not invalidate cached hashes. Hashes
+    that include a synthetic value depend on the executable parameter
+    comparison state, so they are not cached.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any):
+        """Set an attribute, invalidating cached hashes on replacement.
+
+        Parameters
+        ----------
+        name : str
+            Attribute name.
+        value : Any
+            Attribute value.
+        """
+        if _hashes_cached and hasattr(self, name):
+            self._modified()
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str):
+        """Delete an attribute, invalidating cached hashes.
+
+        Parameters
+        ----------
+        name : str
+            Attribute name.
+        """
+        self._modified()
+        super().__delattr__(name)
+
+    def _modified(self):
+        """Invalidate cached hashes after an attribute changes."""
+        _invalidate_hashes()
+
+    def _hash_version(self) -> int:
+        """Get the version of mutable values included in the hash.
+
+        Returns
+        -------
+        int
+            Hash stamp of the last modification, or 0 if never modified.
+        """
+        return 0
+
+    def _structural_hash(self) -> int:
+        """Compute the structural hash.
+
+        Raises
+        ------
+        NotImplementedError
+            This method must be implemented by a subclass that caches hashes.
+        """
+        raise NotImplementedError(
+            f'Method must be implemented by subclass: '
+            f'{self.__class__.__name__}'
+        )
+
+    def _cached_hash(self) -> int:
+        """Get the structural hash, computing it if the cache is invalid.
+
+        Returns
+        -------
+        int
+            Structural hash.
+        """
+        global _hashes_cached
+        stamp = getattr(self, '_hash_stamp', 0)
+        if stamp > _hash_generation and stamp > self._hash_version():
+            return self._hash_value
+
+        # Hashes of synthetic values increment the parameter hash count, so a
+        # changed count means this hash depends on executable parameters.
+        stamp = next(_hash_stamps)
+        parameter_hashes = _parameter_hashes
+        value = self._structural_hash()
+        if parameter_hashes == _parameter_hashes:
+            object.__setattr__(self, '_hash_stamp', stamp)
+            object.__setattr__(self, '_hash_value', value)
+            _hashes_cached = True
+        return value
+
+
+class Strace(RestorableAttributes, StructuralHash, DictRepr):
     """Strace object.
 
     A top-level strace object corresponds to an strace output file and contains
@@ -443,6 +921,12 @@ class Strace(RestorableAttributes, DictRepr):
     calls that are split into unfinished and resumed portions.
     """
 
+    # Raw strace text, if kept by the parser. See ``parser.parse``.
+    text: Optional[str] = None
+
+    # Straces are not part of other hashed values, see ``_modified``.
+    trace_lines = UnnestedList()
+
     def __init__(self,
                  trace_lines: List[TraceLine],
                  system: Optional[str] = None,
@@ -529,6 +1013,23 @@ class Strace(RestorableAttributes, DictRepr):
             .digest()
         )
 
+    def snapshot(self) -> Strace:
+        """Create a copy-on-write snapshot of the strace.
+
+        The snapshot has its own attributes and traceline list, but shares the
+        traceline objects with this strace. Tracelines can be added, removed,
+        or reordered in the snapshot without affecting this strace, and
+        modified tracelines must be stored as new objects, for example with
+        ``replace``. Dropping a snapshot restores nothing, so it costs
+        nothing.
+
+        Returns
+        -------
+        Strace
+            Snapshot of this strace.
+        """
+        return self.replace(trace_lines=RestorableList(self.trace_lines))
+
     def normalize(self) -> Strace:
         """Normalize the strace.
 
@@ -544,80 +1045,139 @@ class Strace(RestorableAttributes, DictRepr):
         if self.normalized:
             return self
 
-        # Search through the tracelines and merge all matching unfinished and
-        # resumed syscalls
-        num_lines = len(self.trace_lines)
-        i = 0
-        while i < num_lines:
-
-            # Get current line
-            line = self.trace_lines[i]
+        # Merge the tracelines in a single pass. Each resumed syscall is
+        # merged into the earliest pending unfinished syscall with the same
+        # pid and name, and the merged syscall takes the position of the
+        # unfinished one. Pending syscalls are queued by output index and
+        # input position.
+        trace_lines = []
+        pending: Dict[Tuple[Optional[int], str], Deque[Tuple[int, int]]] = (
+            defaultdict(deque)
+        )
+        unmatched_resume = None
+        for position, line in enumerate(self.trace_lines):
 
-            # Skip if not a syscall
-            if not isinstance(line,  Syscall):
-                i += 1
+            # Keep other tracelines
+            if not isinstance(line, Syscall):
+                trace_lines.append(line)
                 continue
 
-            # Error on unmatched resume
+            # Merge resumed syscalls, remembering the first one without an
+            # unfinished syscall
             if line.resumed:
-                raise Exception(
-                    'Encountered resumed syscall before unfinished syscall'
+                queue = pending.get((line.pid, line.name))
+                if queue:
+                    index, _ = queue.popleft()
+                    trace_lines[index] = trace_lines[index].merge_left(line)
+                elif unmatched_resume is None:
+                    unmatched_resume = position
+                continue
+
+            # Queue unfinished syscalls
+            if line.unfinished:
+                pending[line.pid, line.name].append(
+                    (len(trace_lines), position)
                 )
+            trace_lines.append(line)
 
-            # Skip if not unfinished
-            if not line.unfinished:
-                i += 1
-                continue
+        # Unfinished syscalls without a resumed syscall
+        unmatched = [entry for queue in pending.values() for entry in queue]
+        first_unmatched = min(
+            (position for _, position in unmatched),
+            default=None
+        )
 
-            # We've found an unfinished syscall. Search the remaining
-            # tracelines for a matching finished syscall and merge the two.
-            merged = False
-            for j in range(i + 1, num_lines):
-                other_line = self.trace_lines[j]
-                if (isinstance(other_line, Syscall)
-                        and other_line.resumed
-                        and other_line.pid == line.pid
-                        and other_line.name == line.name):
-                    self.trace_lines[i] = line.merge_left(other_line)
-                    del self.trace_lines[j]
-                    num_lines -= 1
-                    i += 1
-                    merged = True
-                    break
-
-            # No resumed syscall was found.
-            if not merged:
-
-                # If the strace is not truncated, this must be an error.
-                # If the strace is truncated, assume that the resume is missing
-                # because it got truncated. Drop the unfinished syscall, since
-                # an incomplete definition cannot be used for some forms of
-                # syscall equality comparison.
-                if not self.truncated:
-                    raise Exception(
-                        'Encountered unfinished syscall, but did not find a '
-                        'matching resumed syscall.'
-                    )
-                else:
-                    del self.trace_lines[i]
-                    num_lines -= 1
+        # Errors are raised for the first problem in the strace. If the
+        # strace is truncated, assume that the resume of an unfinished
+        # syscall is missing because it got truncated. Drop the unfinished
+        # syscall, since an incomplete definition cannot be used for some
+        # forms of syscall equality comparison.
+        if unmatched_resume is not None and (
+                self.truncated
+                or first_unmatched is None
+                or unmatched_resume < first_unmatched):
+            raise Exception(
+                'Encountered resumed syscall before unfinished syscall'
+            )
+        if unmatched:
+            if not self.truncated:
+                raise Exception(
+                    'Encountered unfinished syscall, but did not find a '
+                    'matching resumed syscall.'
+                )
+            dropped = set(index for index, _ in unmatched)
+            trace_lines = [
+                line for index, line in enumerate(trace_lines)
+                if index not in dropped
+            ]
+        self.trace_lines[:] = trace_lines
 
         # Set normalized and return self for chaining
         self.normalized = True
         return self
 
+    def __getstate__(self) -> dict:
+        """Get the object state.
+
+        The raw strace text is stored separately from the parsed strace, so
+        it is not part of the state.
+
+        Returns
+        -------
+        dict
+            Set attributes by name.
+        """
+        state = super().__getstate__()
+        state.pop('text', None)
+        return state
+
+    def _modified(self):
+        """Invalidate the cached strace hash after an attribute changes.
+
+        Straces are not part of other hashed values, so only their own hash
+        is invalidated.
+        """
+        self.__dict__.pop('_hash_stamp', None)
+
+    def _hash_version(self) -> int:
+        """Get the traceline list version.
+
+        Returns
+        -------
+        int
+            Traceline list version.
+        """
+        return getattr(self.trace_lines, '_version', 0)
+
+    def _structural_hash(self) -> int:
+        """Hash the tracelines.
+
+        Returns
+        -------
+        int
+            Hash of the tracelines tuple.
+        """
+        object.__setattr__(self, '_hash_function', Syscall.__hash__)
+        return hash(tuple(self.trace_lines))
+
     def __hash__(self) -> int:
         """Hash an Strace.
 
         An Strace hash is computed by converting the normalized tracelines
-        to a tuple, then using the default tuple hashing algorithm.
+        to a tuple, then using the default tuple hashing algorithm. The hash
+        is cached until the tracelines change. Traceline hashes depend on the
+        active syscall equality, so the cached hash is only used with the
+        syscall hash function it was computed with.
 
         Returns
         -------
         int
             Strace hash.
         """
-        return hash(tuple(self.normalize().trace_lines))
+        self.normalize()
+        if self.__dict__.get('_hash_function') is not Syscall.__hash__:
+            self._modified()
+        return self._cached_hash()
 
     def __eq__(self, other: Any) -> bool:
         """Determine equality between self and another object.
@@ -711,9 +1271,153 @@ class Strace(RestorableAttributes, DictRepr):
         )
 
 
-class TraceLine(RestorableAttributes, DictRepr):
+class LazyStrace(Strace):
+    """An strace that is deserialized when its tracelines are first used.
+
+    Lazy straces are created from database rows, see ``from_object``. The
+    attributes in ``row_attributes`` are set from the row columns, so
+    straces can be filtered and binned by executable without deserializing
+    them. Accessing any other public attribute, or pickling or printing the
+    strace, deserializes it, sets all attributes that are not set yet, and
+    turns the object into a plain ``Strace``.
+    """
+
+    # Attributes that can be set from database row columns
+    row_attributes = (
+        'system', 'executable', 'arguments', 'collector',
+        'collector_assigned_id',
+    )
+
+    def __init__(self, data: bytes,
+                 flyweights: Optional[FlyweightStore] = None,
+                 **attributes):
+        """Create a lazy strace.
+
+        Parameters
+        ----------
+        data : bytes
+            Serialized strace, see ``from_object``.
+        flyweights : Optional[FlyweightStore]
+            If set, tracelines are shared through the store when they are
+            deserialized.
+        **attributes
+            Strace attributes that are available without deserializing.
+        """
+        object.__setattr__(self, '_serialized', data)
+        object.__setattr__(self, '_flyweights', flyweights)
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def load(self) -> Strace:
+        """Deserialize the strace.
+
+        Returns
+        -------
+        Strace
+            Self, which is a plain ``Strace`` afterwards.
+        """
+        data = self.__dict__.pop('_serialized')
+        flyweights = self.__dict__.pop('_flyweights')
+        strace = _loads(data)
+        if flyweights is not None:
+            flyweights.share(strace)
+
+        # Attributes set from the row or by the caller take precedence.
+        # Attributes are ordered as in the deserialized strace, so that both
+        # have the same state.
+        attributes = self.__dict__.copy()
+        self.__dict__.clear()
+        for name, value in strace.__getstate__().items():
+            self.__dict__[name] = attributes.pop(name, value)
+        self.__dict__.update(attributes)
+        object.__setattr__(self, '__class__', Strace)
+        return self
+
+    def snapshot(self) -> Strace:
+        """Create a snapshot of the strace without deserializing it.
+
+        The snapshot is a lazy strace of the same data with the attributes
+        that are set so far. Each deserializes its own tracelines, unless
+        they share them through a flyweight store.
+
+        Returns
+        -------
+        Strace
+            Snapshot of this strace.
+        """
+        attributes = {
+            name: value
+            for name, value in self.__dict__.items()
+            if not name.startswith('_')
+        }
+        return LazyStrace(self._serialized, self._flyweights, **attributes)
+
+    def __getattr__(self, name: str) -> Any:
+        """Deserialize the strace to get a missing public attribute.
+
+        Parameters
+        ----------
+        name : str
+            Attribute name.
+
+        Returns
+        -------
+        Any
+            Attribute value.
+
+        Raises
+        ------
+        AttributeError
+            Raised if the attribute is private, or the strace does not have
+            it after deserializing.
+        """
+        if name.startswith('_'):
+            raise AttributeError(
+                f'{type(self).__name__!r} object has no attribute {name!r}'
+            )
+        return getattr(self.load(), name)
+
+    def __getstate__(self) -> dict:
+        """Get the object state, deserializing the strace first.
+
+        Returns
+        -------
+        dict
+            Set attributes by name.
+        """
+        return self.load().__getstate__()
+
+    def __reduce_ex__(self, protocol: int) -> Any:
+        """Reduce the deserialized strace for pickling and copying.
+
+        Parameters
+        ----------
+        protocol : int
+            Pickle protocol.
+
+        Returns
+        -------
+        Any
+            Reduced plain ``Strace``.
+        """
+        return self.load().__reduce_ex__(protocol)
+
+    def __repr__(self) -> str:
+        """Return a representation of the deserialized strace.
+
+        Returns
+        -------
+        str
+            String representation of self.
+        """
+        return repr(self.load())
+
+
+class TraceLine(RestorableAttributes, StructuralHash, DictRepr):
     """An strace traceline object."""
 
+    __slots__ = ('pid',)
+
     def __init__(self, *args, pid: Optional[int] = None, **kwargs):
         """Create a new traceline.
 
@@ -756,9 +1460,28 @@ class TraceLine(RestorableAttributes, DictRepr):
         )
 
 
-class Syscall(TraceLine):
+class Syscall(InternedAttributes, TraceLine):
     """An strace syscall object."""
 
+    __slots__ = (
+        'name',
+        'arguments',
+        'unfinished',
+        'resumed',
+        'exit_code',
+        'exit_notes',
+        'executable_parameters',
+        '_argument_text',
+        '_hash_stamp',
+        '_hash_value',
+    )
+
+    _interned = ('name',)
+
+    # Raw argument text of syscalls whose arguments are not parsed yet. See
+    # ``LazySyscall``.
+    argument_text: Optional[str] = None
+
     def __init__(self,
                  name: str,
                  arguments: List[Union[OmittedArguments, Literal]],
@@ -776,7 +1499,7 @@ class Syscall(TraceLine):
         name : str
             Syscall name.
         arguments : list[SyscallArgument]
-            Syscall arguments.
+            Syscall arguments. Not set if None.
         resumed : bool
             Whether or not the syscall is resumed.
         unfinished : bool
@@ -791,7 +1514,8 @@ class Syscall(TraceLine):
         super().__init__(*args, pid=pid, **kwargs)
 
         self.name = name
-        self.arguments = RestorableList(arguments)
+        if arguments is not None:
+            self.arguments = RestorableList(arguments)
         self.unfinished = unfinished
         self.resumed = resumed
 
@@ -816,40 +1540,84 @@ class Syscall(TraceLine):
                 or self.name != other.name):
             raise Exception('Cannot merge syscalls.')
 
-        # Get arguments
-        arguments = self.arguments + other.arguments
-        if other.arguments and isinstance(other.arguments[0], Mapping):
+        # Get arguments. An incomplete mapping is completed with a copy, since
+        # the resumed syscall may be shared with other straces.
+        other_arguments = list(other.arguments)
+        if other_arguments and isinstance(other_arguments[0], Mapping):
             if not self.arguments:
                 raise Exception(
                     'Incomplete mapping found on resume, but no arguments '
                     'exist in the unfinished syscall.'
                 )
-            mapping = arguments[len(self.arguments)]
-            source = arguments.pop(len(self.arguments) - 1)
-            mapping.source = source
+            other_arguments[0] = other_arguments[0].replace(
+                source=self.arguments[-1]
+            )
 
         return Syscall(
             pid=self.pid,
             name=self.name,
-            arguments=self.arguments + other.arguments,
+            arguments=self.arguments + other_arguments,
             exit_code=other.exit_code,
             exit_notes=other.exit_notes,
         )
 
+    def replace_argument_value(self, index: int,
+                               value: LiteralValue) -> Syscall:
+        """Create a copy of self with the value of an argument replaced.
+
+        Only the syscall, its argument list, and the replaced literal are
+        copied. All other arguments are shared with self.
+
+        Parameters
+        ----------
+        index : int
+            Argument index.
+        value : LiteralValue
+            New argument value.
+
+        Returns
+        -------
+        Syscall
+            New syscall.
+        """
+        arguments = RestorableList(self.arguments)
+        arguments[index] = arguments[index].replace(value=value)
+        return self.replace(arguments=arguments)
+
+    def _hash_version(self) -> int:
+        """Get the argument list version.
+
+        Returns
+        -------
+        int
+            Argument list version.
+        """
+        return getattr(self.arguments, '_version', 0)
+
+    def _structural_hash(self) -> int:
+        """Hash the syscall name and arguments.
+
+        Returns
+        -------
+        int
+            Hash of the tuple of name and arguments.
+        """
+        return hash((self.name, *self.arguments))
+
     def strict_equals_hash(self) -> int:
         """Hash a syscall.
 
         The strict equality hash is computed by converting to a tuple of name
         and arguments, then using the default tuple hashing algorithm. It is
         implemented such that any syscalls that are strictly equal hash the
-        same.
+        same. The hash is cached until the syscall or its arguments change.
 
         Returns
         -------
         int
             Syscall hash.
         """
-        return hash((self.name, *self.arguments))
+        return self._cached_hash()
 
     def __hash__(self) -> int:
         """Hash a syscall.
@@ -910,9 +1678,125 @@ class Syscall(TraceLine):
         return self.strict_equals(other)
 
 
+class LazySyscall(Syscall):
+    """A syscall whose arguments are parsed when they are first used.
+
+    Lazy syscalls are created by the ``lazy`` parser engine. They keep the
+    raw text of their arguments, so code that only looks at syscall names
+    does not parse arguments at all. Accessing the arguments, or pickling,
+    copying, or printing the syscall, parses the arguments and turns the
+    object into a plain ``Syscall``. The raw text is never part of the
+    object state.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name: str, argument_text: str, *args, **kwargs):
+        """Create a lazy syscall.
+
+        Parameters
+        ----------
+        name : str
+            Syscall name.
+        argument_text : str
+            Raw argument text, as it appears in the traceline.
+        *args
+            Syscall positional arguments after ``arguments``.
+        **kwargs
+            Syscall keyword arguments, see ``Syscall``.
+        """
+        super().__init__(name, None, *args, **kwargs)
+        object.__setattr__(self, '_argument_text', argument_text)
+
+    @property
+    def argument_text(self) -> str:
+        """Raw argument text."""
+        return self._argument_text
+
+    def load(self) -> Syscall:
+        """Parse the arguments.
+
+        Parsing does not change the syscall, so cached hashes stay valid.
+
+        Returns
+        -------
+        Syscall
+            Self, which is a plain ``Syscall`` afterwards.
+        """
+        arguments = parser.parse_arguments(
+            self.name, self._argument_text, self.resumed, self.unfinished
+        )
+        object.__setattr__(self, 'arguments', RestorableList(arguments))
+        object.__delattr__(self, '_argument_text')
+        object.__setattr__(self, '__class__', Syscall)
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        """Parse the arguments when they are first accessed.
+
+        Parameters
+        ----------
+        name : str
+            Attribute name.
+
+        Returns
+        -------
+        Any
+            Parsed arguments.
+
+        Raises
+        ------
+        AttributeError
+            Raised for any attribute other than ``arguments`` that is not
+            set.
+        """
+        if name != 'arguments':
+            raise AttributeError(
+                f'{type(self).__name__!r} object has no attribute {name!r}'
+            )
+        return self.load().arguments
+
+    def __getstate__(self) -> dict:
+        """Get the object state, parsing the arguments first.
+
+        Returns
+        -------
+        dict
+            Set attributes by name.
+        """
+        return self.load().__getstate__()
+
+    def __reduce_ex__(self, protocol: int) -> Any:
+        """Reduce the parsed syscall for pickling and copying.
+
+        Parameters
+        ----------
+        protocol : int
+            Pickle protocol.
+
+        Returns
+        -------
+        Any
+            Reduced plain ``Syscall``.
+        """
+        return self.load().__reduce_ex__(protocol)
+
+    def __repr__(self) -> str:
+        """Return a representation of the parsed syscall.
+
+        Returns
+        -------
+        str
+            String representation of self.
+        """
+        return repr(self.load())
+
+
 class OmittedArguments(RestorableAttributes, DictRepr):
     """Represents missing or omitted arguments in a syscall."""
 
+    __slots__ = ()
+
     def __hash__(self) -> int:
         """Hash an argument.
 
@@ -941,9 +1825,11 @@ class OmittedArguments(RestorableAttributes, DictRepr):
         return isinstance(other, OmittedArguments)
 
 
-class Literal(RestorableAttributes, DictRepr):
+class Literal(RestorableAttributes, StructuralHash, DictRepr):
     """A literal with a value and optional identifier."""
 
+    __slots__ = ('identifier', 'value', '_hash_stamp', '_hash_value')
+
     def __init__(self,
                  value: LiteralValue,
                  identifier: Optional[str] = None):
@@ -969,18 +1855,28 @@ class Literal(RestorableAttributes, DictRepr):
         """
         return self.identifier, self.value
 
+    def _structural_hash(self) -> int:
+        """Hash the literal tuple.
+
+        Returns
+        -------
+        int
+            Hash value.
+        """
+        return hash(self._tuple())
+
     def __hash__(self) -> int:
         """Hash a literal.
 
         Computed by converting to a tuple and hashing using the default tuple
-        hashing algorithm.
+        hashing algorithm. The hash is cached until the literal changes.
 
         Returns
         -------
         int
             Hash value.
         """
-        return hash(self._tuple())
+        return self._cached_hash()
 
     def __eq__(self, other: Any) -> bool:
         """Determine equality between self and another object.
@@ -1000,9 +1896,9 @@ class Literal(RestorableAttributes, DictRepr):
         return self._tuple() == other._tuple()
 
 
-class LiteralValue(RestorableAttributes, DictRepr):
+class LiteralValue(RestorableAttributes, StructuralHash, DictRepr):
     """Any sort of value representation."""
-    pass
+    __slots__ = ()
 
 
 class Hole(LiteralValue):
@@ -1019,6 +1915,8 @@ class Hole(LiteralValue):
     All holes are equivalent to all other holes.
     """
 
+    __slots__ = ()
+
     # Common value for all holes.
     value = 'Hole'
 
@@ -1129,6 +2027,8 @@ class SyntheticValue(LiteralValue):
     compare and hash as equal. In this way they behave a bit like hole values.
     """
 
+    __slots__ = ('executable_parameter', 'template', 'original_value')
+
     def __init__(self,
                  executable_parameter: ExecutableParameter,
                  template: SyntheticValueTemplate,
@@ -1180,11 +2080,16 @@ class SyntheticValue(LiteralValue):
     def __hash__(self) -> int:
         """Hash a synthetic value.
 
+        The hash depends on the executable parameter comparison state, so it
+        is counted to keep parent values from caching their hashes.
+
         Returns
         -------
         int
             Hash of the ``value`` representation.
         """
+        global _parameter_hashes
+        _parameter_hashes += 1
         return hash(self.value)
 
     def __eq__(self, other: Any) -> bool:
@@ -1245,7 +2150,7 @@ class ExecutableParameter(DictRepr):
             cls.__hash__ = cls_hash
             cls.__eq__ = cls_eq
             cls.value = cls_value
-
+    
     @classmethod
     @contextmanager
     def compare_by_map(cls) -> Generator[None, None, None]:
@@ -1304,7 +2209,7 @@ class ExecutableParameter(DictRepr):
             cls.__hash__ = cls_hash
             cls.__eq__ = cls_eq
             cls.value = cls_value
-
+    
     @classmethod
     @contextmanager
     def compare_equal(cls) -> Generator[None, None, None]:
@@ -1338,7 +2243,7 @@ class ExecutableParameter(DictRepr):
             cls.__hash__ = cls_hash
             cls.__eq__ = cls_eq
             cls.value = cls_value
-
+    
     @classmethod
     def map_values(cls, v1: ExecutableParameter, v2: ExecutableParameter):
         """Map two executable parameters to each other.
@@ -1576,6 +2481,8 @@ class ExecutableParameter(DictRepr):
 class Mapping(LiteralValue):
     """A mapping is a link between two other literal values."""
 
+    __slots__ = ('source', 'destination', '_hash_stamp', '_hash_value')
+
     def __init__(self, source: Optional[Literal], destination: Literal):
         """Construct a new mapping.
 
@@ -1590,15 +2497,27 @@ class Mapping(LiteralValue):
         self.source = source
         self.destination = destination
 
+    def _structural_hash(self) -> int:
+        """Hash the source and destination.
+
+        Returns
+        -------
+        int
+            Hash value.
+        """
+        return hash((self.source, self.destination))
+
     def __hash__(self) -> int:
         """Hash a mapping.
 
+        The hash is cached until the mapping changes.
+
         Returns
         -------
         int
             Hash value.
         """
-        return hash((self.source, self.destination))
+        return self._cached_hash()
 
     def __eq__(self, other: Any) -> bool:
         """Determine equality between self and another object.
@@ -1619,9 +2538,13 @@ class Mapping(LiteralValue):
                 and self.destination == other.destination)
 
 
-class Identifier(LiteralValue):
+class Identifier(InternedAttributes, LiteralValue):
     """An identifier used as a value."""
 
+    __slots__ = ('value',)
+
+    _interned = ('value',)
+
     def __init__(self, value: str):
         """Initialize a new identifier.
 
@@ -1665,6 +2588,8 @@ class Identifier(LiteralValue):
 class PrimitiveLiteral(LiteralValue):
     """A literal value representing a primitive type."""
 
+    __slots__ = ('value',)
+
     def __init__(self, value: Any):
         """Initialize a new primitive literal.
 
@@ -1706,24 +2631,29 @@ class PrimitiveLiteral(LiteralValue):
         return self.value == other.value
 
 
-class StringLiteral(PrimitiveLiteral):
+class StringLiteral(InternedAttributes, PrimitiveLiteral):
     """A string valued primitive literal."""
-    pass
+
+    __slots__ = ()
+
+    _interned = ('value',)
 
 
 class NullLiteral(PrimitiveLiteral):
     """A null valued primitive literal"""
-    pass
+    __slots__ = ()
 
 
 class NumberLiteral(PrimitiveLiteral):
     """A number valued primitive literal."""
-    pass
+    __slots__ = ()
 
 
 class FileDescriptor(LiteralValue):
     """A file descriptor."""
 
+    __slots__ = ('number',)
+
     def __init__(self, number: int):
         """Initialize a new file descriptor.
 
@@ -1844,6 +2774,8 @@ class FileDescriptor(LiteralValue):
 class PathFileDescriptor(FileDescriptor):
     """A file descriptor with an associated file path."""
 
+    __slots__ = ('path',)
+
     def __init__(self, number: int, path: str):
         """Initialize a new path file descriptor.
 
@@ -1871,6 +2803,8 @@ class PathFileDescriptor(FileDescriptor):
 class DeviceFileDescriptor(PathFileDescriptor):
     """A file descriptor with an associated device."""
 
+    __slots__ = ('type', 'major', 'minor')
+
     def __init__(self, number: int, path: str, device_type: str, major: int,
                  minor: int):
         """Initialize a new path file descriptor.
@@ -1907,6 +2841,8 @@ class DeviceFileDescriptor(PathFileDescriptor):
 class InodeFileDescriptor(FileDescriptor):
     """A file descriptor with an associated inode."""
 
+    __slots__ = ('protocol', 'inode', 'reference', 'bind')
+
     def __init__(self, number: int, protocol: str, inode: int,
                  reference: Optional[int] = None,
                  bind: Optional[str] = None):
@@ -1946,6 +2882,8 @@ class InodeFileDescriptor(FileDescriptor):
 class NetlinkSubprotocolFileDescriptor(FileDescriptor):
     """A file descriptor for a netlink subprotocol."""
 
+    __slots__ = ('protocol', 'subprotocol', 'pid')
+
     def __init__(self, number: int, protocol: str, subprotocol: str, pid: int):
         """Initialize a new netlink file descriptor.
 
@@ -1977,6 +2915,8 @@ class NetlinkSubprotocolFileDescriptor(FileDescriptor):
 class IPFileDescriptor(FileDescriptor):
     """A file descriptor with an associated ip address."""
 
+    __slots__ = ('protocol', 'destination', 'source')
+
     def __init__(self, number: int, protocol: str, destination: str,
                  source: Optional[str] = None):
         """Initialize a new ip file descriptor.
@@ -2006,9 +2946,13 @@ class IPFileDescriptor(FileDescriptor):
         return self.protocol, self.source, self.destination
 
 
-class BooleanExpression(LiteralValue):
+class BooleanExpression(InternedAttributes, LiteralValue):
     """A boolean expression."""
 
+    __slots__ = ('value',)
+
+    _interned = ('value',)
+
     def __init__(self, value: str):
         """Initialize a boolean expression.
 
@@ -2054,6 +2998,8 @@ class BooleanExpression(LiteralValue):
 class NumericExpression(LiteralValue):
     """A numeric expression."""
 
+    __slots__ = ('value',)
+
     def __init__(self, value: int):
         """Initialize a new numeric expression.
 
@@ -2099,6 +3045,8 @@ class NumericExpression(LiteralValue):
 class Collection(LiteralValue):
     """A sequence of literal values."""
 
+    __slots__ = ('items', '_hash_stamp', '_hash_value')
+
     def __init__(self, items: List[Literal]):
         """Initialize a new collection.
 
@@ -2119,18 +3067,39 @@ class Collection(LiteralValue):
         """
         return tuple(self.items)
 
+    def _hash_version(self) -> int:
+        """Get the item list version.
+
+        Returns
+        -------
+        int
+            Item list version.
+        """
+        return getattr(self.items, '_version', 0)
+
+    def _structural_hash(self) -> int:
+        """Hash the item tuple.
+
+        Returns
+        -------
+        int
+            Hash value.
+        """
+        return hash(self._tuple())
+
     def __hash__(self) -> int:
         """Hash collection.
 
         Hash is computed by converting to a tuple and using the default
-        tuple hashing algorithm.
+        tuple hashing algorithm. The hash is cached until the collection or
+        its items change.
 
         Returns
         -------
         int
             Literal hash.
         """
-        return hash(self._tuple())
+        return self._cached_hash()
 
     def __eq__(self, other: Any) -> bool:
         """Determine equality between self and another object.
@@ -2155,6 +3124,8 @@ class Collection(LiteralValue):
 class FunctionCall(LiteralValue):
     """A function call literal."""
 
+    __slots__ = ('identifier', 'arguments', '_hash_stamp', '_hash_value')
+
     def __init__(self, identifier: str, arguments: List[Literal]):
         """Initialize a new function call literal value.
 
@@ -2166,7 +3137,7 @@ class FunctionCall(LiteralValue):
             Function arguments.
         """
         self.identifier = identifier
-        self.arguments = arguments
+        self.arguments = RestorableList(arguments)
 
     def _tuple(self):
         """Represent function call as a tuple.
@@ -2179,18 +3150,39 @@ class FunctionCall(LiteralValue):
         """
         return self.identifier, *self.arguments
 
+    def _hash_version(self) -> int:
+        """Get the argument list version.
+
+        Returns
+        -------
+        int
+            Argument list version.
+        """
+        return getattr(self.arguments, '_version', 0)
+
+    def _structural_hash(self) -> int:
+        """Hash the function call tuple.
+
+        Returns
+        -------
+        int
+            Hash value.
+        """
+        return hash(self._tuple())
+
     def __hash__(self) -> int:
         """Hash function call.
 
         Hash is computed by converting to a tuple and using the default
-        tuple hashing algorithm.
+        tuple hashing algorithm. The hash is cached until the function call
+        or its arguments change.
 
         Returns
         -------
         int
             Function call hash.
         """
-        return hash(self._tuple())
+        return self._cached_hash()
 
     def __eq__(self, other: Any) -> bool:
         """Determine equality between self and another object.
@@ -2213,6 +3205,8 @@ class FunctionCall(LiteralValue):
 class Signal(TraceLine):
     """An strace signal object."""
 
+    __slots__ = ('identifier', 'info')
+
     def __init__(self, identifier: str, info: str, *args, **kwargs):
         """Initialize a new signal.
 
@@ -2261,6 +3255,8 @@ class Signal(TraceLine):
 class ExitStatement(TraceLine):
     """An strace exit statement object."""
 
+    __slots__ = ('killed', 'exit_code')
+
     def __init__(self,
                  exit_code: Union[str, int],
                  killed: bool = False,
@@ -2307,3 +3303,172 @@ class ExitStatement(TraceLine):
         if not isinstance(other, ExitStatement):
             return NotImplemented
         return self.exit_code == other.exit_code
+
+
+class FlyweightStore:
+    """A store of trace objects shared between straces.
+
+    Many tracelines are identical across straces, such as the dynamic loader
+    syscalls at the start of every process. Sharing a store when loading
+    straces replaces each traceline, literal, and list with the one shared
+    instance that has the same type and attributes. Objects are only shared
+    if every attribute is equal, including pids and exit codes, so sharing
+    never changes a strace. Syscalls that differ only by pid still share
+    their arguments.
+
+    Shared objects must not be modified in place. Code that modifies
+    tracelines stores modified copies in a snapshot, see ``Strace.snapshot``
+    and ``DictRepr.replace``, which copies only the objects that change.
+    """
+
+    # Types of values that are compared by value
+    _primitive_types = (str, int, float, bool, type(None))
+
+    # Types of shared objects
+    _shared_types = (TraceLine, OmittedArguments, Literal, LiteralValue)
+
+    def __init__(self):
+        """Create an empty store."""
+        self._objects: Dict[Tuple[Any, ...], Any] = {}
+        self._memo: Dict[int, Tuple[Any, Tuple[Any, Any]]] = {}
+
+    def __len__(self) -> int:
+        """Get the number of shared objects.
+
+        Returns
+        -------
+        int
+            Number of shared objects.
+        """
+        return len(self._objects)
+
+    def share(self, strace: Strace) -> Strace:
+        """Replace the tracelines of an strace with shared instances.
+
+        Parameters
+        ----------
+        strace : Strace
+            Strace to share tracelines of. The strace is modified in place.
+
+        Returns
+        -------
+        Strace
+            The given strace, for chaining.
+        """
+        # Objects that occur more than once in the strace are only shared
+        # once. Values are kept in the memo so that their ids are not reused.
+        self._memo = {}
+        try:
+            trace_lines = [
+                self._share(line)[0] for line in strace.trace_lines
+            ]
+        finally:
+            self._memo = {}
+        strace.trace_lines[:] = trace_lines
+        return strace
+
+    def _share(self, value: Any) -> Tuple[Any, Any]:
+        """Get the shared instance of a value.
+
+        Children are shared first, so the key of an object can use the ids of
+        its shared children. Children of objects that cannot be shared are
+        still replaced with shared instances, which have equal attributes.
+
+        Parameters
+        ----------
+        value : Any
+            Value to share.
+
+        Returns
+        -------
+        Tuple[Any, Any]
+            Shared instance and its key part, or the value and
+            ``_UNSHAREABLE`` if it cannot be shared.
+        """
+        value_type = type(value)
+
+        # Strings and None are their own key parts. Other primitive values
+        # are keyed by type and value, so that 1, 1.0, and True are not
+        # confused with each other or with the ids of shared objects.
+        if value_type is str or value is None:
+            return value, value
+        if value_type in self._primitive_types:
+            return value, (value_type, value)
+
+        try:
+            return self._memo[id(value)][1]
+        except KeyError:
+            shared = self._share_object(value)
+            self._memo[id(value)] = (value, shared)
+            return shared
+
+    def _share_object(self, value: Any) -> Tuple[Any, Any]:
+        """Get the shared instance of a value that is not primitive.
+
+        Parameters
+        ----------
+        value : Any
+            Value to share.
+
+        Returns
+        -------
+        Tuple[Any, Any]
+            Shared instance and its key part, or the value and
+            ``_UNSHAREABLE`` if it cannot be shared.
+        """
+        value_type = type(value)
+
+        # Share lists and tuples of shareable items
+        if isinstance(value, (list, tuple)):
+            items = []
+            key = [value_type]
+            for item in value:
+                item, part = self._share(item)
+                items.append(item)
+                key.append(part)
+            if any(new is not old for new, old in zip(items, value)):
+                if isinstance(value, list):
+                    value[:] = items
+                else:
+                    value = value_type(items)
+            if _UNSHAREABLE in key:
+                return value, _UNSHAREABLE
+            return self._intern(value, tuple(key))
+
+        # Share trace objects with shareable attributes. Keys are flat tuples
+        # of alternating attribute names and key parts to keep the store
+        # small.
+        if isinstance(value, self._shared_types):
+            key = [value_type]
+            shareable = True
+            for name, attribute in value.__getstate__().items():
+                shared, part = self._share(attribute)
+                if shared is not attribute:
+                    object.__setattr__(value, name, shared)
+                shareable = shareable and part is not _UNSHAREABLE
+                key.append(name)
+                key.append(part)
+            if not shareable:
+                return value, _UNSHAREABLE
+            return self._intern(value, tuple(key))
+
+        # Other objects, such as executable parameters, are not shared
+        return value, _UNSHAREABLE
+
+    def _intern(self, value: Any, key: Tuple[Any, ...]) -> Tuple[Any, int]:
+        """Get the shared instance for a key, storing value if there is none.
+
+        Parameters
+        ----------
+        value : Any
+            Value with the key.
+        key : Tuple[Any, ...]
+            Value key.
+
+        Returns
+        -------
+        Tuple[Any, int]
+            Shared instance and its key part, which is its id.
+        """
+        shared = self._objects.setdefault(key, value)
+        return shared, id(shared)
@@ -1 +1,133 @@
 """Utilities for collecting straces from various utilities."""
+
+
+# Imports
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple
+
+from lib import logger
+from lib.strace import parser, util
+from lib.strace.classes import Strace
+
+
+# Types
+# A parse job is an strace file and the keyword arguments for parser.parse
+# that describe it. Jobs are picklable so they can be parsed in a process pool.
+ParseJob = Tuple[Path, Dict[str, Any]]
+
+
+def docker_compression_args(compression: Optional[str]) -> List[str]:
+    """Get Docker arguments that configure trace output compression.
+
+    Collector scripts read the ``TRACE_COMPRESSION`` environment variable
+    and compress trace files as they are written.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Compression format, ``gzip`` or ``xz``. Traces are written
+        uncompressed if None.
+
+    Raises
+    ------
+    ValueError
+        Raised if the compression format is not supported.
+
+    Returns
+    -------
+    List[str]
+        Arguments for ``docker run``.
+    """
+    if compression is None:
+        return []
+    if compression not in util.COMPRESSIONS:
+        raise ValueError(f'Unsupported trace compression: {compression}')
+    return ['-e', f'TRACE_COMPRESSION={compression}']
+
+
+def run_parse_job(job: ParseJob,
+                  parse_options: Optional[Dict[str, Any]] = None) -> Strace:
+    """Parse and normalize the strace for a parse job.
+
+    Parameters
+    ----------
+    job : ParseJob
+        Parse job produced by a collector.
+    parse_options : Optional[Dict[str, Any]]
+        Additional keyword arguments for ``parser.parse``.
+
+    Returns
+    -------
+    Strace
+        Parsed and normalized strace.
+    """
+    strace_file, kwargs = job
+    logger.info(f'Parsing {strace_file}')
+    return (
+        parser.parse(strace_file, **kwargs, **(parse_options or {}))
+        .normalize()
+    )
+
+
+def run_parse_jobs(jobs: Iterable[ParseJob],
+                   parse_options: Optional[Dict[str, Any]] = None
+                   ) -> Generator[Strace, None, None]:
+    """Parse and normalize the straces for parse jobs in order.
+
+    Parameters
+    ----------
+    jobs : Iterable[ParseJob]
+        Parse jobs produced by a collector.
+    parse_options : Optional[Dict[str, Any]]
+        Additional keyword arguments for ``parser.parse``.
+
+    Yields
+    ------
+    Strace
+        Parsed and normalized strace.
+    """
+    for job in jobs:
+        yield run_parse_job(job, parse_options)
+
+
+def run_ingest_job(job: ParseJob,
+                   parse_options: Optional[Dict[str, Any]] = None
+                   ) -> Tuple[Strace, str]:
+    """Parse and normalize the strace for a parse job, keeping its text.
+
+    The raw strace text is not part of the strace state, so it is returned
+    separately to be sent back from a worker process. Use ``with_text`` to
+    put it back on the strace.
+
+    Parameters
+    ----------
+    job : ParseJob
+        Parse job produced by a collector.
+    parse_options : Optional[Dict[str, Any]]
+        Additional keyword arguments for ``parser.parse``.
+
+    Returns
+    -------
+    Tuple[Strace, str]
+        Parsed and normalized strace, and its raw text.
+    """
+    strace = run_parse_job(job, {**(parse_options or {}), 'keep_text': True})
+    return strace, strace.text
+
+
+def with_text(result: Tuple[Strace, str]) -> Strace:
+    """Set the raw text of an strace returned by ``run_ingest_job``.
+
+    Parameters
+    ----------
+    result : Tuple[Strace, str]
+        Strace and its raw text.
+
+    Returns
+    -------
+    Strace
+        The strace with its raw text set.
+    """
+    strace, text = result
+    object.__setattr__(strace, 'text', text)
+    return strace
@@ -4,15 +4,17 @@
 # Imports
 from pathlib import Path
 from functools import partial
-from typing import Dict, Generator, Optional
+from typing import Callable, Dict, Generator, List, Optional
 import json
 import os
 import subprocess
 import sys
+import time
 
 from lib import logger
-from lib.strace import parser
+from lib.strace import parser, util
 from lib.strace.classes import Strace
+from lib.strace.collection import ParseJob, run_parse_jobs
 from lib.strace.paths import RAW_STRACES
 
 
@@ -39,37 +41,20 @@ def build_docker_image():
     )
 
 
-def collect_strace(playbook: Path,
-                   output_dir: Path,
-                   log_file: Optional[Path] = None,
-                   playbook_mount_source: Optional[Path] = None,
-                   env: Optional[Dict[str, str]] = None,):
-    """Collect straces from Ansible playbook tasks run in a Docker container.
+def _docker_command(playbook: Path,
+                    output_dir: Path,
+                    log_file: Optional[Path] = None,
+                    playbook_mount_source: Optional[Path] = None,
+                    env: Optional[Dict[str, str]] = None,
+                    compression: Optional[str] = None,) -> List[str]:
+    """Build the Docker command for collecting straces.
 
-    A single playbook or entire directory containing playbooks, roles, etc.
-    may be mounted into the container. The container image also provides
-    some playbooks that do not need to be mounted.
+    See ``collect_strace`` for parameter descriptions.
 
-    Parameters
-    ----------
-    playbook : Path
-        Path to the playbook to trace. This can be an absolute path to an
-        existing or mounted playbook, or a relative path in a directory
-        mounted to the default /source mount.
-    output_dir : Path
-        Path to the local output directory where traces will be stored. This
-        may be an absolute path, in which case it will be taken as is. If the
-        path is not absolute, it will be treated as relative to the default
-        output directory.
-    log_file : Path
-        Path to a log file for capturing stdout and stderr. Path will be
-        relative to the output directory
-    playbook_mount_source : Path
-        Path on the local system that will be mounted to the Docker container
-        for collection. It will be mounted to the destination specified by
-        ``playbook_mount_destination`` by default.
-    env : Optional[Dict[str, str]]
-        Additional environment variables to set.
+    Returns
+    -------
+    List[str]
+        Docker command.
     """
     # Get final output directory
     # If the original value of output_dir is an absolute path, this just
@@ -107,15 +92,113 @@ def collect_strace(playbook: Path,
     # Add flags
     if log_file:
         cmd.append(f'--log-file={log_file}')
+    if compression:
+        cmd.append(f'--compression={compression}')
 
     # Add positional arguments
     cmd.append(playbook)
 
+    return cmd
+
+
+def collect_strace(playbook: Path,
+                   output_dir: Path,
+                   log_file: Optional[Path] = None,
+                   playbook_mount_source: Optional[Path] = None,
+                   env: Optional[Dict[str, str]] = None,
+                   compression: Optional[str] = None,):
+    """Collect straces from Ansible playbook tasks run in a Docker container.
+
+    A single playbook or entire directory containing playbooks, roles, etc.
+    may be mounted into the container. The container image also provides
+    some playbooks that do not need to be mounted.
+
+    Parameters
+    ----------
+    playbook : Path
+        Path to the playbook to trace. This can be an absolute path to an
+        existing or mounted playbook, or a relative path in a directory
+        mounted to the default /source mount.
+    output_dir : Path
+        Path to the local output directory where traces will be stored. This
+        may be an absolute path, in which case it will be taken as is. If the
+        path is not absolute, it will be treated as relative to the default
+        output directory.
+    log_file : Path
+        Path to a log file for capturing stdout and stderr. Path will be
+        relative to the output directory
+    playbook_mount_source : Path
+        Path on the local system that will be mounted to the Docker container
+        for collection. It will be mounted to the destination specified by
+        ``playbook_mount_destination`` by default.
+    env : Optional[Dict[str, str]]
+        Additional environment variables to set.
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
+    # Build command
+    cmd = _docker_command(
+        playbook,
+        output_dir,
+        log_file=log_file,
+        playbook_mount_source=playbook_mount_source,
+        env=env,
+        compression=compression,
+    )
+
     # Run collection
     logger.info('Collecting strace')
     subprocess.run(cmd, stdout=sys.stdout, stderr=sys.stderr,)
 
 
+def collect_strace_live(playbook: Path,
+                        output_dir: Path,
+                        log_file: Optional[Path] = None,
+                        playbook_mount_source: Optional[Path] = None,
+                        env: Optional[Dict[str, str]] = None,
+                        parse_options: Optional[dict] = None,
+                        ) -> Generator[Strace, None, None]:
+    """Collect straces and parse them while the playbook is running.
+
+    Each module trace is parsed as it is written and yielded as soon as the
+    module exits, so traces are collected uncompressed. See
+    ``collect_strace`` for the collection parameters.
+
+    Parameters
+    ----------
+    parse_options : Optional[dict]
+        Parser ``engine`` and ``recover`` options. See ``parser.follow``.
+
+    Yields
+    ------
+    Strace
+        Parsed and normalized strace for each module, in execution order.
+    """
+    # Build command
+    cmd = _docker_command(
+        playbook,
+        output_dir,
+        log_file=log_file,
+        playbook_mount_source=playbook_mount_source,
+        env=env,
+    )
+
+    # Run collection in the background and follow its output
+    logger.info('Collecting strace')
+    process = subprocess.Popen(cmd, stdout=sys.stdout, stderr=sys.stderr,)
+    try:
+        yield from follow(
+            output_dir,
+            lambda: process.poll() is not None,
+            **(parse_options or {})
+        )
+    except BaseException:
+        process.terminate()
+        raise
+    finally:
+        process.wait()
+
+
 def collect(*args, **kwargs):
     """The same as collect_strace, but (re)build the Docker image first."""
     # (Re)build docker image first
@@ -125,8 +208,25 @@ def collect(*args, **kwargs):
     collect_strace(*args, **kwargs)
 
 
+def collect_live(*args, **kwargs) -> Generator[Strace, None, None]:
+    """The same as collect_strace_live, but (re)build the Docker image first.
+
+    Yields
+    ------
+    Strace
+        Parsed and normalized strace for each module.
+    """
+    # (Re)build docker image first
+    build_docker_image()
+
+    # Collect and parse straces
+    yield from collect_strace_live(*args, **kwargs)
+
+
 def parse(output_dir: Path,
-          start_at: str = None) -> Generator[Strace, None, None]:
+          start_at: str = None,
+          parse_options: Optional[dict] = None
+          ) -> Generator[Strace, None, None]:
     """Parse traces from an ansible playbook.
 
     Parameters
@@ -135,12 +235,33 @@ def parse(output_dir: Path,
         Location of the collection output directory.
     start_at : str
         Dataset to start at.
+    parse_options : Optional[dict]
+        Additional keyword arguments for ``parser.parse``.
 
     Yields
     ------
     Strace
         Parsed strace.
     """
+    yield from run_parse_jobs(parse_jobs(output_dir, start_at), parse_options)
+
+
+def parse_jobs(output_dir: Path,
+               start_at: str = None) -> Generator[ParseJob, None, None]:
+    """Find parse jobs for traces from an ansible playbook.
+
+    Parameters
+    ----------
+    output_dir : Path
+        Location of the collection output directory.
+    start_at : str
+        Dataset to start at.
+
+    Yields
+    ------
+    ParseJob
+        Strace file and strace attributes for each trace.
+    """
     # Get the final output directory.
     output_dir = TRACE_DIR / output_dir
     output_dir_name = output_dir.stem
@@ -162,59 +283,152 @@ def parse(output_dir: Path,
 
     # Process each module
     for module_dir in module_directories:
+        job = _module_parse_job(module_dir, output_dir_name)
+        if job is not None:
+            yield job
 
-        # Read module metadata
-        with open(module_dir / 'metadata.json') as metadata_fd:
-            metadata = json.load(metadata_fd)
 
-        logger.info(f'Parsing strace {metadata["index"]}: {metadata["name"]}')
+def _module_parse_job(module_dir: Path,
+                      output_dir_name: str) -> Optional[ParseJob]:
+    """Get the parse job for a traced module.
 
-        # Get execution result
-        result = metadata['result']
+    Parameters
+    ----------
+    module_dir : Path
+        Module output directory.
+    output_dir_name : str
+        Name of the collection output directory.
+
+    Returns
+    -------
+    Optional[ParseJob]
+        Strace file and strace attributes, or None if the module should be
+        skipped.
+    """
+    # Read module metadata
+    with open(module_dir / 'metadata.json') as metadata_fd:
+        metadata = json.load(metadata_fd)
+
+    logger.info(f'Parsing strace {metadata["index"]}: {metadata["name"]}')
+
+    # Get execution result
+    result = metadata['result']
+
+    # Skip failed modules
+    if result.get('rc', 0):
+        logger.warning('Module execution failed, skipping.')
+        return None
+
+    # Warn if not changed. Still parsing these for now.
+    stdout = result.get('stdout', None)
+    if isinstance(stdout, dict) and not stdout.get('changed', False):
+        logger.warning('Module execution did not change system state.')
+
+    # Log arguments.
+    arg_str = json.dumps(metadata["args"], indent=4, sort_keys=True)
+    logger.info(f'Definition:\n{metadata["module"]} {arg_str}')
+
+    # Get strace file path
+    strace_file = util.find_trace(module_dir / 'strace.txt')
+
+    # Skip if an strace file is not available.
+    # This can happen due to permissions issues in tracing.
+    if not os.access(strace_file, os.R_OK):
+        logger.warning('Cannot read strace file, skipping')
+        return None
+
+    # Return the parse job
+    return strace_file, {
+        'system': 'ansible',
+        'executable': metadata['module'],
+        'arguments': metadata['args'],
+        'collector': COLLECTOR_NAME,
+        'collector_assigned_id': f'{output_dir_name}/{metadata["index"]}',
+        'strace_file': strace_file,
+        'metadata': metadata,
+    }
+
+
+def follow(output_dir: Path,
+           finished: Callable[[], bool],
+           engine: str = 'antlr',
+           recover: bool = False) -> Generator[Strace, None, None]:
+    """Parse traces from an ansible playbook while it is being traced.
+
+    Module directories are followed in execution order. Each module trace is
+    parsed as it is written, and the strace is yielded once the module's
+    metadata file is written when it exits.
+
+    The collector cleans the output directory before running the playbook.
+    Entries left over from a previous collection are waited out so that
+    their traces are not parsed.
 
-        # Skip failed modules
-        if result.get('rc', 0):
-            logger.warning('Module execution failed, skipping.')
-            continue
+    Parameters
+    ----------
+    output_dir : Path
+        Location of the collection output directory.
+    finished : Callable[[], bool]
+        Returns true once the collector has exited.
+    engine : str
+        Parser engine. See ``parser.parse``.
+    recover : bool
+        If true, skip lines that cannot be parsed. See ``parser.parse``.
 
-        # Warn if not changed. Still parsing these for now.
-        stdout = result.get('stdout', None)
-        if isinstance(stdout, dict) and not stdout.get('changed', False):
-            logger.warning('Module execution did not change system state.')
+    Yields
+    ------
+    Strace
+        Parsed and normalized strace for each module.
+    """
+    # Get the final output directory.
+    output_dir = TRACE_DIR / output_dir
+    output_dir_name = output_dir.stem
 
-        # Log arguments.
-        arg_str = json.dumps(metadata["args"], indent=4, sort_keys=True)
-        logger.info(f'Definition:\n{metadata["module"]} {arg_str}')
+    logger.info(f'Following straces for {COLLECTOR_NAME} at {output_dir}')
 
-        # Get strace file path
-        strace_file = module_dir / 'strace.txt'
+    # Entries from a previous collection
+    stale = set(output_dir.iterdir()) if output_dir.exists() else set()
 
-        # Skip if an strace file is not available.
-        # This can happen due to permissions issues in tracing.
-        if not os.access(strace_file, os.R_OK):
-            logger.warning('Cannot read strace file, skipping')
-            continue
-
-        # Parse
-        logger.info('Parsing strace file...')
-        strace = parser.parse(
-            strace_file,
-            system='ansible',
-            executable=metadata['module'],
-            arguments=metadata['args'],
-            collector=COLLECTOR_NAME,
-            collector_assigned_id=f'{output_dir_name}/{metadata["index"]}',
-            strace_file=strace_file,
-            metadata=metadata,
-        )
+    index = 0
+    while True:
 
-        # Normalize
-        logger.info('Normalizing strace...')
-        strace = strace.normalize()
+        # Check if the collector is done before looking for new modules, so
+        # that modules started before it exited are not missed.
+        done = finished()
 
-        # Log parsing completion and yield parsed and normalized trace
-        logger.info('Done')
-        yield strace
+        # Wait for the collector to clean the output directory
+        stale = {path for path in stale if path.exists()}
+
+        # Module files
+        module_dir = output_dir / str(index)
+        strace_file = module_dir / 'strace.txt'
+        metadata_file = module_dir / 'metadata.json'
+
+        # Parse the module trace as it is written
+        if not stale and strace_file.exists():
+            strace = parser.follow(
+                strace_file,
+                lambda: metadata_file.exists() or finished(),
+                engine=engine,
+                recover=recover,
+            )
+            if metadata_file.exists():
+                job = _module_parse_job(module_dir, output_dir_name)
+                if job is not None:
+                    yield parser.set_attributes(strace, **job[1]).normalize()
+            else:
+                logger.warning(f'No metadata for module {index}, skipping.')
+            index += 1
+
+        # Skip modules that exited before tracing started
+        elif not stale and metadata_file.exists():
+            logger.warning(f'No strace file for module {index}, skipping.')
+            index += 1
+
+        # Stop once the collector is done, or wait for the next module
+        elif done:
+            break
+        else:
+            time.sleep(parser.FOLLOW_INTERVAL)
 
 
 # Specific collectors and parsers
@@ -229,3 +443,14 @@ parse_debops = partial(
     parse,
     output_dir='debops'
 )
+parse_debops_jobs = partial(
+    parse_jobs,
+    output_dir='debops'
+)
+collect_debops_live = partial(
+    collect_live,
+    playbook=Path('/debops-ansible/playbooks/site.yml'),
+    output_dir='debops',
+    env={'ANSIBLE_ROLES_PATH': '/debops-ansible/roles/'},
+    log_file='ansible.log',
+)
@@ -47,12 +47,14 @@ DEFAULT_EXCLUDED_MODULES = frozenset({
     'command', 'setup', 'service', 'shell', 'systemd', 'sysvinit',
 })
 ANSIBLE_NOCOLOR = 'ANSIBLE_NOCOLOR'
+COMPRESSIONS = {'gzip': '.gz', 'xz': '.xz'}
 
 
 @contextmanager
 def execute_with_strace(output_dir: Path = DEFAULT_OUTPUT_DIR,
                         excluded_modules: Optional[Set[str]]
-                        = DEFAULT_EXCLUDED_MODULES):
+                        = DEFAULT_EXCLUDED_MODULES,
+                        compression: Optional[str] = None):
     """Strace ansible module invocations.
 
     This context manager patches Ansible's ActionBase and StrategyBase classes
@@ -64,6 +66,8 @@ def execute_with_strace(output_dir: Path = DEFAULT_OUTPUT_DIR,
         Directory for strace output.
     excluded_modules : Optional[Set[str]]
         Modules that will not be traced.
+    compression : Optional[str]
+        Compress strace output with ``gzip`` or ``xz`` as it is written.
     """
     # Make output directory if it doesn't already exist
     output_dir.mkdir(exist_ok=True, parents=True)
@@ -72,6 +76,14 @@ def execute_with_strace(output_dir: Path = DEFAULT_OUTPUT_DIR,
     if excluded_modules is None:
         excluded_modules = frozenset()
 
+    # Output compression pipe and strace file name
+    if compression:
+        compress = f'| {compression} '
+        strace_name = f'strace.txt{COMPRESSIONS[compression]}'
+    else:
+        compress = ''
+        strace_name = 'strace.txt'
+
     # Clean output directory (remove all subdirectories and files)
     for path in output_dir.glob('*'):
         if path.is_dir():
@@ -190,7 +202,7 @@ def execute_with_strace(output_dir: Path = DEFAULT_OUTPUT_DIR,
                 cmd = (
                     f'strace -DDD -f -y -yy -X raw -I 2 -o "| awk '
                     f'\'NR>{MAX_ROWS}{{print "\\""TRUNCATED"\\""; exit}}; '
-                    f'{{print}}\' > {module_dir / "strace.txt"}" '
+                    f'{{print}}\' {compress}> {module_dir / strace_name}" '
                     f'-e trace=!close {cmd}'
                 )
                 print(f'    Modified Command: {cmd}')
@@ -357,7 +369,8 @@ def trace_playbook(playbook: Path,
                    source_dir: Path = DEFAULT_SOURCE_DIR,
                    excluded_modules: Optional[Set[str]]
                    = DEFAULT_EXCLUDED_MODULES,
-                   no_trace: bool = False,):
+                   no_trace: bool = False,
+                   compression: Optional[str] = None,):
     """Trace modules in an Ansible playbook using strace.
 
     Parameters
@@ -376,6 +389,8 @@ def trace_playbook(playbook: Path,
     no_trace : bool
         Run playbook without tracing modules. This is useful for debugging
         purposes, because tracing takes a long time.
+    compression : Optional[str]
+        Compress strace output with ``gzip`` or ``xz`` as it is written.
     """
     # Normalize playbook path
     playbook = source_dir / playbook
@@ -389,6 +404,7 @@ def trace_playbook(playbook: Path,
             stack.enter_context(execute_with_strace(
                 output_dir=output_dir,
                 excluded_modules=excluded_modules,
+                compression=compression,
             ))
 
         # Temporary inventory file context.
@@ -455,6 +471,11 @@ def main():
         help='Path to a log file for capturing stdout and stderr. Path will '
              'be relative to the output directory.',
     )
+    parser.add_argument(
+        '--compression',
+        choices=sorted(COMPRESSIONS),
+        help='Compress strace output as it is written.',
+    )
     parser.add_argument(
         '--exclude',
         nargs='+',
@@ -482,6 +503,7 @@ def main():
         source_dir=argv.source_dir,
         no_trace=argv.no_trace,
         excluded_modules=argv.exclude,
+        compression=argv.compression,
     )
 
 
@@ -9,13 +9,18 @@ except for hole valued syscall arguments.
 # Imports
 from itertools import combinations
 from pathlib import Path
-from typing import Dict, Generator, Iterable, List, Set, Tuple, Union
+from typing import (
+    Dict, Generator, Iterable, List, Optional, Set, Tuple, Union
+)
 import subprocess
 
 
 from lib import logger
-from lib.strace import parser, util
+from lib.strace import util
 from lib.strace.classes import Strace, Syscall, StringLiteral
+from lib.strace.collection import (
+    ParseJob, docker_compression_args, run_parse_jobs
+)
 from lib.strace.paths import RAW_STRACES
 
 
@@ -80,10 +85,16 @@ def build_ansible_docker_image():
     )
 
 
-def collect_ansible_strace():
-    """Collect straces for Ansbile modules."""
+def collect_ansible_strace(compression: Optional[str] = None):
+    """Collect straces for Ansbile modules.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
     logger.info('Removing old Ansible traces.')
-    for trace in ANSIBLE_TRACE_DIR.glob('**/*.txt'):
+    for trace in util.glob_traces(ANSIBLE_TRACE_DIR, '**/*.txt'):
         trace.unlink()
 
     logger.info('Collecting Ansible strace.')
@@ -91,6 +102,7 @@ def collect_ansible_strace():
         [
             'docker', 'run', '--privileged', '--rm', '-it',
             '-v', f'{ANSIBLE_TRACE_DIR}:/traces',
+            *docker_compression_args(compression),
             ANSIBLE_DOCKER_IMAGE
         ],
         stdout=subprocess.DEVNULL,
@@ -109,10 +121,16 @@ def build_linux_docker_image():
     )
 
 
-def collect_linux_strace():
-    """Collect straces for Linux commands."""
+def collect_linux_strace(compression: Optional[str] = None):
+    """Collect straces for Linux commands.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
     logger.info('Removing old Linux traces.')
-    for trace in LINUX_TRACE_DIR.glob('**/*.txt'):
+    for trace in util.glob_traces(LINUX_TRACE_DIR, '**/*.txt'):
         trace.unlink()
 
     logger.info('Collecting Linux strace.')
@@ -120,6 +138,7 @@ def collect_linux_strace():
         [
             'docker', 'run', '--privileged', '--rm', '-it',
             '-v', f'{LINUX_TRACE_DIR}:/traces',
+            *docker_compression_args(compression),
             LINUX_DOCKER_IMAGE
         ],
         stdout=subprocess.DEVNULL,
@@ -127,32 +146,56 @@ def collect_linux_strace():
     )
 
 
-def collect():
-    """Collect straces for all."""
+def collect(compression: Optional[str] = None):
+    """Collect straces for all.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
     build_ansible_docker_image()
-    collect_ansible_strace()
+    collect_ansible_strace(compression=compression)
 
     build_linux_docker_image()
-    collect_linux_strace()
+    collect_linux_strace(compression=compression)
 
 
-def parse(*args, **kwargs) -> Generator[Strace, None, None]:
+def parse(*args,
+          parse_options: Optional[dict] = None,
+          **kwargs) -> Generator[Strace, None, None]:
     """Parse all straces for this collector.
 
+    Parameters
+    ----------
+    parse_options : Optional[dict]
+        Additional keyword arguments for ``parser.parse``.
+
     Yields
     ------
     Strace
         Parsed strace.
     """
+    yield from run_parse_jobs(parse_jobs(), parse_options)
+
+
+def parse_jobs(*args, **kwargs) -> Generator[ParseJob, None, None]:
+    """Find parse jobs for all straces for this collector.
+
+    Yields
+    ------
+    ParseJob
+        Strace file and strace attributes for each trace.
+    """
     logger.info(f'Parsing traces for {COLLECTOR_NAME}.')
-    yield from _parse_system('ansible', ANSIBLE_MODULES)
-    yield from _parse_system('linux', LINUX_EXECUTABLES)
+    yield from _parse_system_jobs('ansible', ANSIBLE_MODULES)
+    yield from _parse_system_jobs('linux', LINUX_EXECUTABLES)
 
 
-def _parse_system(system: str,
-                  data: List[Tuple[str, Union[List[str], dict], str]]
-                  ) -> Generator[Strace, None, None]:
-    """Parse all traces for a system.
+def _parse_system_jobs(system: str,
+                       data: List[Tuple[str, Union[List[str], dict], str]]
+                       ) -> Generator[ParseJob, None, None]:
+    """Find parse jobs for all traces for a system.
 
     Parameters
     ----------
@@ -163,8 +206,8 @@ def _parse_system(system: str,
 
     Yields
     ------
-    List[Strace]
-        All parsed straces.
+    ParseJob
+        Strace file and strace attributes for each trace.
     """
     # Compute the strace dir
     system_trace_dir = TRACE_DIR / system
@@ -177,22 +220,19 @@ def _parse_system(system: str,
         exe_trace_dir = system_trace_dir / name
 
         # Parse each strace file provided for the executable.
-        for strace_file in exe_trace_dir.glob('*.txt'):
-
-            logger.info(f'Parsing trace {strace_file.stem}')
-            yield (
-                parser.parse(
-                    strace_file,
-                    system=system,
-                    executable=exe,
-                    arguments=args,
-                    collector=COLLECTOR_NAME,
-                    collector_assigned_id=f'{name}/{strace_file.stem}',
-                    strace_file=strace_file,
-                    metadata={}
-                )
-                .normalize()
-            )
+        for strace_file in util.glob_traces(exe_trace_dir, '*.txt'):
+
+            stem = util.trace_stem(strace_file)
+            logger.info(f'Parsing trace {stem}')
+            yield strace_file, {
+                'system': system,
+                'executable': exe,
+                'arguments': args,
+                'collector': COLLECTOR_NAME,
+                'collector_assigned_id': f'{name}/{stem}',
+                'strace_file': strace_file,
+                'metadata': {},
+            }
 
 
 def find_holes(strace_sets: Iterable[Iterable[Strace]]) -> Dict[str, Set[int]]:
@@ -293,6 +333,12 @@ def _find_syscall_holes(s1: Syscall, s2: Syscall) -> Set[int]:
     Set[int]
         Indices of different arguments.
     """
+    # Syscalls with the same raw argument text have equal arguments, so
+    # there is no need to parse them.
+    argument_text = s1.argument_text
+    if argument_text is not None and argument_text == s2.argument_text:
+        return set()
+
     indices = set()
     for idx, (a, b) in enumerate(zip(s1.arguments, s2.arguments)):
 
@@ -3,12 +3,15 @@
 
 # Imports
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Optional
 import subprocess
 
 from lib import logger
-from lib.strace import parser
+from lib.strace import util
 from lib.strace.classes import Strace
+from lib.strace.collection import (
+    ParseJob, docker_compression_args, run_parse_jobs
+)
 from lib.strace.paths import RAW_STRACES
 
 
@@ -117,10 +120,16 @@ def build_docker_image():
     )
 
 
-def collect_strace():
-    """Collect straces."""
+def collect_strace(compression: Optional[str] = None):
+    """Collect straces.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
     logger.info('Removing old strace files.')
-    for trace in TRACE_DIR.glob('*.txt'):
+    for trace in util.glob_traces(TRACE_DIR, '*.txt'):
         trace.unlink()
 
     logger.info('Collecting Linux strace.')
@@ -128,6 +137,7 @@ def collect_strace():
         [
             'docker', 'run', '--privileged', '--rm', '-it',
             '-v', f'{TRACE_DIR}:/traces',
+            *docker_compression_args(compression),
             DOCKER_IMAGE
         ],
         stdout=subprocess.DEVNULL,
@@ -135,40 +145,60 @@ def collect_strace():
     )
 
 
-def collect():
-    """(Re)build docker images and collect straces."""
+def collect(compression: Optional[str] = None):
+    """(Re)build docker images and collect straces.
+
+    Parameters
+    ----------
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
+    """
     build_docker_image()
-    collect_strace()
+    collect_strace(compression=compression)
 
 
-def parse(*args, **kwargs) -> Generator[Strace, None, None]:
+def parse(*args,
+          parse_options: Optional[dict] = None,
+          **kwargs) -> Generator[Strace, None, None]:
     """Parse straces.
 
+    Parameters
+    ----------
+    parse_options : Optional[dict]
+        Additional keyword arguments for ``parser.parse``.
+
     Yields
     ------
     Strace
         Parsed strace.
     """
+    yield from run_parse_jobs(parse_jobs(), parse_options)
+
+
+def parse_jobs(*args, **kwargs) -> Generator[ParseJob, None, None]:
+    """Find parse jobs for straces.
+
+    Yields
+    ------
+    ParseJob
+        Strace file and strace attributes for each trace.
+    """
     logger.info(f'Parsing straces for {COLLECTOR_NAME}')
 
     # Parse traces
     for trace_data in TRACES:
 
         # Compute values
-        strace_file = TRACE_DIR / trace_data['strace_file']
+        strace_file = util.find_trace(TRACE_DIR / trace_data['strace_file'])
         collector_assigned_id = Path(trace_data['strace_file']).stem
 
         # Log and parse
         logger.info(f'Parsing {collector_assigned_id}')
-        yield (
-            parser.parse(
-                strace_file,
-                system=trace_data['system'],
-                executable=trace_data['executable'],
-                arguments=trace_data['arguments'],
-                collector=COLLECTOR_NAME,
-                collector_assigned_id=collector_assigned_id,
-                strace_file=strace_file,
-            )
-            .normalize()
-        )
+        yield strace_file, {
+            'system': trace_data['system'],
+            'executable': trace_data['executable'],
+            'arguments': trace_data['arguments'],
+            'collector': COLLECTOR_NAME,
+            'collector_assigned_id': collector_assigned_id,
+            'strace_file': strace_file,
+        }
@@ -23,8 +23,11 @@ from sqlalchemy import select, tuple_
 from sqlalchemy.engine.result import RowProxy
 
 from lib import logger
-from lib.strace import parser
+from lib.strace import util
 from lib.strace.classes import Strace
+from lib.strace.collection import (
+    ParseJob, docker_compression_args, run_parse_jobs
+)
 from lib.strace.paths import RAW_STRACES
 from lib.strace.tables import (
     untraced_executables as t_untraced_executables,
@@ -129,7 +132,8 @@ def build_docker_image():
     )
 
 
-def collect_straces(untraced: Optional[list] = None, ):
+def collect_straces(untraced: Optional[list] = None,
+                    compression: Optional[str] = None):
     """Collect straces for all untraced executables.
 
     By default, collect_straces will collect straces for all executables in
@@ -147,6 +151,8 @@ def collect_straces(untraced: Optional[list] = None, ):
         If provided, it will be used as the source list of untraced
         executables. It will still be filtered to exclude those that already
         have a trace in the dozer database.
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
     """
     # Get filtered executable definitions.
     # Convert to a list of RowProxy so we can use len.
@@ -196,7 +202,8 @@ def collect_straces(untraced: Optional[list] = None, ):
             subprocess.run(
                 [
                     'docker', 'run', '--privileged', '--rm', '-it',
-                    '-v', f'{strace_dir}:/traces', DOCKER_IMAGE,
+                    '-v', f'{strace_dir}:/traces',
+                    *docker_compression_args(compression), DOCKER_IMAGE,
                     cmd_str, 'strace.txt', setup
                 ],
                 capture_output=True,
@@ -227,7 +234,8 @@ def collect_straces(untraced: Optional[list] = None, ):
     logger.info('Done.')
 
 
-def collect(subset: Optional[list] = None):
+def collect(subset: Optional[list] = None,
+            compression: Optional[str] = None):
     """(Re)build the docker image and collect traces.
 
     Parameters
@@ -236,19 +244,39 @@ def collect(subset: Optional[list] = None):
         List of executable definitions. Each object must have `system`,
         `executable`, and `arguments` attributes. If provided, untraced
         executables must also appear in this list.
+    compression : Optional[str]
+        Trace file compression format, ``gzip`` or ``xz``.
     """
     build_docker_image()
-    collect_straces(untraced=subset)
+    collect_straces(untraced=subset, compression=compression)
 
 
-def parse(*args, **kwargs) -> Generator[Strace, None, None]:
+def parse(*args,
+          parse_options: Optional[dict] = None,
+          **kwargs) -> Generator[Strace, None, None]:
     """Parse straces.
 
+    Parameters
+    ----------
+    parse_options : Optional[dict]
+        Additional keyword arguments for ``parser.parse``.
+
     Yields
     ------
     Strace
         Parsed strace.
     """
+    yield from run_parse_jobs(parse_jobs(), parse_options)
+
+
+def parse_jobs(*args, **kwargs) -> Generator[ParseJob, None, None]:
+    """Find parse jobs for straces.
+
+    Yields
+    ------
+    ParseJob
+        Strace file and strace attributes for each trace.
+    """
     # Get all trace directories
     strace_dirs = list(OUTPUT_DIR.glob('*/'))
 
@@ -258,10 +286,10 @@ def parse(*args, **kwargs) -> Generator[Strace, None, None]:
 
     # Process each output.
     logger.info(f'Parsing traces for {COLLECTOR_NAME}...')
-    for strace_dir in OUTPUT_DIR.glob('*/'):
+    for strace_dir in sorted(OUTPUT_DIR.glob('*/')):
 
         # Get path to strace file.
-        strace_file = strace_dir / 'strace.txt'
+        strace_file = util.find_trace(strace_dir / 'strace.txt')
         if not strace_file.exists():
             logger.warning(f'No strace file for {strace_dir.name}')
             continue
@@ -283,17 +311,13 @@ def parse(*args, **kwargs) -> Generator[Strace, None, None]:
 
         # Parse.
         logger.info(f'Parsing {strace_dir.name}')
-        yield (
-            parser.parse(
-                strace_file,
-                system=metadata['system'],
-                executable=metadata['executable'],
-                arguments=metadata['arguments'],
-                collector=COLLECTOR_NAME,
-                collector_assigned_id=strace_dir.name,
-                strace_file=strace_file,
-            )
-            .normalize()
-        )
+        yield strace_file, {
+            'system': metadata['system'],
+            'executable': metadata['executable'],
+            'arguments': metadata['arguments'],
+            'collector': COLLECTOR_NAME,
+            'collector_assigned_id': strace_dir.name,
+            'strace_file': strace_file,
+        }
 
     logger.info('Done.')
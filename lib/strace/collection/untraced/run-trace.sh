@@ -6,6 +6,14 @@ ITERATIONS=20
 MAX_ROWS=50000
 TRACE_DIR='/traces'
 
+# Output compression. TRACE_COMPRESSION may be gzip or xz, otherwise traces
+# are written uncompressed.
+case "$TRACE_COMPRESSION" in
+  gzip) COMPRESS='| gzip' EXTENSION='.gz' ;;
+  xz) COMPRESS='| xz' EXTENSION='.xz' ;;
+  *) COMPRESS='' EXTENSION='' ;;
+esac
+
 
 trace() {
 
@@ -29,7 +37,8 @@ trace() {
   # -I 2    Block signals while decoding syscalls (kills tracer when awk exits).
   # -o      Print up to MAX_ROWS number or rows to the output file and exit.
   #         Print TRUNCATED if the entire trace is not printed.
-  bash -c "strace -DDD -f -y -yy -X raw -I 2 -o "\""| awk 'NR>$MAX_ROWS{print "\"\\\"\""TRUNCATED"\"\\\"\""; exit}; {print}' > $output_file"\"" $cmd"
+  #         Compress the output if TRACE_COMPRESSION is set.
+  bash -c "strace -DDD -f -y -yy -X raw -I 2 -o "\""| awk 'NR>$MAX_ROWS{print "\"\\\"\""TRUNCATED"\"\\\"\""; exit}; {print}' $COMPRESS > $output_file$EXTENSION"\"" $cmd"
 
 }
 
@@ -8,7 +8,6 @@ from sqlalchemy.sql import or_
 
 from lib import logger
 from lib.strace import manager
-from lib.strace.classes import RestoreCheckpoint
 from lib.strace.comparison.preprocessing import (
     AnsibleStripLastWrite,
     ReplaceFileDescriptors,
@@ -98,7 +97,6 @@ compare = compare_nic
 compare_no_preprocessing = compare_nic_no_preprocessing
 
 
-@RestoreCheckpoint()
 def load_and_compare(s1, s2, load=False,
                      by: ScoringMethod = compare_no_preprocessing,
                      global_preprocessors: Iterable[SinglePreprocessor] =
@@ -147,6 +145,11 @@ def load_and_compare(s1, s2, load=False,
         all_traces = manager.traces(where=or_(s1, s2, load))
     logger.info('Done loading traces.')
 
+    # Preprocess snapshots of the loaded traces.
+    all_traces, s1_traces, s2_traces = manager.snapshots(
+        all_traces, s1_traces, s2_traces
+    )
+
     # Preprocess.
     logger.info('Preprocessing...')
     for preprocessor in global_preprocessors:
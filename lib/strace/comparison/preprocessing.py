@@ -4,7 +4,9 @@
 # Imports
 from contextlib import nullcontext
 from functools import reduce
-from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+)
 import operator
 import os
 import re
@@ -18,6 +20,7 @@ from lib.strace.classes import (
     IPFileDescriptor,
     NumberLiteral,
     PathFileDescriptor,
+    RestorableList,
     Strace,
     StringLiteral,
     SyntheticValue,
@@ -103,7 +106,7 @@ class PunchHoles(SinglePreprocessor):
         holes = manager.holes()
 
         # Process all lines
-        for line in s.trace_lines:
+        for line_idx, line in enumerate(s.trace_lines):
 
             # Do nothing if line is not a syscall
             if not isinstance(line, Syscall):
@@ -115,14 +118,17 @@ class PunchHoles(SinglePreprocessor):
 
             # Punch holes
             for idx in holes[line.name]:
-                line.arguments[idx].value = Hole()
+                line = line.replace_argument_value(idx, Hole())
+            s.trace_lines[line_idx] = line
 
 
 class ReplaceFileDescriptors(SinglePreprocessor):
     """Replaces file descriptors with the name of the referenced file.
 
     If this class has a ``_process_<name>`` method matching a syscall, then
-    it will be invoked on the syscall. All other syscalls are skipped.
+    it will be invoked on the syscall. All other syscalls are skipped. Process
+    methods return a modified copy of the syscall, or None if the syscall is
+    unchanged.
     """
 
     def _preprocess(self, s: Strace, *args, **kwargs):
@@ -141,7 +147,7 @@ class ReplaceFileDescriptors(SinglePreprocessor):
         fd_tables = {}
 
         # Process each syscall.
-        for syscall in s.trace_lines:
+        for idx, syscall in enumerate(s.trace_lines):
 
             # Inherit file descriptors for clone and fork. Tables are distinct
             # unless the flag CLONE_FILES is set, in which case the child
@@ -177,24 +183,34 @@ class ReplaceFileDescriptors(SinglePreprocessor):
 
             # Process
             if hasattr(self, function_name):
-                getattr(self, function_name)(syscall, fd_tables[syscall.pid])
+                replacement = getattr(self, function_name)(
+                    syscall, fd_tables[syscall.pid]
+                )
+                if replacement is not None:
+                    s.trace_lines[idx] = replacement
 
-    def _replace_first(self, s: Syscall, fd: Dict[int, str]):
+    def _replace_first(self, s: Syscall,
+                       fd: Dict[int, str]) -> Optional[Syscall]:
         """Replace the first argument of a syscall with a file path.
 
         Parameters
         ----------
         s: Syscall
-            Syscall to modify.
+            Syscall to process.
         fd : Dict[int, str]
             Mapping of file descriptors to file names.
+
+        Returns
+        -------
+        Optional[Syscall]
+            Modified copy of the syscall, or None if it is unchanged.
         """
         # Get fd
         arg_fd = s.arguments[0].value.value
 
         # Replace if the fd is a known file
         if arg_fd in fd:
-            s.arguments[0].value = StringLiteral(fd[arg_fd])
+            return s.replace_argument_value(0, StringLiteral(fd[arg_fd]))
 
     _process_connect = _replace_first
     _process_faccessat = _replace_first
@@ -233,13 +249,13 @@ class ReplaceFileDescriptors(SinglePreprocessor):
     def _process_close(self, s: Syscall, fd: Dict[int, str]):
         arg_fd = s.arguments[0].value.value
         if arg_fd in fd:
-            s.arguments[0].value = StringLiteral(fd[arg_fd])
-            del fd[arg_fd]
+            path = fd.pop(arg_fd)
+            return s.replace_argument_value(0, StringLiteral(path))
 
     def _process_dup(self, s: Syscall, fd: Dict[int, str]):
         # Do nothing on error
         if s.exit_code == -1:
-            return s
+            return
 
         # Get old and new fd
         old_fd = s.arguments[0].value.value
@@ -247,8 +263,8 @@ class ReplaceFileDescriptors(SinglePreprocessor):
 
         # Duplicate fd
         if old_fd in fd:
-            s.arguments[0].value = StringLiteral(fd[old_fd])
             fd[new_fd] = fd[old_fd]
+            return s.replace_argument_value(0, StringLiteral(fd[old_fd]))
 
     _process_dup2 = _process_dup
     _process_dup3 = _process_dup
@@ -268,8 +284,10 @@ class ReplaceFileDescriptors(SinglePreprocessor):
             old_fd = s.arguments[0].value.value
             new_fd = s.exit_code
             if old_fd in fd:
-                s.arguments[0].value = StringLiteral(fd[old_fd])
                 fd[new_fd] = fd[old_fd]
+                return s.replace_argument_value(
+                    0, StringLiteral(fd[old_fd])
+                )
 
     _process_fcntl64 = _process_fcntl
 
@@ -297,44 +315,61 @@ class ReplaceFileDescriptors(SinglePreprocessor):
 
         # Replace dir_fd
         if dir_fd in fd:
-            s.arguments[0].value = StringLiteral(fd[dir_fd])
+            return s.replace_argument_value(0, StringLiteral(fd[dir_fd]))
 
     def _process_pipe(self, s: Syscall, fd: Dict[int, str]):
-        pipe_fds = s.arguments[0].value.items
+        pipe_fds = RestorableList(s.arguments[0].value.items)
 
         fd[pipe_fds[0].value] = 'pipe_read'
-        pipe_fds[0].value = StringLiteral('pipe_read')
+        pipe_fds[0] = pipe_fds[0].replace(value=StringLiteral('pipe_read'))
 
         fd[pipe_fds[1].value] = 'pipe_write'
-        pipe_fds[1].value = StringLiteral('pipe_write')
+        pipe_fds[1] = pipe_fds[1].replace(value=StringLiteral('pipe_write'))
+
+        return s.replace_argument_value(
+            0, s.arguments[0].value.replace(items=pipe_fds)
+        )
 
     _process_pipe2 = _process_pipe
 
     def _process_poll(self, s: Syscall, fd: Dict[int, str]):
-        for poll in s.arguments[0].value.items:
+        polls = RestorableList(s.arguments[0].value.items)
+        for idx, poll in enumerate(polls):
             if poll.dictionary['fd'] in fd:
-                poll.dictionary['fd'] = fd[poll.dictionary['fd']]
+                polls[idx] = poll.replace(dictionary={
+                    **poll.dictionary,
+                    'fd': fd[poll.dictionary['fd']],
+                })
+        return s.replace_argument_value(
+            0, s.arguments[0].value.replace(items=polls)
+        )
 
     _process_ppoll = _process_poll
 
     def _process_renameat(self, s: Syscall, fd: Dict[int, str]):
         old_dir_fd = s.arguments[0].value.value
         if old_dir_fd in fd:
-            s.arguments[0].value = StringLiteral(fd[old_dir_fd])
+            s = s.replace_argument_value(0, StringLiteral(fd[old_dir_fd]))
 
         new_dir_fd = s.arguments[2].value.value
         if new_dir_fd in fd:
-            s.arguments[2].value = StringLiteral(fd[new_dir_fd])
+            s = s.replace_argument_value(2, StringLiteral(fd[new_dir_fd]))
+
+        return s
 
     _process_renameat2 = _process_renameat
 
     def _process_select(self, s: Syscall, fd: Dict[int, str]):
-        for arg in s.arguments[1:4]:
-            fds = arg.value.items
+        for arg_idx in range(1, min(len(s.arguments), 4)):
+            fds = RestorableList(s.arguments[arg_idx].value.items)
             for idx, item in enumerate(fds):
                 arg_fd = item.value
                 if arg_fd in fd:
                     fds[idx] = fd[arg_fd]
+            s = s.replace_argument_value(
+                arg_idx, s.arguments[arg_idx].value.replace(items=fds)
+            )
+        return s
 
     _process_pselect = _process_select
 
@@ -454,6 +489,29 @@ class StripGlobalSyscallsBySystem(SinglePreprocessor):
                 idx += 1
 
 
+def _replace_primitive(s: Syscall, index: int, value: Any) -> Syscall:
+    """Replace the primitive value of a syscall argument.
+
+    Parameters
+    ----------
+    s : Syscall
+        Syscall to process.
+    index : int
+        Argument index.
+    value : Any
+        New primitive value.
+
+    Returns
+    -------
+    Syscall
+        Copy of the syscall with a copy of the argument value holding the new
+        primitive value.
+    """
+    return s.replace_argument_value(
+        index, s.arguments[index].value.replace(value=value)
+    )
+
+
 def _is_fileglob_match(argument_str: str, parameter_str: str) -> bool:
     """Determine if a syscall argument matches a file glob parameter.
 
@@ -611,24 +669,29 @@ class GenerateSyntheticValues(SinglePreprocessor):
         used_parameters = {}
 
         # Replace values in syscall arguments
-        for syscall in s.trace_lines:
+        for idx, syscall in enumerate(s.trace_lines):
 
             # All executable parameters used in the current syscall
             syscall_used_parameters = {}
 
             # Replace all values in the syscall arguments
+            arguments = RestorableList()
             for arg in syscall.arguments:
-                syscall_used_parameters.update(
-                    self._replace_values_literal(
-                        arg, executable_parameters
-                    )
+                arg, arg_used_parameters = self._replace_values_literal(
+                    arg, executable_parameters
                 )
+                arguments.append(arg)
+                syscall_used_parameters.update(arg_used_parameters)
 
-            # If any parameters were used by the syscall, add them to the
-            # syscall and update the full set of used parameters.
+            # If any parameters were used by the syscall, store a copy with
+            # the replaced arguments and used parameters, and update the full
+            # set of used parameters.
             if syscall_used_parameters:
-                syscall.executable_parameters = list(
-                    syscall_used_parameters.values()
+                s.trace_lines[idx] = syscall.replace(
+                    arguments=arguments,
+                    executable_parameters=list(
+                        syscall_used_parameters.values()
+                    )
                 )
                 used_parameters.update(syscall_used_parameters)
 
@@ -639,7 +702,9 @@ class GenerateSyntheticValues(SinglePreprocessor):
                                 literal: Literal,
                                 executable_parameters:
                                 List[ExecutableParameter]
-                                ) -> Dict[str, ExecutableParameter]:
+                                ) -> Tuple[
+                                    Literal, Dict[str, ExecutableParameter]
+                                ]:
         """Replace values in a literal.
 
         Parameters
@@ -651,13 +716,16 @@ class GenerateSyntheticValues(SinglePreprocessor):
 
         Returns
         -------
+        Literal
+            Copy of the literal with replaced values, or the literal itself
+            if no values were replaced.
         Dict[str, ExecutableParameter]
             All executable parameters used during replacement, keyed by the
             executable parameter key.
         """
         # Skip any arguments that don't have a value
         if not isinstance(literal, Literal):
-            return {}
+            return literal, {}
 
         # What we actually care about is the argument value, not the
         # named wrapper.
@@ -666,9 +734,12 @@ class GenerateSyntheticValues(SinglePreprocessor):
         # If the value is a collection, then replace values in that collection
         # and return the dictionary of executable parameters that were used.
         if isinstance(arg_value, Collection):
-            return self._replace_values_collection(
+            arg_value, used_parameters = self._replace_values_collection(
                 arg_value, executable_parameters
             )
+            if used_parameters:
+                literal = literal.replace(value=arg_value)
+            return literal, used_parameters
 
         # If the value is not a collection, it must be a primitive class.
         # Try to find a match for it.
@@ -678,20 +749,23 @@ class GenerateSyntheticValues(SinglePreprocessor):
 
         # If a match was found, do the replacement
         if executable_parameter:
-            literal.value = SyntheticValue(
+            literal = literal.replace(value=SyntheticValue(
                 executable_parameter=executable_parameter,
                 original_value=literal.value,
                 template=template
-            )
-            return {executable_parameter.key: executable_parameter}
+            ))
+            return literal, {executable_parameter.key: executable_parameter}
         else:
-            return {}
+            return literal, {}
 
     def _replace_values_collection(self,
                                    value: Collection,
                                    executable_parameters:
                                    List[ExecutableParameter]
-                                   ) -> Dict[str, ExecutableParameter]:
+                                   ) -> Tuple[
+                                       Collection,
+                                       Dict[str, ExecutableParameter]
+                                   ]:
         """Replace all values in a collection.
 
         Parameters
@@ -703,17 +777,25 @@ class GenerateSyntheticValues(SinglePreprocessor):
 
         Returns
         -------
+        Collection
+            Copy of the collection with replaced values, or the collection
+            itself if no values were replaced.
         Dict[str, ExecutableParameter]
             All executable parameters used during replacement, keyed by the
             executable parameter key.
         """
         used_parameters = {}
-        for idx, item in enumerate(value.items):
-            used_parameters.update(self._replace_values_literal(
+        items = RestorableList()
+        for item in value.items:
+            item, item_used_parameters = self._replace_values_literal(
                 item,
                 executable_parameters
-            ))
-        return used_parameters
+            )
+            items.append(item)
+            used_parameters.update(item_used_parameters)
+        if used_parameters:
+            value = value.replace(items=items)
+        return value, used_parameters
 
     def _find_match(self,
                     value: LiteralValue,
@@ -852,19 +934,23 @@ class ReplacePIDInLockFiles(SinglePreprocessor):
             All available traces. Preprocessing may use information from the
             global traces.
         """
-        for syscall in s.trace_lines:
+        for idx, syscall in enumerate(s.trace_lines):
 
             # Get function name
             function_name = f'_process_{syscall.name}'
 
             # Process
             if hasattr(self, function_name):
-                getattr(self, function_name)(syscall)
+                replacement = getattr(self, function_name)(syscall)
+                if replacement is not None:
+                    s.trace_lines[idx] = replacement
 
     def _default_process_path(self, s: Syscall):
         path = s.arguments[0].value.value
         if path.startswith('/etc/') and path.endswith(f'.{s.pid}'):
-            s.arguments[0].value.value = path[:-len(str(s.pid))] + 'PID'
+            return _replace_primitive(
+                s, 0, path[:-len(str(s.pid))] + 'PID'
+            )
 
     _process_link = _default_process_path
     _process_stat = _default_process_path
@@ -878,13 +964,15 @@ class ReplacePIDInLockFiles(SinglePreprocessor):
         if isinstance(path, tuple):
             _, path = path
         if path.startswith('/etc/') and path.endswith(f'.{s.pid}'):
-            s.arguments[1].value.value = path[:-len(str(s.pid))] + 'PID'
+            return _replace_primitive(
+                s, 1, path[:-len(str(s.pid))] + 'PID'
+            )
 
     _process_openat = _default_process_at
 
     def _process_write(self, s: Syscall):
         if s.arguments[1].value.value == f'{s.pid}\\0':
-            s.arguments[1].value.value = 'PID\\0'
+            return _replace_primitive(s, 1, 'PID\\0')
 
 
 class ReplacePIDInProcfs(SinglePreprocessor):
@@ -906,20 +994,24 @@ class ReplacePIDInProcfs(SinglePreprocessor):
             All available traces. Preprocessing may use information from the
             global traces.
         """
-        for syscall in s.trace_lines:
+        for idx, syscall in enumerate(s.trace_lines):
 
             # Get function name
             function_name = f'_process_{syscall.name}'
 
             # Process
             if hasattr(self, function_name):
-                getattr(self, function_name)(syscall)
+                replacement = getattr(self, function_name)(syscall)
+                if replacement is not None:
+                    s.trace_lines[idx] = replacement
 
     def _default_process_path(self, s: Syscall):
         path = s.arguments[0].value.value
         proc_pid = f'/proc/{s.pid}'
         if path.startswith(proc_pid):
-            s.arguments[0].value.value = '/proc/self' + path[len(proc_pid):]
+            return _replace_primitive(
+                s, 0, '/proc/self' + path[len(proc_pid):]
+            )
 
     _process_open = _default_process_path
     _process_stat = _default_process_path
@@ -930,9 +1022,13 @@ class ReplacePIDInProcfs(SinglePreprocessor):
         proc_pid = f'/proc/{s.pid}'
 
         if os.path.isabs(path) and path.startswith(proc_pid):
-            s.arguments[1].value.value = '/proc/self' + path[len(proc_pid):]
+            return _replace_primitive(
+                s, 1, '/proc/self' + path[len(proc_pid):]
+            )
         elif isinstance(dir_fd, str) and dir_fd.startswith(proc_pid):
-            s.arguments[0].value.value = '/proc/self' + dir_fd[len(proc_pid):]
+            return _replace_primitive(
+                s, 0, '/proc/self' + dir_fd[len(proc_pid):]
+            )
 
     _process_openat = _default_process_at
 
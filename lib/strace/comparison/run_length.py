@@ -0,0 +1,100 @@
+"""Run-length encoding of strace tracelines.
+
+Many straces contain long runs of equal tracelines, such as ``read`` loops
+over a file, repeated ``write`` calls, or ``futex`` spins. A
+``RunLengthTrace`` stores each run once with its repeat count. Scoring
+methods that only depend on how often each syscall form occurs work on the
+runs directly, so their cost scales with the number of runs instead of the
+number of tracelines.
+
+Runs are formed with the syscall equality active while the trace is built.
+Counts derived from the runs are only valid under that equality.
+"""
+
+
+# Imports
+from collections import Counter
+from itertools import groupby
+from typing import Iterable, Iterator, List, Tuple
+
+from lib.strace.classes import TraceLine
+
+
+class RunLengthTrace:
+    """Tracelines compressed into runs of equal tracelines.
+
+    Attributes
+    ----------
+    trace_lines : List[TraceLine]
+        First traceline of each run.
+    repeats : List[int]
+        Number of tracelines in each run.
+    """
+
+    def __init__(self, trace_lines: Iterable[TraceLine]):
+        """Compress tracelines.
+
+        Parameters
+        ----------
+        trace_lines : Iterable[TraceLine]
+            Tracelines to compress, in order.
+        """
+        self.trace_lines: List[TraceLine] = []
+        self.repeats: List[int] = []
+        for line, run in groupby(trace_lines):
+            self.trace_lines.append(line)
+            self.repeats.append(sum(1 for _ in run))
+        self._length = sum(self.repeats)
+
+    def __len__(self) -> int:
+        """Get the number of tracelines.
+
+        Returns
+        -------
+        int
+            Number of tracelines, counting every repeat.
+        """
+        return self._length
+
+    def __iter__(self) -> Iterator[Tuple[TraceLine, int]]:
+        """Iterate over runs.
+
+        Returns
+        -------
+        Iterator[Tuple[TraceLine, int]]
+            First traceline and number of tracelines of each run.
+        """
+        return zip(self.trace_lines, self.repeats)
+
+    @property
+    def num_runs(self) -> int:
+        """Number of runs."""
+        return len(self.trace_lines)
+
+    def counts(self) -> Counter:
+        """Count the tracelines of each syscall form.
+
+        Returns
+        -------
+        Counter
+            Number of tracelines by traceline. Equal tracelines are counted
+            together, and the first one is the key.
+        """
+        counts = Counter()
+        for line, repeats in self:
+            counts[line] += repeats
+        return counts
+
+    def expand(self) -> List[TraceLine]:
+        """Decompress the tracelines.
+
+        Returns
+        -------
+        List[TraceLine]
+            Tracelines, where each run repeats its first traceline.
+        """
+        return [
+            line
+            for line, repeats in self
+            for _ in range(repeats)
+        ]
@@ -5,7 +5,7 @@
 from collections import Counter, defaultdict
 from dataclasses import dataclass, field
 from functools import reduce
-from itertools import chain, product
+from itertools import product
 from typing import Dict, List, Optional, Set, Tuple
 import math
 import operator
@@ -14,16 +14,18 @@ import networkx as nx
 
 from lib import logger
 from lib.strace.classes import (
-    ParameterMapping, RestoreCheckpoint, Strace, ExecutableParameter, Syscall
+    ParameterMapping, Strace, ExecutableParameter, Syscall
 )
 from lib.strace.comparison.preprocessing import (
     SinglePreprocessor,
     PairPreprocessor,
 )
+from lib.strace.comparison.run_length import RunLengthTrace
 from lib.strace.comparison.syscall_equality import (
     SyscallEquality,
     StrictEquality,
 )
+from lib.strace.comparison.trace_matrix import TraceMatrix
 
 
 @dataclass(order=True)
@@ -52,7 +54,8 @@ class ScoringMethod:
                  single_preprocessors:
                  Optional[List[SinglePreprocessor]] = None,
                  pair_preprocessors: Optional[List[PairPreprocessor]] = None,
-                 syscall_equality: SyscallEquality = StrictEquality()):
+                 syscall_equality: SyscallEquality = StrictEquality(),
+                 run_length_encoding: bool = False):
         """Initialize a new scoring method.
 
         Parameters
@@ -63,10 +66,16 @@ class ScoringMethod:
             Pair preprocessors to run during scoring.
         syscall_equality : SyscallEquality
             Syscall equality metric.
+        run_length_encoding : bool
+            If syscalls should be counted from runs of equal syscalls. This is
+            faster for straces with long runs, such as read or write loops,
+            and slower for straces with few runs.
         """
         self.single_preprocessors = single_preprocessors or []
         self.pair_preprocessors = pair_preprocessors or []
         self.syscall_equality = syscall_equality
+        self.run_length_encoding = run_length_encoding
+        self._corpus = None
 
     def __call__(self,
                  s1: Strace,
@@ -87,22 +96,27 @@ class ScoringMethod:
         Returns
         -------
         ScoringResult
-
+            Scoring result for the given straces. Preprocessing is done on
+            snapshots, so the given straces are not modified.
         """
         logger.info(f'Comparing {s1.executable_repr} => {s2.executable_repr}')
+        result_s1, result_s2 = s1, s2
 
-        # Activate the equality and restore context
-        with self.syscall_equality(), RestoreCheckpoint():
+        # Activate the equality context
+        with self.syscall_equality():
 
-            # Preprocess
+            # Preprocess snapshots of the straces.
             logger.info('Preprocessing.')
+            all_traces, corpus = self._preprocess_corpus(all_traces)
+            s1 = self._preprocess_single(s1, all_traces, corpus)
+            s2 = self._preprocess_single(s2, all_traces, corpus)
             self._preprocess(s1, s2, all_traces)
 
             # Return 1 for exact match if either was preprocessed out.
             if not s1.trace_lines or not s2.trace_lines:
                 logger.info('Preprocessing removed all syscalls.')
                 logger.info('Score: 1')
-                return ScoringResult(1, None, s1, s2, [])
+                return ScoringResult(1, None, result_s1, result_s2, [])
 
             # If both straces have executable parameters, map them together
             # before computing the similarity score.
@@ -130,13 +144,82 @@ class ScoringMethod:
                 ExecutableParameter.unmap_values(value1, value2)
 
             # Return scoring result.
-            return ScoringResult(score, None, s1, s2, parameter_key_mapping)
+            return ScoringResult(
+                score, None, result_s1, result_s2, parameter_key_mapping
+            )
+
+    def _preprocess_corpus(self, all_traces: Set[Strace]
+                           ) -> Tuple[List[Strace], Dict[int, Strace]]:
+        """Run single preprocessors on snapshots of all traces.
+
+        The result is cached for as long as the same ``all_traces`` object is
+        passed, so the corpus is only preprocessed once for a run of
+        comparisons, and scoring methods that cache corpus statistics keep
+        seeing the same traces.
+
+        Parameters
+        ----------
+        all_traces : Set[Strace]
+            All available traces.
+
+        Returns
+        -------
+        Tuple[List[Strace], Dict[int, Strace]]
+            The preprocessed traces, and a mapping from the id of each given
+            trace to its preprocessed snapshot. If there are no single
+            preprocessors, ``all_traces`` is returned with an empty mapping.
+        """
+        if not self.single_preprocessors:
+            return all_traces, {}
+        if self._corpus is None or self._corpus[0] is not all_traces:
+            logger.info('Preprocessing all traces.')
+            corpus = [strace.snapshot() for strace in all_traces]
+            for preprocessor in self.single_preprocessors:
+                for strace in corpus:
+                    preprocessor(strace, corpus)
+            by_id = {
+                id(strace): snapshot
+                for strace, snapshot in zip(all_traces, corpus)
+            }
+            self._corpus = (all_traces, corpus, by_id)
+        return self._corpus[1], self._corpus[2]
+
+    def _preprocess_single(self,
+                           strace: Strace,
+                           all_traces: Set[Strace],
+                           corpus: Dict[int, Strace]) -> Strace:
+        """Get a single preprocessed snapshot of a strace.
+
+        Parameters
+        ----------
+        strace : Strace
+            Strace to be preprocessed.
+        all_traces : Set[Strace]
+            Preprocessed traces, see ``_preprocess_corpus``.
+        corpus : Dict[int, Strace]
+            Preprocessed snapshots by the id of their original trace.
+
+        Returns
+        -------
+        Strace
+            A snapshot of the preprocessed strace, which pair preprocessors
+            may modify.
+        """
+        if id(strace) in corpus:
+            return corpus[id(strace)].snapshot()
+        strace = strace.snapshot()
+        for preprocessor in self.single_preprocessors:
+            preprocessor(strace, all_traces)
+        return strace
 
     def _preprocess(self,
                     s1: Strace,
                     s2: Strace,
                     all_traces: Set[Strace]):
-        """Preprocess straces in-place.
+        """Run pair preprocessors in-place.
+
+        Callers pass snapshots that single preprocessors have already been
+        run on, see ``_preprocess_single``.
 
         Parameters
         ----------
@@ -154,13 +237,6 @@ class ScoringMethod:
             f'({len(s1.trace_lines)}, {len(s2.trace_lines)})'
         )
 
-        # Run single preprocessors
-        for preprocessor in self.single_preprocessors:
-            preprocessor(s1)
-            preprocessor(s2)
-            for strace in all_traces:
-                preprocessor(strace, all_traces)
-
         # Run pair preprocessors
         for preprocessor in self.pair_preprocessors:
             preprocessor(s1, s2, all_traces)
@@ -363,9 +439,67 @@ class ScoringMethod:
         """
         raise NotImplementedError()
 
+    def _count_syscalls(self, strace: Strace) -> Counter:
+        """Count the syscalls of each form in a strace.
+
+        Parameters
+        ----------
+        strace : Strace
+            Strace to count syscalls of.
+
+        Returns
+        -------
+        Counter
+            Number of tracelines by traceline. Equal tracelines are counted
+            together.
+        """
+        if self.run_length_encoding:
+            runs = RunLengthTrace(strace.trace_lines)
+            logger.debug(
+                f'Runs: {runs.num_runs} of {len(runs)} tracelines.'
+            )
+            return runs.counts()
+        return Counter(strace.trace_lines)
+
+    def _syscall_set(self, strace: Strace) -> Set[Syscall]:
+        """Get the set of syscall forms in a strace.
+
+        Parameters
+        ----------
+        strace : Strace
+            Strace to get syscalls of.
+
+        Returns
+        -------
+        Set[Syscall]
+            Set of tracelines. Equal tracelines are included once.
+        """
+        trace_lines = strace.trace_lines
+        if self.run_length_encoding:
+            trace_lines = RunLengthTrace(trace_lines).trace_lines
+        return set(trace_lines)
+
 
 class MaximumMatching(ScoringMethod):
-    """A comparison method based on computing a maximum matching."""
+    """A comparison method based on computing a maximum matching.
+
+    Syscalls are matched if they are equal. Equality is an equivalence
+    relation, so the matching graph is a complete bipartite graph for each
+    syscall form. Unless disabled, the matching is computed from the number
+    of syscalls of each form instead of building the graph.
+    """
+
+    def __init__(self, *args, counted_matching: bool = True, **kwargs):
+        """Initialize a new scoring method.
+
+        Parameters
+        ----------
+        counted_matching : bool
+            If the matching should be computed from syscall form counts
+            instead of a graph with a vertex for every syscall.
+        """
+        super().__init__(*args, **kwargs)
+        self.counted_matching = counted_matching
 
     def _score(self,
                s1: Strace,
@@ -388,6 +522,15 @@ class MaximumMatching(ScoringMethod):
         float
             Comparison score in the range 0..1.
         """
+        # Score syscall form counts
+        if self.counted_matching and self._supports_counts():
+            return self._counts_score(
+                self._count_syscalls(s1),
+                self._count_syscalls(s2),
+                min(len(s1.trace_lines), len(s2.trace_lines)),
+                all_traces
+            )
+
         # Label syscalls
         s1_syscalls = list(map(
             lambda v: ('s1', v[0], v[1]),
@@ -521,6 +664,43 @@ class MaximumMatching(ScoringMethod):
             'Matching must be implemented by a subclass.'
         )
 
+    def _supports_counts(self) -> bool:
+        """Determine if the score can be computed from syscall form counts.
+
+        Returns
+        -------
+        bool
+            True if ``_counts_score`` is implemented for the current options.
+        """
+        return False
+
+    def _counts_score(self,
+                      s1_counts: Counter,
+                      s2_counts: Counter,
+                      min_len: int,
+                      all_traces: Set[Strace]) -> float:
+        """Compute the score of a maximum matching from form counts.
+
+        Parameters
+        ----------
+        s1_counts : Counter
+            Syscall form counts of the first strace.
+        s2_counts : Counter
+            Syscall form counts of the second strace.
+        min_len : int
+            Number of syscalls in the shorter strace.
+        all_traces : Set[Strace]
+            All other available traces.
+
+        Returns
+        -------
+        float
+            Comparison score in the range 0..1.
+        """
+        raise NotImplementedError(
+            'Counted matching must be implemented by a subclass.'
+        )
+
 
 class MaximumCardinalityMatching(MaximumMatching):
     """A comparison method based on maximum cardinality matching."""
@@ -591,6 +771,49 @@ class MaximumCardinalityMatching(MaximumMatching):
         min_len = min(len(s1_syscalls), len(s2_syscalls))
         return len(matching) / min_len
 
+    def _supports_counts(self) -> bool:
+        """Determine if the score can be computed from syscall form counts.
+
+        Returns
+        -------
+        bool
+            Always True.
+        """
+        return True
+
+    def _counts_score(self,
+                      s1_counts: Counter,
+                      s2_counts: Counter,
+                      min_len: int,
+                      all_traces: Set[Strace]) -> float:
+        """Compute the score of a maximum matching from form counts.
+
+        A maximum matching matches the smaller number of syscalls of each
+        form.
+
+        Parameters
+        ----------
+        s1_counts : Counter
+            Syscall form counts of the first strace.
+        s2_counts : Counter
+            Syscall form counts of the second strace.
+        min_len : int
+            Number of syscalls in the shorter strace.
+        all_traces : Set[Strace]
+            All other available traces.
+
+        Returns
+        -------
+        float
+            Comparison score in the range 0..1.
+        """
+        matched = sum(
+            min(s1_counts[syscall], s2_counts[syscall])
+            for syscall in s1_counts.keys() & s2_counts.keys()
+        )
+        logger.debug(f'Size of matching: {matched}')
+        return matched / min_len
+
 
 class TFIDFMaximumWeightedMatching(MaximumMatching):
 
@@ -674,18 +897,17 @@ class TFIDFMaximumWeightedMatching(MaximumMatching):
                 s2_frequencies[syscall] /= s2_max_frequency
 
             # Compute document frequency.
+            matrix = TraceMatrix(list(all_traces))
+            frequencies = matrix.document_frequencies()
             document_frequencies = {}
             for s in set(map(lambda v: v[2], g.nodes)):
-
-                if s not in document_frequencies:
-                    document_frequencies[s] = 0
-
-                for strace in all_traces:
-                    if s in strace.trace_lines:
-                        document_frequencies[s] += 1
+                form_id = matrix.form_id(s)
+                document_frequencies[s] = (
+                    0 if form_id is None else int(frequencies[form_id])
+                )
 
             # Weight all edges
-            num_documents = len(list(all_traces))
+            num_documents = len(matrix)
             for u, v, d in g.edges(data=True):
 
                 # Unpack and potentially swap
@@ -744,6 +966,73 @@ class TFIDFMaximumWeightedMatching(MaximumMatching):
         # Return weight normalized by number of syscalls
         return weight / min_len
 
+    def _supports_counts(self) -> bool:
+        """Determine if the score can be computed from syscall form counts.
+
+        Edge weights are constant for each form only if TF-IDF uses the
+        matching syscall equality.
+
+        Returns
+        -------
+        bool
+            True if TF-IDF uses the matching syscall equality.
+        """
+        return self.tfidf_syscall_equality is self.syscall_equality
+
+    def _counts_score(self,
+                      s1_counts: Counter,
+                      s2_counts: Counter,
+                      min_len: int,
+                      all_traces: Set[Strace]) -> float:
+        """Compute the score of a maximum weighted matching from form counts.
+
+        All edges between syscalls of the same form have the same
+        non-negative weight, so a maximum weighted matching matches the
+        smaller number of syscalls of each form.
+
+        Parameters
+        ----------
+        s1_counts : Counter
+            Syscall form counts of the first strace.
+        s2_counts : Counter
+            Syscall form counts of the second strace.
+        min_len : int
+            Number of syscalls in the shorter strace.
+        all_traces : Set[Strace]
+            All available traces.
+
+        Returns
+        -------
+        float
+            Comparison score in the range 0..1.
+        """
+        # Term frequencies are normalized by the maximum frequency
+        s1_max_frequency = max(s1_counts.values())
+        s2_max_frequency = max(s2_counts.values())
+
+        # Compute document frequency.
+        matrix = TraceMatrix(list(all_traces))
+        frequencies = matrix.document_frequencies()
+        num_documents = len(matrix)
+
+        # Weight the matched syscalls of each common form
+        weight = 0
+        for syscall in s1_counts.keys() & s2_counts.keys():
+            form_id = matrix.form_id(syscall)
+            document_frequency = (
+                0 if form_id is None else int(frequencies[form_id])
+            )
+            idf = math.log(num_documents / document_frequency)
+            s1_tfidf = s2_counts[syscall] / s2_max_frequency * idf
+            s2_tfidf = s1_counts[syscall] / s1_max_frequency * idf
+            weight += (
+                min(s1_counts[syscall], s2_counts[syscall])
+                * s1_tfidf * s2_tfidf
+            )
+
+        # Return weight normalized by number of syscalls
+        return weight / min_len
+
 
 class NormalizedInformationContent(ScoringMethod):
     """Scoring method using information content.
@@ -776,13 +1065,6 @@ class NormalizedInformationContent(ScoringMethod):
             # Cache traces
             self._all_traces = all_traces
 
-            # Count how many traces each syscall appears in
-            counter = Counter(chain.from_iterable(map(
-                lambda s: set(s.trace_lines),
-                all_traces
-            )))
-            total = len(all_traces)
-
             # Compute normalized information content
             #
             # The standard definition of information content is
@@ -792,11 +1074,11 @@ class NormalizedInformationContent(ScoringMethod):
             # which is -log(1 / total). The negatives cancel, and dividing by
             # the log is equivalent to performing a log change of base to
             # base = (1 / total).
-            base = 1 / total
-            self._syscall_information_content = {
-                k: math.log(v / total, base)
-                for k, v in counter.items()
-            }
+            matrix = TraceMatrix(list(all_traces))
+            self._syscall_information_content = dict(zip(
+                matrix.vocabulary,
+                matrix.information_content().tolist()
+            ))
 
         return self._syscall_information_content
 
@@ -823,8 +1105,8 @@ class NormalizedInformationContent(ScoringMethod):
             syscall_weights = self._information_content(all_traces)
 
         # Count syscall occurrences in compared traces
-        s1_counts = Counter(s1.trace_lines)
-        s2_counts = Counter(s2.trace_lines)
+        s1_counts = self._count_syscalls(s1)
+        s2_counts = self._count_syscalls(s2)
 
         # Get all syscalls shared by s1 and s2
         common_syscalls = set(s1_counts.keys()) & set(s2_counts.keys())
@@ -897,8 +1179,8 @@ class JaccardCoefficient(ScoringMethod):
             Comparison score in the range 0..1.
         """
         # Get sets of tracelines for each strace
-        s1_set = set(s1.trace_lines)
-        s2_set = set(s2.trace_lines)
+        s1_set = self._syscall_set(s1)
+        s2_set = self._syscall_set(s2)
 
         # Compute intersection and union
         intersection = s1_set & s2_set
@@ -941,12 +1223,7 @@ class TFIDF(ScoringMethod):
             s1, s2 = s2, s1
 
         # Compute s2_frequencies
-        s2_frequencies = {}
-        for s in s2.trace_lines:
-            if s not in s2_frequencies:
-                s2_frequencies[s] = 1
-            else:
-                s2_frequencies[s] += 1
+        s2_frequencies = dict(self._count_syscalls(s2))
 
         # Normalize
         s2_max_frequency = max(s2_frequencies.values())
@@ -954,17 +1231,19 @@ class TFIDF(ScoringMethod):
             s2_frequencies[syscall] /= s2_max_frequency
 
         # Get a set of s1 syscalls
-        s1_set = set(s1.trace_lines)
+        s1_set = self._syscall_set(s1)
 
         # Compute document frequencies. We only need to look for syscalls that
         # appear in s1, because only the s1 query terms are involved in
         # computing tf-idf.
+        matrix = TraceMatrix(list(all_traces))
+        frequencies = matrix.document_frequencies()
         document_frequencies = {}
         for s in s1_set:
-            document_frequencies[s] = 0
-            for strace in all_traces:
-                if s in strace.trace_lines:
-                    document_frequencies[s] += 1
+            form_id = matrix.form_id(s)
+            document_frequencies[s] = (
+                0 if form_id is None else int(frequencies[form_id])
+            )
 
         # Compute tfidf using s1 syscalls as the query terms
         s1_tfidf = sum(
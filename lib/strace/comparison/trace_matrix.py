@@ -0,0 +1,218 @@
+"""Columnar representation of a corpus of straces.
+
+Scoring methods that walk the tracelines of every strace in a corpus spend
+most of their time hashing and comparing ``Syscall`` objects. A
+``TraceMatrix`` does this once. Every traceline is mapped to the id of its
+syscall form, which is the class of tracelines that compare equal under the
+syscall equality active while the matrix is built. The ids of all straces
+are stored in a single int32 array with per-strace offsets, together with
+pid and exit code arrays. Corpus statistics such as document frequencies are
+then computed with NumPy array operations.
+"""
+
+
+# Imports
+from contextlib import nullcontext
+from itertools import chain
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lib.strace.classes import Strace, TraceLine
+from lib.strace.comparison.syscall_equality import SyscallEquality
+
+
+# Constants
+INT64_MIN = np.iinfo(np.int64).min
+INT64_MAX = np.iinfo(np.int64).max
+
+
+class TraceMatrix:
+    """Columnar syscall form ids of a corpus of straces.
+
+    Attributes
+    ----------
+    offsets : np.ndarray
+        int64 array of length ``len(self) + 1``. The tracelines of strace
+        ``i`` are at positions ``offsets[i]:offsets[i + 1]`` of the per
+        traceline arrays.
+    ids : np.ndarray
+        int32 array of syscall form ids, one per traceline.
+    pids : np.ndarray
+        int64 array of process identifiers, one per traceline.
+    pid_mask : np.ndarray
+        bool array that is True where a traceline has a pid.
+    exit_codes : np.ndarray
+        int64 array of exit codes, one per traceline.
+    exit_code_mask : np.ndarray
+        bool array that is True where a traceline has a numeric exit code that
+        fits in int64.
+    vocabulary : List[TraceLine]
+        Representative traceline of each syscall form, indexed by id. This is
+        the first traceline of the form in corpus order.
+    """
+
+    def __init__(self,
+                 straces: Sequence[Strace],
+                 syscall_equality: Optional[SyscallEquality] = None):
+        """Build a trace matrix.
+
+        Parameters
+        ----------
+        straces : Sequence[Strace]
+            Straces of the corpus, in order.
+        syscall_equality : Optional[SyscallEquality]
+            Equality used to group tracelines into syscall forms. If not
+            specified, the equality active in the calling context is used.
+        """
+        lengths = [len(strace.trace_lines) for strace in straces]
+        self.offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        trace_lines = list(chain.from_iterable(
+            strace.trace_lines for strace in straces
+        ))
+
+        # Assign syscall form ids. Dictionaries keep the first inserted key,
+        # so the keys in insertion order are the form representatives.
+        index: Dict[TraceLine, int] = {}
+        context = syscall_equality() if syscall_equality else nullcontext()
+        with context:
+            ids = [index.setdefault(line, len(index)) for line in trace_lines]
+        self._index = index
+        self.vocabulary: List[TraceLine] = list(index)
+        self.ids = np.array(ids, dtype=np.int32)
+
+        # Missing values are stored as zero and masked
+        pids = [line.pid for line in trace_lines]
+        self.pid_mask = np.array([p is not None for p in pids], dtype=bool)
+        self.pids = np.array(
+            [0 if p is None else p for p in pids],
+            dtype=np.int64
+        )
+        exit_codes = [
+            getattr(line, 'exit_code', None) for line in trace_lines
+        ]
+        self.exit_code_mask = np.array(
+            [
+                isinstance(e, int) and INT64_MIN <= e <= INT64_MAX
+                for e in exit_codes
+            ],
+            dtype=bool
+        )
+        self.exit_codes = np.array(
+            [
+                e if valid else 0
+                for e, valid in zip(exit_codes, self.exit_code_mask)
+            ],
+            dtype=np.int64
+        )
+
+    def __len__(self) -> int:
+        """Get the number of straces.
+
+        Returns
+        -------
+        int
+            Number of straces.
+        """
+        return len(self.offsets) - 1
+
+    @property
+    def num_forms(self) -> int:
+        """Number of distinct syscall forms."""
+        return len(self.vocabulary)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Number of tracelines of each strace."""
+        return np.diff(self.offsets)
+
+    def form_id(self, trace_line: TraceLine) -> Optional[int]:
+        """Get the syscall form id of a traceline.
+
+        The lookup uses the syscall equality active in the calling context,
+        which must be the same as the one the matrix was built with.
+
+        Parameters
+        ----------
+        trace_line : TraceLine
+            Traceline to look up.
+
+        Returns
+        -------
+        Optional[int]
+            Syscall form id, or None if no traceline of the corpus has the
+            same form.
+        """
+        return self._index.get(trace_line)
+
+    def trace_ids(self, index: int) -> np.ndarray:
+        """Get the syscall form ids of a strace.
+
+        Parameters
+        ----------
+        index : int
+            Strace index.
+
+        Returns
+        -------
+        np.ndarray
+            View of the ids of the strace tracelines.
+        """
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def counts(self, index: int) -> np.ndarray:
+        """Count the occurrences of each syscall form in a strace.
+
+        Parameters
+        ----------
+        index : int
+            Strace index.
+
+        Returns
+        -------
+        np.ndarray
+            int64 array of counts, indexed by syscall form id.
+        """
+        return np.bincount(self.trace_ids(index), minlength=self.num_forms)
+
+    def document_frequencies(self) -> np.ndarray:
+        """Count the straces that each syscall form appears in.
+
+        Returns
+        -------
+        np.ndarray
+            int64 array of strace counts, indexed by syscall form id.
+        """
+        trace_index = np.repeat(
+            np.arange(len(self), dtype=np.int64),
+            self.lengths
+        )
+        occurrences = np.unique(trace_index * self.num_forms + self.ids)
+        return np.bincount(
+            occurrences % max(self.num_forms, 1),
+            minlength=self.num_forms
+        )
+
+    def information_content(self) -> np.ndarray:
+        """Compute the normalized information content of each syscall form.
+
+        The information content of a form is ``-log(P)``, where ``P`` is the
+        fraction of straces containing it. It is normalized to the range
+        0..1 by dividing by the maximum value, ``-log(1 / len(self))``.
+
+        With fewer than two straces every form appears in all of them, so the
+        information content of every form is defined as 0 instead of
+        normalizing by ``-log(1) = 0``.
+
+        Returns
+        -------
+        np.ndarray
+            float64 array of information content, indexed by syscall form id.
+        """
+        total = len(self)
+        if total <= 1:
+            return np.zeros(self.num_forms, dtype=np.float64)
+        frequencies = self.document_frequencies() / total
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.log(frequencies) / np.log(1 / total)
@@ -0,0 +1,950 @@
+"""Hand-written strace traceline parser.
+
+The generated ANTLR parser supports the complete strace grammar but is slow
+under the pure Python runtime. This module implements a small recursive
+descent parser for the most common traceline shapes and builds the same
+objects as ``parser.StraceVisitorImpl``. Lines that cannot be handled are
+reported by returning None so that the caller can fall back to ANTLR.
+
+The parser can also emit the encoded nodes used by ``records`` instead of
+objects, so that compact records can be built without allocating the object
+graph of each traceline. In lazy mode, syscall arguments are not parsed at
+all. Syscalls keep the raw argument text instead, which is parsed when the
+arguments are first accessed. See ``classes.LazySyscall``.
+"""
+
+
+# Imports
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from lib.strace import classes, parser, records, util
+
+
+# Types
+TOKEN = Tuple[str, Union[str, Tuple]]
+
+
+# Constants
+# Default lexer mode tokens. Alternatives are ordered so that the first match
+# is the same token the ANTLR lexer selects by longest match and rule order.
+_TOKEN_RE = re.compile(r'''
+    (?P<RESUMED_END>\ resumed>)
+  | (?P<WHITESPACE>[\t\ \f]+)
+  | (?P<OMITTED_ARGUMENTS>/\*\ (?:0x[0-9a-f]+|-?[0-9]+)\ entries\ \*/)
+  | (?P<COMMENT>/\*.*?\*/)
+  | (?P<RESUME_INTERRUPTED_FUTEX>
+        <\.\.\.\ resuming\ interrupted\ futex\ \.\.\.>
+    )
+  | (?P<RESUMED_START><\.\.\.\ )
+  | (?P<UNFINISHED><unfinished\ \.\.\.>)
+  | (?P<FD_LEFT_ANGLE_BRACKET><)
+  | (?P<SIGNAL_DELIMITER>---)
+  | (?P<EXIT_DELIMITER>\+\+\+)
+  | (?P<EXITED_WITH>exited\ with)
+  | (?P<KILLED_BY>killed\ by)
+  | (?P<SINGLE_ARROW>->)
+  | (?P<DOUBLE_ARROW>=>)
+  | (?P<BOOLEAN_BINARY_OPERATOR>&&|\|\||==)
+  | (?P<NUMBER>0x[0-9a-f]+|-?[0-9]+)
+  | (?P<IDENTIFIER>[A-Za-z_][A-Za-z_0-9]*|&[A-Za-z_0-9]+)
+  | (?P<NUMERIC_BINARY_OPERATOR>[&|*/+\-])
+  | (?P<ELLIPSIS>\.\.\.)
+  | (?P<STRING>"(?:\\\\|\\"|[^"])*"(?:\.\.\.)?)
+  | (?P<LEFT_PARENTHESIS>\()
+  | (?P<RIGHT_PARENTHESIS>\))
+  | (?P<EQUALS>=)
+  | (?P<COMMA>,)
+  | (?P<QUESTION_MARK>\?)
+  | (?P<TILDE>~)
+  | (?P<LEFT_BRACKET>\[)
+  | (?P<RIGHT_BRACKET>\])
+  | (?P<LEFT_CURLY_BRACKET>\{)
+  | (?P<RIGHT_CURLY_BRACKET>\})
+  | (?P<COLON>:)
+''', re.VERBOSE)
+
+# Tokens that are not passed to the parser
+_HIDDEN_TOKENS = {'WHITESPACE', 'COMMENT', 'RESUME_INTERRUPTED_FUTEX'}
+
+# Identifiers that the lexer emits as keyword tokens
+_KEYWORDS = {'NULL', 'TRUNCATED'}
+
+# File descriptor mode tokens, longest protocols first
+_FD_WHITESPACE = ' \t\f'
+_FD_PROTOCOL_RE = re.compile(
+    r'L2TP/IPv6|L2TP/IP|UDPLITEv6|UDPLITE|PINGv6|SCTPv6|DCCPv6|UDPv6|TCPv6|'
+    r'RAWv6|NETLINK|PING|SCTP|DCCP|UNIX|TCP|UDP|RAW'
+)
+_FD_INFO_STRING_RE = re.compile(r'"(?:\\\\|\\"|[^"])*"')
+
+# Supported device and inode info bodies
+_DEVICE_INFO_RE = re.compile(r'([^\s0-9>:]+) +([0-9]+):([0-9]+)')
+_INODE_INFO_RE = re.compile(
+    r'([0-9]+)(?:->([0-9]+))?(?:,("(?:\\\\|\\"|[^"])*"))?'
+)
+
+# Tokens that may begin a literal
+_LITERAL_START = {
+    'IDENTIFIER', 'NUMBER', 'NULL', 'STRING', 'LEFT_BRACKET',
+    'LEFT_CURLY_BRACKET', 'LEFT_PARENTHESIS', 'TILDE', 'DOUBLE_ARROW',
+}
+
+# Tokens that open and close nested argument sections
+_OPENING_TOKENS = {'LEFT_PARENTHESIS', 'LEFT_BRACKET', 'LEFT_CURLY_BRACKET'}
+_CLOSING_TOKENS = {
+    'RIGHT_PARENTHESIS', 'RIGHT_BRACKET', 'RIGHT_CURLY_BRACKET'
+}
+
+# Closing token for each collection opening token
+_COLLECTION_CLOSE = {
+    'LEFT_BRACKET': 'RIGHT_BRACKET',
+    'LEFT_CURLY_BRACKET': 'RIGHT_CURLY_BRACKET',
+}
+
+
+class _Unsupported(Exception):
+    """Raised when a line cannot be handled by the fast parser."""
+
+
+def _scan_file_descriptor(line: str, pos: int) -> Tuple[TOKEN, int]:
+    """Scan the body of a file descriptor.
+
+    Mirrors the lexer file descriptor, device, and info modes. The result is a
+    single composite token containing the body parts.
+
+    Parameters
+    ----------
+    line : str
+        Line being tokenized.
+    pos : int
+        Position immediately after the opening angle bracket.
+
+    Raises
+    ------
+    _Unsupported
+        Raised if the file descriptor is not closed on this line or contains
+        a section that is not handled by the fast parser.
+
+    Returns
+    -------
+    Tuple[TOKEN, int]
+        File descriptor token and the position after the closing bracket.
+    """
+    parts = []
+    end = len(line)
+    while pos < end:
+        c = line[pos]
+        if c in _FD_WHITESPACE:
+            pos += 1
+        elif c == '>':
+            return ('FILE_DESCRIPTOR', tuple(parts)), pos + 1
+        elif c == '<':
+            close = line.find('>', pos)
+            if close < 0:
+                raise _Unsupported()
+            parts.append(('DEVICE_INFO', line[pos + 1:close]))
+            pos = close + 1
+        elif line.startswith(':[', pos):
+            start = pos = pos + 2
+            while True:
+                if pos >= end:
+                    raise _Unsupported()
+                elif line[pos] == '"':
+                    match = _FD_INFO_STRING_RE.match(line, pos)
+                    if not match:
+                        raise _Unsupported()
+                    pos = match.end()
+                elif line[pos] == '[':
+                    raise _Unsupported()
+                elif line[pos] == ']':
+                    break
+                else:
+                    pos += 1
+            parts.append(('INFO', line[start:pos]))
+            pos += 1
+        else:
+            match = _FD_PROTOCOL_RE.match(line, pos)
+            if match:
+                parts.append(('FD_SOCKET_PROTOCOL', match.group()))
+                pos = match.end()
+            else:
+                parts.append(('FD_CHARACTER', c))
+                pos += 1
+    raise _Unsupported()
+
+
+def _tokenize(line: str,
+              positions: Optional[List[int]] = None) -> List[TOKEN]:
+    """Tokenize a single traceline.
+
+    Parameters
+    ----------
+    line : str
+        Traceline without the trailing newline.
+    positions : Optional[List[int]]
+        If set, the start position of each visible token is appended.
+
+    Raises
+    ------
+    _Unsupported
+        Raised if the line contains text the fast tokenizer cannot handle.
+
+    Returns
+    -------
+    List[TOKEN]
+        Visible tokens as (type, text) pairs.
+    """
+    tokens = []
+    pos = 0
+    end = len(line)
+    while pos < end:
+        match = _TOKEN_RE.match(line, pos)
+        if not match:
+            raise _Unsupported()
+        kind = match.lastgroup
+        text = match.group()
+        pos = match.end()
+        if kind in _HIDDEN_TOKENS:
+            continue
+        if positions is not None:
+            positions.append(match.start())
+        if kind == 'FD_LEFT_ANGLE_BRACKET':
+            token, pos = _scan_file_descriptor(line, pos)
+            tokens.append(token)
+        elif kind == 'IDENTIFIER' and text in _KEYWORDS:
+            tokens.append((text, text))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+class _LineParser:
+    """Recursive descent parser over the tokens of a single traceline."""
+
+    def __init__(self, tokens: List[TOKEN]):
+        """Create a new line parser.
+
+        Parameters
+        ----------
+        tokens : List[TOKEN]
+            Tokens of the traceline.
+        """
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        """Return the type of an upcoming token.
+
+        Parameters
+        ----------
+        offset : int
+            Offset from the current token.
+
+        Returns
+        -------
+        Optional[str]
+            Token type, or None at the end of the line.
+        """
+        idx = self.pos + offset
+        return self.tokens[idx][0] if idx < len(self.tokens) else None
+
+    def take(self, kind: Optional[str] = None) -> Union[str, Tuple]:
+        """Consume the current token.
+
+        Parameters
+        ----------
+        kind : Optional[str]
+            Required token type.
+
+        Raises
+        ------
+        _Unsupported
+            Raised if the current token is not of the required type.
+
+        Returns
+        -------
+        Union[str, Tuple]
+            Consumed token text.
+        """
+        if self.pos >= len(self.tokens):
+            raise _Unsupported()
+        token_kind, text = self.tokens[self.pos]
+        if kind is not None and token_kind != kind:
+            raise _Unsupported()
+        self.pos += 1
+        return text
+
+    def node(self, cls: type, *args, **kwargs) -> Any:
+        """Build a node of the traceline.
+
+        Parameters
+        ----------
+        cls : type
+            Class of the node.
+        *args
+            Positional constructor arguments.
+        **kwargs
+            Keyword constructor arguments.
+
+        Returns
+        -------
+        Any
+            Constructed object.
+        """
+        return cls(*args, **kwargs)
+
+    def pid_and_trace_line(self) -> Tuple[Optional[int], Any]:
+        """Parse a complete traceline without setting its process identifier.
+
+        Returns
+        -------
+        Tuple[Optional[int], Any]
+            Process identifier, if any, and the traceline node.
+        """
+        # Optional process identifier
+        pid = None
+        if self.peek() == 'NUMBER':
+            pid = parser._parse_number(self.take())
+
+        # Construct proper traceline subtype
+        kind = self.peek()
+        if kind == 'SIGNAL_DELIMITER':
+            trace_line = self.signal()
+        elif kind == 'EXIT_DELIMITER':
+            trace_line = self.exit_statement()
+        else:
+            trace_line = self.syscall()
+
+        return pid, trace_line
+
+    def trace_line(self) -> classes.TraceLine:
+        """Parse a complete traceline.
+
+        Returns
+        -------
+        classes.TraceLine
+            Parsed traceline.
+        """
+        pid, trace_line = self.pid_and_trace_line()
+        if pid is not None:
+            trace_line.pid = pid
+        return trace_line
+
+    def syscall(self) -> classes.Syscall:
+        """Parse a syscall.
+
+        Returns
+        -------
+        classes.Syscall
+            Parsed syscall.
+        """
+        resumed = self.peek() == 'RESUMED_START'
+
+        # Syscall start or resumption
+        if resumed:
+            self.take()
+            name = util.intern(self.take('IDENTIFIER'))
+            self.take('RESUMED_END')
+        else:
+            name = util.intern(self.take('IDENTIFIER'))
+            self.take('LEFT_PARENTHESIS')
+
+        # Arguments
+        arguments = self.arguments(resumed)
+
+        # Unfinished syscall
+        kind = self.peek()
+        if not resumed and (
+            kind == 'UNFINISHED'
+            or (kind == 'COMMA' and self.peek(1) == 'UNFINISHED')
+        ):
+            if kind == 'COMMA':
+                self.take()
+            self.take()
+            return self.node(
+                classes.Syscall,
+                name=name,
+                **arguments,
+                unfinished=True,
+                resumed=False,
+            )
+
+        # Syscall end and return value. Return notes are dropped because
+        # the ANTLR visitor does not set them either.
+        self.take('RIGHT_PARENTHESIS')
+        self.take('EQUALS')
+        kind = self.peek()
+        if kind == 'NUMBER':
+            exit_code = parser._parse_number(self.take())
+        elif kind == 'QUESTION_MARK':
+            exit_code = self.take()
+        else:
+            raise _Unsupported()
+        self.pos = len(self.tokens)
+
+        return self.node(
+            classes.Syscall,
+            name=name,
+            **arguments,
+            unfinished=False,
+            resumed=resumed,
+            exit_code=exit_code,
+        )
+
+    def arguments(self, resumed: bool) -> Dict[str, Any]:
+        """Parse the arguments of a syscall.
+
+        Parameters
+        ----------
+        resumed : bool
+            If the syscall is resumed. Resumed arguments may start with the
+            destination of an incomplete mapping.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Syscall constructor keyword arguments with the parsed arguments.
+        """
+        arguments = []
+        if resumed:
+            if self.peek() == 'COMMA':
+                self.take()
+            if self.peek() == 'DOUBLE_ARROW':
+                self.take()
+                arguments.append(
+                    self.node(classes.Mapping, None, self.literal())
+                )
+        if self.peek() in _LITERAL_START or self.peek() == 'OMITTED_ARGUMENTS':
+            arguments += self.syscall_arguments()
+        return {'arguments': arguments}
+
+    def syscall_arguments(self) -> List[Union[
+        classes.Literal,
+        classes.Mapping,
+        classes.OmittedArguments,
+    ]]:
+        """Parse a list of syscall arguments.
+
+        Returns
+        -------
+        list
+            Parsed arguments.
+        """
+        arguments = [self.syscall_argument()]
+        while self.peek() == 'COMMA':
+            kind = self.peek(1)
+            if kind == 'ELLIPSIS':
+                self.pos += 2
+                break
+            elif kind in _LITERAL_START or kind == 'OMITTED_ARGUMENTS':
+                self.take()
+                arguments.append(self.syscall_argument())
+            else:
+                break
+        return arguments
+
+    def syscall_argument(self) -> Union[
+        classes.Literal,
+        classes.Mapping,
+        classes.OmittedArguments,
+    ]:
+        """Parse a syscall argument.
+
+        Returns
+        -------
+        Union[classes.Literal, classes.Mapping, classes.OmittedArguments]
+            Parsed argument.
+        """
+        if self.peek() == 'OMITTED_ARGUMENTS':
+            self.take()
+            return self.node(classes.OmittedArguments)
+        return self.literal()
+
+    def literal(self) -> Union[classes.Literal, classes.Mapping]:
+        """Parse a literal.
+
+        Raises
+        ------
+        _Unsupported
+            Raised for a bare mapping, which the ANTLR visitor cannot build.
+
+        Returns
+        -------
+        Union[classes.Literal, classes.Mapping]
+            Parsed literal, or a mapping from the literal.
+        """
+        # Get identifier
+        if self.peek() == 'IDENTIFIER' and self.peek(1) == 'EQUALS':
+            identifier = self.node(
+                classes.Identifier,
+                util.intern(self.take())
+            )
+            self.take()
+        else:
+            identifier = None
+
+        # Create literal
+        if self.peek() == 'DOUBLE_ARROW':
+            raise _Unsupported()
+        literal = self.node(
+            classes.Literal,
+            self.literal_value(),
+            identifier=identifier
+        )
+
+        # Return literal or a mapping
+        if self.peek() == 'DOUBLE_ARROW':
+            self.take()
+            return self.node(classes.Mapping, literal, self.literal())
+        else:
+            return literal
+
+    def literal_value(self) -> classes.LiteralValue:
+        """Parse a literal value.
+
+        Function calls, parenthesized collections, boolean expressions, and
+        uncommon file descriptors are left to the ANTLR parser.
+
+        Raises
+        ------
+        _Unsupported
+            Raised if the value is not handled by the fast parser.
+
+        Returns
+        -------
+        classes.LiteralValue
+            Parsed literal value.
+        """
+        kind = self.peek()
+        next_kind = self.peek(1)
+
+        if kind in ('NUMBER', 'IDENTIFIER'):
+            if next_kind == 'NUMERIC_BINARY_OPERATOR':
+                return self.numeric_expression()
+            elif kind == 'NUMBER' and next_kind == 'FILE_DESCRIPTOR':
+                return self.file_descriptor()
+            elif kind == 'NUMBER':
+                return self.node(
+                    classes.NumberLiteral,
+                    parser._parse_number(self.take())
+                )
+            elif next_kind == 'LEFT_PARENTHESIS':
+                raise _Unsupported()
+            else:
+                return self.node(
+                    classes.Identifier,
+                    util.intern(self.take())
+                )
+        elif kind == 'NULL':
+            return self.node(classes.NullLiteral, self.take())
+        elif kind == 'STRING':
+            return self.node(
+                classes.StringLiteral,
+                util.intern(self.take().rstrip('.')[1:-1])
+            )
+        elif kind == 'TILDE' and next_kind == 'LEFT_BRACKET':
+            self.take()
+            return self.collection()
+        elif kind == 'LEFT_BRACKET' and next_kind == 'LEFT_CURLY_BRACKET':
+            # Could be a boolean expression. Boolean operators are rejected
+            # when tokenizing, so this is always a collection of structs.
+            return self.collection()
+        elif kind in _COLLECTION_CLOSE:
+            return self.collection()
+        else:
+            raise _Unsupported()
+
+    def numeric_expression(self) -> classes.NumericExpression:
+        """Parse a numeric expression.
+
+        Returns
+        -------
+        classes.NumericExpression
+            Numeric expression with whitespace removed.
+        """
+        text = [self.take()]
+        while self.peek() == 'NUMERIC_BINARY_OPERATOR':
+            text.append(self.take())
+            if self.peek() not in ('NUMBER', 'IDENTIFIER'):
+                raise _Unsupported()
+            text.append(self.take())
+        return self.node(classes.NumericExpression, ''.join(text))
+
+    def collection(self) -> classes.Collection:
+        """Parse a bracketed or braced collection.
+
+        Returns
+        -------
+        classes.Collection
+            Parsed collection.
+        """
+        close = _COLLECTION_CLOSE[self.peek()]
+        self.take()
+
+        items = []
+        if self.peek() != close:
+            items.append(self.literal())
+            while True:
+                kind = self.peek()
+                if kind == 'COMMA' and self.peek(1) == 'ELLIPSIS':
+                    self.pos += 2
+                    break
+                elif kind in ('COMMA', 'SINGLE_ARROW'):
+                    self.take()
+                    items.append(self.literal())
+                elif kind == 'ELLIPSIS':
+                    self.take()
+                    break
+                elif kind in _LITERAL_START:
+                    items.append(self.literal())
+                else:
+                    break
+        self.take(close)
+
+        return self.node(classes.Collection, items)
+
+    def file_descriptor(self) -> classes.FileDescriptor:
+        """Parse a file descriptor.
+
+        Raises
+        ------
+        _Unsupported
+            Raised for IP, netlink, and malformed file descriptors.
+
+        Returns
+        -------
+        classes.FileDescriptor
+            Parsed file descriptor.
+        """
+        number = parser._parse_number(self.take('NUMBER'))
+        parts = self.take('FILE_DESCRIPTOR')
+
+        # Split leading characters from the remaining sections
+        idx = 0
+        while idx < len(parts) and parts[idx][0] == 'FD_CHARACTER':
+            idx += 1
+        path = ''.join(text for _, text in parts[:idx])
+        rest = parts[idx:]
+
+        if not rest:
+            if not path:
+                raise _Unsupported()
+            return self.node(classes.PathFileDescriptor, number, path)
+
+        if len(rest) == 1 and rest[0][0] == 'DEVICE_INFO' and path:
+            match = _DEVICE_INFO_RE.fullmatch(rest[0][1])
+            if not match:
+                raise _Unsupported()
+            return self.node(
+                classes.DeviceFileDescriptor,
+                number=number,
+                path=path,
+                device_type=match.group(1),
+                major=parser._parse_number(match.group(2)),
+                minor=parser._parse_number(match.group(3)),
+            )
+
+        # Inode info following a protocol or characters
+        if rest[-1][0] != 'INFO':
+            raise _Unsupported()
+        if len(rest) == 2 and not path:
+            kind, protocol = rest[0]
+            if kind != 'FD_SOCKET_PROTOCOL' or protocol == 'NETLINK':
+                raise _Unsupported()
+        elif len(rest) == 1 and path:
+            protocol = path
+        else:
+            raise _Unsupported()
+        match = _INODE_INFO_RE.fullmatch(rest[-1][1])
+        if not match:
+            raise _Unsupported()
+        inode, reference, bind = match.groups()
+        return self.node(
+            classes.InodeFileDescriptor,
+            number=number,
+            protocol=protocol,
+            inode=parser._parse_number(inode),
+            reference=parser._parse_number(reference) if reference else None,
+            bind=bind[1:-1] if bind else None,
+        )
+
+    def signal(self) -> classes.Signal:
+        """Parse a signal.
+
+        Returns
+        -------
+        classes.Signal
+            Parsed signal.
+        """
+        self.take('SIGNAL_DELIMITER')
+        identifier = self.take('IDENTIFIER')
+        if self.peek() not in _COLLECTION_CLOSE:
+            raise _Unsupported()
+        info = self.collection()
+        self.take('SIGNAL_DELIMITER')
+        return self.node(classes.Signal, identifier, info)
+
+    def exit_statement(self) -> classes.ExitStatement:
+        """Parse an exit statement.
+
+        Returns
+        -------
+        classes.ExitStatement
+            Parsed exit statement.
+        """
+        self.take('EXIT_DELIMITER')
+        if self.peek() == 'EXITED_WITH':
+            self.take()
+            statement = self.node(
+                classes.ExitStatement,
+                parser._parse_number(self.take('NUMBER'))
+            )
+        else:
+            self.take('KILLED_BY')
+            statement = self.node(
+                classes.ExitStatement,
+                self.take('IDENTIFIER'),
+                True
+            )
+        self.take('EXIT_DELIMITER')
+        return statement
+
+
+class _EncodingLineParser(_LineParser):
+    """Line parser that builds encoded nodes instead of objects.
+
+    See ``records.encode_node``.
+    """
+
+    def node(self, cls: type, *args, **kwargs) -> tuple:
+        """Build an encoded node of the traceline.
+
+        Parameters
+        ----------
+        cls : type
+            Class of the node.
+        *args
+            Positional constructor arguments.
+        **kwargs
+            Keyword constructor arguments.
+
+        Returns
+        -------
+        tuple
+            Encoded node.
+        """
+        return records.encode_node(cls, args, kwargs)
+
+
+class _LazyLineParser(_LineParser):
+    """Line parser that keeps the raw text of syscall arguments.
+
+    Arguments are skipped by matching brackets, without checking that they
+    can be parsed. Syscalls with arguments are built as
+    ``classes.LazySyscall``.
+    """
+
+    def __init__(self, tokens: List[TOKEN], line: str, positions: List[int]):
+        """Create a new lazy line parser.
+
+        Parameters
+        ----------
+        tokens : List[TOKEN]
+            Tokens of the traceline.
+        line : str
+            Traceline the tokens were read from.
+        positions : List[int]
+            Start position of each token in the traceline.
+        """
+        super().__init__(tokens)
+        self.line = line
+        self.positions = positions
+
+    def node(self, cls: type, *args, **kwargs) -> Any:
+        """Build a node of the traceline.
+
+        Parameters
+        ----------
+        cls : type
+            Class of the node.
+        *args
+            Positional constructor arguments.
+        **kwargs
+            Keyword constructor arguments.
+
+        Returns
+        -------
+        Any
+            Constructed object, a lazy syscall for syscalls with raw argument
+            text.
+        """
+        if 'argument_text' in kwargs:
+            cls = classes.LazySyscall
+        return cls(*args, **kwargs)
+
+    def arguments(self, resumed: bool) -> Dict[str, Any]:
+        """Skip the arguments of a syscall.
+
+        Parameters
+        ----------
+        resumed : bool
+            If the syscall is resumed.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Syscall constructor keyword arguments with the raw argument text,
+            or with no arguments if there are none.
+        """
+        # Find the end of the arguments at the first closing parenthesis or
+        # unfinished marker outside of nested sections.
+        tokens = self.tokens
+        start = pos = self.pos
+        end = len(tokens)
+        depth = 0
+        while pos < end:
+            kind = tokens[pos][0]
+            if kind in _OPENING_TOKENS:
+                depth += 1
+            elif kind in _CLOSING_TOKENS:
+                if not depth:
+                    break
+                depth -= 1
+            elif not depth and (
+                kind == 'UNFINISHED'
+                or (kind == 'COMMA' and pos + 1 < end
+                    and tokens[pos + 1][0] == 'UNFINISHED')
+            ):
+                break
+            pos += 1
+        if pos == end:
+            raise _Unsupported()
+        self.pos = pos
+
+        if pos == start:
+            return {'arguments': []}
+        return {
+            'argument_text': self.line[
+                self.positions[start]:self.positions[pos]
+            ],
+        }
+
+
+def _tokens(line: str,
+            positions: Optional[List[int]] = None) -> Optional[List[TOKEN]]:
+    """Tokenize a traceline if the fast parser supports it.
+
+    Parameters
+    ----------
+    line : str
+        Traceline without the trailing newline.
+    positions : Optional[List[int]]
+        If set, the start position of each token is appended.
+
+    Raises
+    ------
+    _Unsupported
+        Raised if the line contains text the fast tokenizer cannot handle.
+
+    Returns
+    -------
+    Optional[List[TOKEN]]
+        Tokens, or None if the line contains a boolean expression.
+    """
+    tokens = _tokenize(line, positions)
+    if any(kind == 'BOOLEAN_BINARY_OPERATOR' for kind, _ in tokens):
+        return None
+    return tokens
+
+
+def encode_trace_line(line: str) -> Optional[Tuple[Optional[int], tuple]]:
+    """Parse a single traceline into an encoded node with the fast parser.
+
+    Parameters
+    ----------
+    line : str
+        Traceline without the trailing newline.
+
+    Returns
+    -------
+    Optional[Tuple[Optional[int], tuple]]
+        Process identifier and encoded traceline node, or None if the line
+        must be parsed with ANTLR.
+    """
+    try:
+        tokens = _tokens(line)
+        if tokens is None:
+            return None
+        line_parser = _EncodingLineParser(tokens)
+        encoded = line_parser.pid_and_trace_line()
+        if line_parser.pos != len(tokens):
+            return None
+        return encoded
+    except _Unsupported:
+        return None
+
+
+def parse_trace_line(line: str,
+                     lazy: bool = False) -> Optional[classes.TraceLine]:
+    """Parse a single traceline with the fast parser.
+
+    Parameters
+    ----------
+    line : str
+        Traceline without the trailing newline.
+    lazy : bool
+        If true, syscall arguments are parsed when first accessed.
+
+    Returns
+    -------
+    Optional[classes.TraceLine]
+        Parsed traceline, or None if the line must be parsed with ANTLR.
+    """
+    try:
+        positions = [] if lazy else None
+        tokens = _tokens(line, positions)
+        if tokens is None:
+            return None
+        if lazy:
+            line_parser = _LazyLineParser(tokens, line, positions)
+        else:
+            line_parser = _LineParser(tokens)
+        trace_line = line_parser.trace_line()
+        if line_parser.pos != len(tokens):
+            return None
+        return trace_line
+    except _Unsupported:
+        return None
+
+
+def parse_arguments(text: str, resumed: bool = False) -> Optional[List[Union[
+    classes.Literal,
+    classes.Mapping,
+    classes.OmittedArguments,
+]]]:
+    """Parse the raw argument text of a syscall with the fast parser.
+
+    Parameters
+    ----------
+    text : str
+        Raw argument text, as kept by the lazy parser.
+    resumed : bool
+        If the syscall is resumed.
+
+    Returns
+    -------
+    Optional[list]
+        Parsed arguments, or None if they must be parsed with ANTLR.
+    """
+    try:
+        tokens = _tokens(text)
+        if tokens is None:
+            return None
+        line_parser = _LineParser(tokens)
+        arguments = line_parser.arguments(resumed)['arguments']
+        if line_parser.pos != len(tokens):
+            return None
+        return arguments
+    except _Unsupported:
+        return None
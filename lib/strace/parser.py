@@ -2,12 +2,21 @@
 
 
 # Imports
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
-
-from antlr4 import (
-    BailErrorStrategy, CommonTokenStream, FileStream, InputStream
+from typing import (
+    Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 )
+import io
+import json
+import mmap
+import os
+import re
+import stat
+import time
+
+from antlr4 import BailErrorStrategy, CommonTokenStream, InputStream
 from antlr4 import Recognizer
 from antlr4.error.Errors import CancellationException
 from antlr4.error.ErrorListener import ErrorListener
@@ -16,14 +25,17 @@ from antlr4.error.ErrorStrategy import (
 )
 from antlr4.Parser import ParserRuleContext
 from antlr4.tree.Tree import Tree
-from antlr4.Token import CommonToken
+from antlr4.Token import CommonToken, Token
 
 from lib.antlr_generated.strace.StraceLexer import StraceLexer
 from lib.antlr_generated.strace.StraceParser import StraceParser
 from lib.antlr_generated.strace.StraceParserVisitor import StraceParserVisitor
 
 from lib import logger
-from lib.strace import classes
+from lib.strace import (
+    atn_cache, classes, fast_parser, profiling, records, serialization, util
+)
+from lib.strace.cache import parse_cache
 from lib.strace.classes import Strace
 
 
@@ -31,6 +43,23 @@ from lib.strace.classes import Strace
 LIST_TREE = List[Union[str, 'LIST_TREE']]
 
 
+# Constants
+ENGINES = ('antlr', 'fast', 'lazy', 'verify')
+MIN_CHUNK_SIZE = 2 ** 20
+ASCII_CHECK_SIZE = 2 ** 20
+FOLLOW_INTERVAL = 0.5
+
+# Valid run-length shape of a file. See TraceLineStream.
+CHUNKED_SHAPE_RE = re.compile(r'B*L*T?B*')
+RECOVER_SHAPE_RE = re.compile(r'[BL]*T?B*')
+LINE_HEAD_RE = re.compile(
+    r'[ \t\f]*(?:\d+[ \t\f]+)?(?:'
+    r'(?P<signal>---)|(?P<exit>\+\+\+)|'
+    r'<\.\.\.[ \t\f]+(?P<resumed>\w+)[ \t\f]+resumed>|'
+    r'(?P<name>\w+)[ \t\f]*\()'
+)
+
+
 def _token_str(t: CommonToken) -> str:
     """Convert a token to a string.
     
@@ -131,6 +160,142 @@ class LexCancellationException(CancellationException):
         self.column = column
 
 
+class ByteInputStream(InputStream):
+    """ANTLR input stream over ASCII bytes.
+
+    ``InputStream`` stores its input as a string and as a list of code
+    points, which takes at least 9 bytes per character. Strace output is
+    ASCII, so each byte is its own code point. This stream looks ahead by
+    indexing into the bytes directly and only decodes the text of each
+    token. Backed by a memory map, nothing is copied up front at all.
+    """
+
+    def __init__(self,
+                 data: Union[bytes, mmap.mmap],
+                 name: str = '<bytes>'):
+        """Create a new byte input stream.
+
+        Parameters
+        ----------
+        data : Union[bytes, mmap.mmap]
+            ASCII input.
+        name : str
+            Input name.
+
+        Raises
+        ------
+        UnicodeDecodeError
+            Raised if the input is not ASCII, like ``FileStream``.
+        """
+        for start in range(0, len(data), ASCII_CHECK_SIZE):
+            chunk = data[start:start + ASCII_CHECK_SIZE]
+            if not chunk.isascii():
+                pos = next(i for i, b in enumerate(chunk) if b >= 0x80)
+                raise UnicodeDecodeError(
+                    'ascii',
+                    chunk,
+                    pos,
+                    pos + 1,
+                    f'ordinal not in range(128) at offset {start + pos}'
+                )
+
+        self.name = name
+        self.data = data
+        self._index = 0
+        self._size = len(data)
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'ByteInputStream':
+        """Create a byte input stream over a memory mapped file.
+
+        Parameters
+        ----------
+        path : Path
+            Path to the file. Empty files and files that cannot be mapped,
+            such as FIFOs, are read into memory instead.
+
+        Returns
+        -------
+        ByteInputStream
+            Input stream over the file contents.
+        """
+        with open(path, 'rb') as fd:
+            st = os.fstat(fd.fileno())
+            if not stat.S_ISREG(st.st_mode) or not st.st_size:
+                return cls(fd.read(), str(path))
+            return cls(
+                mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ),
+                str(path)
+            )
+
+    def LA(self, offset: int) -> int:
+        """Look ahead at a character.
+
+        Parameters
+        ----------
+        offset : int
+            Offset from the current position. 1 is the next character and -1
+            the previous one.
+
+        Returns
+        -------
+        int
+            Character code, or EOF outside of the input.
+        """
+        if offset == 0:
+            return 0
+        if offset < 0:
+            offset += 1
+        pos = self._index + offset - 1
+        if pos < 0 or pos >= self._size:
+            return Token.EOF
+        return self.data[pos]
+
+    def LT(self, offset: int) -> int:
+        """Look ahead at a character. See ``LA``.
+
+        Parameters
+        ----------
+        offset : int
+            Offset from the current position.
+
+        Returns
+        -------
+        int
+            Character code, or EOF outside of the input.
+        """
+        return self.LA(offset)
+
+    def getText(self, start: int, stop: int) -> str:
+        """Get the text in a range of the input.
+
+        Parameters
+        ----------
+        start : int
+            Index of the first character.
+        stop : int
+            Index of the last character, inclusive.
+
+        Returns
+        -------
+        str
+            Decoded text.
+        """
+        if start >= self._size:
+            return ''
+        return self.data[start:min(stop, self._size - 1) + 1].decode('ascii')
+
+    def __str__(self) -> str:
+        """Decode the entire input.
+
+        Returns
+        -------
+        str
+            Input text.
+        """
+        return self.data[:].decode('ascii')
+
+
 def _parse_number(num: str) -> int:
     """Parse a number literal as an int.
 
@@ -167,21 +332,24 @@ def _parse_number(num: str) -> int:
     return int(num, base)
 
 
-def _parse_input_stream(stream: InputStream, **kwargs) -> Strace:
-    """Parse an strace using a specific input stream.
+def _parse_rule(stream: InputStream, rule: str) -> Any:
+    """Parse an input stream from a grammar rule and visit the tree.
 
     Parameters
     ----------
     stream : InputStream
         Strace input stream.
-    **kwargs
-        Additional strace attributes that should be set.
+    rule : str
+        Name of the parser rule to start from.
 
     Returns
     -------
-    Strace
-        Parsed strace representation.
+    Any
+        Result of visiting the parse tree.
     """
+    # Start from warmed up DFAs saved by earlier processes
+    atn_cache.load()
+
     # Create lexer and token stream
     lexer = StraceLexer(stream)
     lexer.removeErrorListeners()
@@ -194,10 +362,17 @@ def _parse_input_stream(stream: InputStream, **kwargs) -> Strace:
     parser = StraceParser(token_stream)
     parser._errHandler = BailErrorStrategy()
 
-    # Parse the token stream for an strace context and visit the tree.
+    # Record prediction statistics if profiling the grammar
+    if profiling.active_profile is not None:
+        parser._interp = profiling.ProfilingATNSimulator(
+            parser,
+            profiling.active_profile
+        )
+
+    # Parse the token stream for the rule context and visit the tree.
     try:
 
-        strace = StraceVisitorImpl().visit(parser.strace())
+        return StraceVisitorImpl().visit(getattr(parser, rule)())
 
     except ParseCancellationException as e:
 
@@ -282,15 +457,149 @@ def _parse_input_stream(stream: InputStream, **kwargs) -> Strace:
         )
         raise
 
-    # Set additional attributes
+
+def set_attributes(strace: Strace, **kwargs) -> Strace:
+    """Set additional attributes on a parsed strace.
+
+    Metadata recorded by the parser, such as lines skipped in recover mode,
+    is merged with ``metadata`` instead of being replaced.
+
+    Parameters
+    ----------
+    strace : Strace
+        Parsed strace.
+    **kwargs
+        Additional strace attributes that should be set.
+
+    Returns
+    -------
+    Strace
+        The same strace.
+    """
     for k, v in kwargs.items():
+        if k == 'metadata' and strace.metadata:
+            v = {**strace.metadata, **(v or {})}
         if hasattr(strace, k):
             setattr(strace, k, v)
-
-    # Return formatted strace
     return strace
 
 
+def _file_stream(path: Path, data: Optional[bytes] = None) -> InputStream:
+    """Create an input stream for an entire strace file.
+
+    Parameters
+    ----------
+    path : Path
+        Path to strace file. Compressed files are decompressed.
+    data : Optional[bytes]
+        Decompressed file contents, if they were already read.
+
+    Returns
+    -------
+    InputStream
+        Input stream over the file contents. Uncompressed files are memory
+        mapped unless their contents are given.
+    """
+    if data is not None:
+        return ByteInputStream(data, str(path))
+    if not util.is_compressed(path):
+        return ByteInputStream.from_file(path)
+    with util.open_trace(path, 'rb') as fd:
+        return ByteInputStream(fd.read(), str(path))
+
+
+def _parse_input_stream(stream: InputStream, **kwargs) -> Strace:
+    """Parse an strace using a specific input stream.
+
+    Parameters
+    ----------
+    stream : InputStream
+        Strace input stream.
+    **kwargs
+        Additional strace attributes that should be set.
+
+    Returns
+    -------
+    Strace
+        Parsed strace representation.
+    """
+    return set_attributes(_parse_rule(stream, 'strace'), **kwargs)
+
+
+def _parse_trace_line(line: str) -> classes.TraceLine:
+    """Parse a single traceline with the ANTLR parser.
+
+    Parameters
+    ----------
+    line : str
+        Traceline without the trailing newline.
+
+    Returns
+    -------
+    classes.TraceLine
+        Parsed traceline.
+    """
+    return _parse_rule(InputStream(line + '\n'), 'trace_line')
+
+
+def parse_arguments(name: str,
+                    text: str,
+                    resumed: bool = False,
+                    unfinished: bool = False) -> List[Any]:
+    """Parse the raw argument text of a syscall.
+
+    The text is parsed with the fast parser, falling back to ANTLR for
+    arguments it does not support. ANTLR parses a syscall line rebuilt from
+    the text.
+
+    Parameters
+    ----------
+    name : str
+        Syscall name.
+    text : str
+        Raw argument text. See ``classes.LazySyscall``.
+    resumed : bool
+        If the syscall is resumed.
+    unfinished : bool
+        If the syscall is unfinished.
+
+    Returns
+    -------
+    List[Any]
+        Parsed arguments.
+    """
+    arguments = fast_parser.parse_arguments(text, resumed)
+    if arguments is not None:
+        return arguments
+    if resumed:
+        line = f'<... {name} resumed>{text}) = 0'
+    elif unfinished:
+        line = f'{name}({text} <unfinished ...>'
+    else:
+        line = f'{name}({text}) = 0'
+    return list(_parse_trace_line(line).arguments)
+
+
+def _trace_line_state(trace_line: classes.TraceLine) -> str:
+    """Serialize the complete state of a traceline for comparison.
+
+    Parameters
+    ----------
+    trace_line : classes.TraceLine
+        Traceline to serialize.
+
+    Returns
+    -------
+    str
+        JSON representation of the traceline, including all attributes.
+    """
+    return json.dumps(
+        trace_line,
+        cls=classes.StraceJSONEncoder,
+        sort_keys=True
+    )
+
+
 def _tree(o: Tree) -> LIST_TREE:
     """Convert a context tree into a list tree.
 
@@ -310,36 +619,1139 @@ def _tree(o: Tree) -> LIST_TREE:
         return o.getText()
 
 
-def parse(path: Path, **kwargs) -> Strace:
-    """Parse an strace output file.
+def _error_reason(e: Exception) -> str:
+    """Describe why a traceline could not be parsed.
+
+    Parameters
+    ----------
+    e : Exception
+        Exception raised while parsing the traceline.
+
+    Returns
+    -------
+    str
+        Short description of the error.
+    """
+    if isinstance(e, LexCancellationException):
+        return f'Lexer error at column {e.column}: {e.args[-1]}'
+
+    if isinstance(e, ParseCancellationException) and e.args:
+        cause = e.args[0]
+        if isinstance(cause, RecognitionException):
+            token = cause.offendingToken
+            return (
+                f'{cause.__class__.__name__} at column {token.column}: '
+                f'{token.text!r}'
+            )
+
+    return str(e) or e.__class__.__name__
+
+
+class StructureException(Exception):
+    """Raised when blank lines or the truncation marker are misplaced."""
+
+
+class TraceLineFilter:
+    """Select tracelines by syscall name or traceline type.
+
+    Filter values are syscall names, such as ``openat``, or traceline class
+    names, which are ``Syscall``, ``Signal``, and ``ExitStatement``. Class
+    names are capitalized, so they never clash with syscall names such as
+    ``exit``.
+
+    Lines are matched before they are parsed by recognizing only the
+    traceline type and syscall name at the start of the line, so filtered
+    lines are never parsed. Lines whose start is not recognized are parsed
+    and matched afterwards.
+    """
+
+    def __init__(self,
+                 include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None):
+        """Create a new traceline filter.
+
+        Parameters
+        ----------
+        include : Optional[Iterable[str]]
+            If set, only tracelines with one of these syscall names or types
+            are kept.
+        exclude : Optional[Iterable[str]]
+            Tracelines with one of these syscall names or types are dropped.
+        """
+        self.include = None if include is None else frozenset(include)
+        self.exclude = frozenset(exclude or ())
+
+    def _match_names(self, names: Tuple[str, ...]) -> bool:
+        """Check if a traceline with the given names is kept.
+
+        Parameters
+        ----------
+        names : Tuple[str, ...]
+            Traceline type and syscall name, if any.
+
+        Returns
+        -------
+        bool
+            True if the traceline is kept.
+        """
+        if self.include is not None and self.include.isdisjoint(names):
+            return False
+        return self.exclude.isdisjoint(names)
+
+    def match_line(self, line: str) -> bool:
+        """Check if an unparsed traceline may be kept.
+
+        Parameters
+        ----------
+        line : str
+            Traceline text.
+
+        Returns
+        -------
+        bool
+            False if the traceline is dropped. True if it is kept or its start
+            is not recognized.
+        """
+        match = LINE_HEAD_RE.match(line)
+        if match is None:
+            return True
+        if match['signal']:
+            return self._match_names(('Signal',))
+        if match['exit']:
+            return self._match_names(('ExitStatement',))
+        return self._match_names(
+            ('Syscall', match['resumed'] or match['name'])
+        )
+
+    def match(self, trace_line: classes.TraceLine) -> bool:
+        """Check if a parsed traceline is kept.
+
+        Parameters
+        ----------
+        trace_line : classes.TraceLine
+            Parsed traceline.
+
+        Returns
+        -------
+        bool
+            True if the traceline is kept.
+        """
+        if isinstance(trace_line, classes.Syscall):
+            return self._match_names(('Syscall', trace_line.name))
+        return self._match_names((type(trace_line).__name__,))
+
+    def match_encoded(self, trace_line: records.ENCODED_TRACE_LINE) -> bool:
+        """Check if an encoded traceline is kept.
+
+        Parameters
+        ----------
+        trace_line : records.ENCODED_TRACE_LINE
+            Process identifier and encoded traceline node.
+
+        Returns
+        -------
+        bool
+            True if the traceline is kept.
+        """
+        cls, _, kwargs = trace_line[1]
+        if cls is classes.Syscall:
+            return self._match_names(('Syscall', dict(kwargs)['name']))
+        return self._match_names((cls.__name__,))
+
+    def filter(self, strace: Strace) -> Strace:
+        """Remove the filtered tracelines from a parsed strace.
+
+        Parameters
+        ----------
+        strace : Strace
+            Parsed strace, modified in place.
+
+        Returns
+        -------
+        Strace
+            The same strace.
+        """
+        strace.trace_lines = [t for t in strace.trace_lines if self.match(t)]
+        return strace
+
+
+def _line_filter(include: Optional[Iterable[str]],
+                 exclude: Optional[Iterable[str]]
+                 ) -> Optional[TraceLineFilter]:
+    """Create a traceline filter if any filter values are given.
+
+    Parameters
+    ----------
+    include : Optional[Iterable[str]]
+        Syscall names or traceline types to keep.
+    exclude : Optional[Iterable[str]]
+        Syscall names or traceline types to drop.
+
+    Returns
+    -------
+    Optional[TraceLineFilter]
+        Traceline filter, or None if nothing is filtered.
+    """
+    if include is None and not exclude:
+        return None
+    return TraceLineFilter(include, exclude)
+
+
+class TraceLineStream:
+    """Stream of tracelines parsed one line at a time.
+
+    Each traceline is parsed on its own, so the parse tree for a line is
+    discarded as soon as its traceline is built. Peak memory while parsing
+    depends on the longest line rather than the size of the file.
+
+    The stream enforces the same file structure as the ``strace`` grammar
+    rule. Because the truncation marker can only be found at the end of the
+    file, ``truncated`` is only meaningful once the stream is exhausted.
+    ``shape`` records the runs of blank lines (B), tracelines (L), and the
+    truncation marker (T) seen, so that streams over consecutive chunks of a
+    file can be validated together.
+
+    In recover mode, lines that cannot be parsed are skipped instead of
+    failing the whole stream. Blank lines are allowed anywhere, and content
+    after the truncation marker is skipped. Each skipped line is recorded in
+    ``skipped`` as a dict with its ``line`` number and the ``reason``.
+
+    With a traceline filter, filtered lines count towards ``shape`` but are
+    not parsed, so errors in them are not reported.
+
+    In encoded mode, the fast parser yields a pid and encoded node for each
+    traceline it supports instead of an object. See ``records``.
+    """
+
+    def __init__(self,
+                 lines: Iterable[str],
+                 engine: str = 'antlr',
+                 recover: bool = False,
+                 line_filter: Optional[TraceLineFilter] = None,
+                 encoded: bool = False):
+        """Create a new traceline stream.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            Lines of strace output, including their trailing newlines.
+        engine : str
+            Parser engine. See ``parse``.
+        recover : bool
+            If true, skip lines that cannot be parsed.
+        line_filter : Optional[TraceLineFilter]
+            If set, only yield the tracelines that the filter keeps.
+        encoded : bool
+            If true, yield encoded tracelines where the fast parser supports
+            them. The engine is ignored.
+        """
+        _validate_engine(engine)
+        self.lines = lines
+        self.engine = engine
+        self.recover = recover
+        self.line_filter = line_filter
+        self.encoded = encoded
+        self.truncated = False
+        self.shape = ''
+        self.skipped = []
+
+    def __iter__(self) -> Iterator[classes.TraceLine]:
+        """Parse and yield each traceline.
+
+        Raises
+        ------
+        StructureException
+            Raised if a blank line or the truncation marker appears somewhere
+            the grammar does not allow it. Never raised in recover mode.
+
+        Yields
+        ------
+        classes.TraceLine
+            Parsed traceline.
+        """
+        truncated = False
+        blank_after_lines = False
+        seen_lines = False
+        shape = []
+
+        for lineno, line in enumerate(self.lines, 1):
+
+            # Strip the line terminator
+            has_newline = line.endswith('\n')
+            if has_newline:
+                line = line[:-2] if line.endswith('\r\n') else line[:-1]
+
+            # Blank lines and the truncation marker are only allowed before
+            # and after all tracelines.
+            stripped = line.strip(' \t\f')
+            if not stripped:
+                blank_after_lines = seen_lines or truncated
+                kind = 'B'
+            elif truncated and self.recover:
+                self._skip(lineno, 'Content after the truncation marker.')
+                continue
+            elif (truncated or blank_after_lines) and not self.recover:
+                raise StructureException(
+                    f'Unexpected content on line {lineno}.'
+                )
+            elif stripped == 'TRUNCATED':
+                truncated = True
+                kind = 'T'
+            elif not has_newline and not self.recover:
+                raise StructureException(f'Missing newline on line {lineno}.')
+            else:
+                seen_lines = True
+                kind = 'L'
+
+            # Record the line kind
+            if not shape or shape[-1] != kind:
+                shape.append(kind)
+            if kind != 'L':
+                continue
+
+            # Skip filtered lines without parsing them
+            line_filter = self.line_filter
+            if line_filter is not None and not line_filter.match_line(line):
+                continue
+
+            # Parse tracelines, resynchronizing at the next line on error
+            try:
+                trace_line = self._parse_line(lineno, line)
+            except Exception as e:
+                if not self.recover:
+                    raise
+                self._skip(lineno, _error_reason(e))
+                continue
+            if line_filter is None or self._match(trace_line):
+                yield trace_line
+
+        self.truncated = truncated
+        self.shape = ''.join(shape)
+
+    def _match(self, trace_line: Union[classes.TraceLine,
+                                       records.ENCODED_TRACE_LINE]) -> bool:
+        """Check if a parsed traceline is kept by the stream filter.
+
+        Parameters
+        ----------
+        trace_line : Union[classes.TraceLine, records.ENCODED_TRACE_LINE]
+            Traceline object or encoded traceline.
+
+        Returns
+        -------
+        bool
+            True if the traceline is kept.
+        """
+        if isinstance(trace_line, classes.TraceLine):
+            return self.line_filter.match(trace_line)
+        return self.line_filter.match_encoded(trace_line)
+
+    def _skip(self, lineno: int, reason: str):
+        """Record a skipped line.
+
+        Parameters
+        ----------
+        lineno : int
+            Line number.
+        reason : str
+            Why the line was skipped.
+        """
+        logger.warning(f'Skipping line {lineno}: {reason}')
+        self.skipped.append({'line': lineno, 'reason': reason})
+
+    def _parse_line(self,
+                    lineno: int,
+                    line: str) -> Union[classes.TraceLine,
+                                        records.ENCODED_TRACE_LINE]:
+        """Parse a single traceline with the stream engine.
+
+        Parameters
+        ----------
+        lineno : int
+            Line number, used for error reporting.
+        line : str
+            Traceline without the trailing newline.
+
+        Raises
+        ------
+        Exception
+            Raised in verify mode if the parsers disagree.
+
+        Returns
+        -------
+        Union[classes.TraceLine, records.ENCODED_TRACE_LINE]
+            Parsed traceline, encoded in encoded mode if supported by the
+            fast parser.
+        """
+        if self.encoded:
+            encoded = fast_parser.encode_trace_line(line)
+            return _parse_trace_line(line) if encoded is None else encoded
+        if self.engine == 'antlr':
+            return _parse_trace_line(line)
+
+        # Use the fast parser, falling back to ANTLR when needed
+        trace_line = fast_parser.parse_trace_line(
+            line, lazy=self.engine == 'lazy'
+        )
+        if trace_line is None:
+            return _parse_trace_line(line)
+
+        # Compare against ANTLR in verify mode
+        if self.engine == 'verify':
+            expected = _trace_line_state(_parse_trace_line(line))
+            actual = _trace_line_state(trace_line)
+            if expected != actual:
+                logger.error(
+                    f'\n'
+                    f'    Parser mismatch at line {lineno}.\n'
+                    f'    Line: {line}\n'
+                    f'    ANTLR: {expected}\n'
+                    f'    Fast: {actual}'
+                )
+                raise Exception(
+                    f'Fast and ANTLR parsers disagree on line {lineno}.'
+                )
+
+        return trace_line
+
+
+def _read_lines(path: Path,
+                errors: str = 'strict',
+                data: Optional[bytes] = None) -> Iterator[str]:
+    """Read lines from a file one at a time.
+
+    Lines are split on newlines only and decoded as ASCII, the same way as
+    ``ByteInputStream``. Compressed files are decompressed as they are read.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+    errors : str
+        Decoding error handler. With ``replace``, non-ASCII bytes are decoded
+        to a replacement character that fails to parse, so that only the
+        affected lines are skipped in recover mode.
+    data : Optional[bytes]
+        Decompressed file contents, if they were already read. Lines are
+        split from the contents instead of reading the file.
+
+    Yields
+    ------
+    str
+        Each line, including its trailing newline.
+    """
+    if data is not None:
+        yield from _split_lines(data.decode('ascii', errors))
+        return
+    with util.open_trace(path, 'rb') as fd:
+        for line in fd:
+            yield line.decode('ascii', errors)
+
+
+def _split_lines(string: str) -> Iterator[str]:
+    """Split a string into lines on newlines only.
+
+    Parameters
+    ----------
+    string : str
+        String to split.
+
+    Yields
+    ------
+    str
+        Each line, including its trailing newline.
+    """
+    start = 0
+    while True:
+        end = string.find('\n', start)
+        if end < 0:
+            break
+        yield string[start:end + 1]
+        start = end + 1
+    if start < len(string):
+        yield string[start:]
+
+
+def _follow_lines(path: Path,
+                  finished: Callable[[], bool],
+                  poll_interval: float = FOLLOW_INTERVAL,
+                  errors: str = 'strict') -> Iterator[str]:
+    """Read lines from a file while it is being written.
+
+    Regular files are polled for new data until ``finished`` returns true and
+    no more data arrives for one poll interval. FIFOs are read until all
+    writers close them.
+
+    Parameters
+    ----------
+    path : Path
+        Path to a regular file or FIFO.
+    finished : Callable[[], bool]
+        Returns true once the writer is done with a regular file.
+    poll_interval : float
+        Seconds to wait for new data at the end of a regular file.
+    errors : str
+        Decoding error handler. See ``_read_lines``.
+
+    Yields
+    ------
+    str
+        Each complete line, including its trailing newline. A final line
+        without a newline is yielded once the file is finished.
+    """
+    fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+    with open(path, 'rb') as fd:
+        pending = b''
+        done = False
+        while True:
+
+            # Read available data. Partial lines are kept until completed.
+            data = fd.readline()
+            if data:
+                pending += data
+                if pending.endswith(b'\n'):
+                    yield pending.decode('ascii', errors)
+                    pending = b''
+                done = False
+                continue
+
+            # At the end of the file, stop if the writer is done
+            if fifo or done:
+                break
+            done = finished()
+            time.sleep(poll_interval)
+
+        if pending:
+            yield pending.decode('ascii', errors)
+
+
+def iter_trace_lines(path: Path,
+                     engine: str = 'antlr',
+                     recover: bool = False,
+                     include: Optional[Iterable[str]] = None,
+                     exclude: Optional[Iterable[str]] = None
+                     ) -> TraceLineStream:
+    """Stream the tracelines of an strace output file.
+
+    Parameters
+    ----------
+    path : Path
+        Path to strace file.
+    engine : str
+        Parser engine. See ``parse``.
+    recover : bool
+        If true, skip lines that cannot be parsed. See ``TraceLineStream``.
+    include : Optional[Iterable[str]]
+        Syscall names or traceline types to keep. See ``TraceLineFilter``.
+    exclude : Optional[Iterable[str]]
+        Syscall names or traceline types to drop. See ``TraceLineFilter``.
+
+    Returns
+    -------
+    TraceLineStream
+        Iterable of parsed tracelines. The file is opened when iteration
+        starts.
+    """
+    return TraceLineStream(
+        _read_lines(path, 'replace' if recover else 'strict'),
+        engine=engine,
+        recover=recover,
+        line_filter=_line_filter(include, exclude)
+    )
+
+
+def build_strace(trace_lines: TraceLineStream, **kwargs) -> Strace:
+    """Build an strace by consuming a traceline stream.
+
+    Parameters
+    ----------
+    trace_lines : TraceLineStream
+        Traceline stream to consume.
+    **kwargs
+        Additional strace attributes that should be set.
+
+    Returns
+    -------
+    Strace
+        Parsed strace representation. Lines skipped in recover mode are
+        listed in ``metadata['skipped_lines']``.
+    """
+    strace = classes.Strace(trace_lines=list(trace_lines))
+    strace.truncated = trace_lines.truncated
+    if trace_lines.skipped:
+        strace.metadata = {'skipped_lines': trace_lines.skipped}
+    return set_attributes(strace, **kwargs)
+
+
+def _chunk_offsets(path: Path, chunks: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that start and end on line boundaries.
+
+    Parameters
+    ----------
+    path : Path
+        Path to the file.
+    chunks : int
+        Desired number of chunks.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        Non-empty (start, end) byte ranges covering the file.
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as fd:
+        for i in range(1, chunks):
+            fd.seek(max(size * i // chunks, offsets[-1]))
+            fd.readline()
+            offsets.append(fd.tell())
+    offsets.append(size)
+    return [(s, e) for s, e in zip(offsets, offsets[1:]) if e > s]
+
+
+def _parse_chunk(path: Path,
+                 start: int,
+                 end: int,
+                 engine: str,
+                 recover: bool = False,
+                 line_filter: Optional[TraceLineFilter] = None
+                 ) -> Tuple[bytes, bool, str, List[dict], int]:
+    """Parse the tracelines in a chunk of a file.
+
+    The tracelines are returned in the binary format of ``serialization``,
+    which is smaller than a pickle and loads in about half the time. Loading
+    the chunks is the part of a chunked parse that is not parallel.
+
+    Parameters
+    ----------
+    path : Path
+        Path to strace file.
+    start : int
+        Chunk start offset, at the beginning of a line.
+    end : int
+        Chunk end offset, at the end of a line or file.
+    engine : str
+        Parser engine.
+    recover : bool
+        If true, skip lines that cannot be parsed.
+    line_filter : Optional[TraceLineFilter]
+        If set, only keep the tracelines that the filter keeps.
+
+    Returns
+    -------
+    Tuple[bytes, bool, str, List[dict], int]
+        Serialized strace of the parsed tracelines, whether the chunk
+        contained the truncation marker,
+        the shape of the chunk, the skipped lines numbered from the start of
+        the chunk, and the number of newlines in the chunk. See
+        ``TraceLineStream``.
+    """
+    with open(path, 'rb') as fd:
+        fd.seek(start)
+        string = fd.read(end - start).decode(
+            'ascii',
+            'replace' if recover else 'strict'
+        )
+    stream = TraceLineStream(
+        _split_lines(string),
+        engine=engine,
+        recover=recover,
+        line_filter=line_filter
+    )
+    trace_lines = list(stream)
+    return (
+        serialization.dumps(classes.Strace(trace_lines)),
+        stream.truncated,
+        stream.shape,
+        stream.skipped,
+        string.count('\n'),
+    )
+
+
+def _parse_file_chunked(path: Path,
+                        engine: str,
+                        workers: int,
+                        recover: bool = False,
+                        line_filter: Optional[TraceLineFilter] = None
+                        ) -> Strace:
+    """Parse an strace output file in chunks using a process pool.
 
     Parameters
     ----------
     path : Path
         Path to strace file.
+    engine : str
+        Parser engine.
+    workers : int
+        Maximum number of processes.
+    recover : bool
+        If true, skip lines that cannot be parsed.
+    line_filter : Optional[TraceLineFilter]
+        If set, only keep the tracelines that the filter keeps.
+
+    Raises
+    ------
+    StructureException
+        Raised if blank lines or the truncation marker are misplaced in the
+        file as a whole.
+
+    Returns
+    -------
+    Strace
+        Parsed strace with the tracelines of all chunks in file order.
+    """
+    offsets = _chunk_offsets(path, workers)
+    with ProcessPoolExecutor(max_workers=len(offsets)) as executor:
+        futures = [
+            executor.submit(
+                _parse_chunk, path, start, end, engine, recover, line_filter
+            )
+            for start, end in offsets
+        ]
+        results = [future.result() for future in futures]
+
+    # Validate the structure of the file as a whole. Blank lines are allowed
+    # anywhere in recover mode.
+    shape = ''.join(r[2] for r in results)
+    shape_re = RECOVER_SHAPE_RE if recover else CHUNKED_SHAPE_RE
+    if shape.count('T') > 1 or not shape_re.fullmatch(shape):
+        raise StructureException('Misplaced blank line or truncation marker.')
+
+    strace = classes.Strace(
+        trace_lines=list(chain.from_iterable(
+            serialization.loads(r[0]).trace_lines for r in results
+        )),
+        truncated=any(r[1] for r in results),
+    )
+
+    # Renumber skipped lines from the start of the file
+    skipped = []
+    offset = 0
+    for result in results:
+        skipped += [
+            {**s, 'line': s['line'] + offset} for s in result[3]
+        ]
+        offset += result[4]
+    if skipped:
+        strace.metadata = {'skipped_lines': skipped}
+
+    return strace
+
+
+def _validate_engine(engine: str):
+    """Validate a parser engine name.
+
+    Parameters
+    ----------
+    engine : str
+        Parser engine name.
+
+    Raises
+    ------
+    ValueError
+        Raised if the engine is unknown.
+    """
+    if engine not in ENGINES:
+        raise ValueError(
+            f'Unknown parser engine `{engine}`. Must be one of {ENGINES}.'
+        )
+
+
+def _parse_file(path: Path,
+                engine: str,
+                stream: bool,
+                workers: int = 1,
+                recover: bool = False,
+                line_filter: Optional[TraceLineFilter] = None,
+                data: Optional[bytes] = None) -> Strace:
+    """Parse an strace output file without setting additional attributes.
+
+    Parameters
+    ----------
+    path : Path
+        Path to strace file.
+    engine : str
+        Parser engine.
+    stream : bool
+        If tracelines should be streamed.
+    workers : int
+        Maximum number of processes for parsing chunks of the file.
+    recover : bool
+        If true, skip lines that cannot be parsed.
+    line_filter : Optional[TraceLineFilter]
+        If set, only keep the tracelines that the filter keeps.
+    data : Optional[bytes]
+        Decompressed file contents, if they were already read. The file is
+        then only read again to parse it in chunks.
 
     Returns
     -------
     Strace
         Parsed strace representation.
     """
-    return _parse_input_stream(FileStream(str(path)), **kwargs)
+    # Only split files that are large enough to benefit, into no more chunks
+    # than there are CPUs. Compressed files cannot be split.
+    workers = min(
+        workers,
+        os.path.getsize(path) // MIN_CHUNK_SIZE,
+        os.cpu_count() or 1,
+    )
+    if util.is_compressed(path):
+        workers = 1
+
+    if (engine == 'antlr' and not stream and workers <= 1 and not recover
+            and line_filter is None):
+        return _parse_input_stream(_file_stream(path, data))
+
+    # Stream tracelines, in chunks if requested. Structural errors are
+    # reported by the whole file parser, which logs the offending tokens.
+    # In recover mode, the file is streamed again without chunks instead.
+    try:
+        if workers > 1:
+            return _parse_file_chunked(
+                path, engine, workers, recover, line_filter
+            )
+        return build_strace(TraceLineStream(
+            _read_lines(path, 'replace' if recover else 'strict', data),
+            engine=engine,
+            recover=recover,
+            line_filter=line_filter
+        ))
+    except StructureException:
+        if recover:
+            return build_strace(TraceLineStream(
+                _read_lines(path, 'replace', data),
+                engine=engine,
+                recover=True,
+                line_filter=line_filter
+            ))
+        strace = _parse_input_stream(_file_stream(path, data))
+        if line_filter is not None:
+            line_filter.filter(strace)
+        return strace
+
+
+def parse(path: Path,
+          engine: str = 'antlr',
+          stream: bool = False,
+          cache: bool = False,
+          workers: int = 1,
+          recover: bool = False,
+          include: Optional[Iterable[str]] = None,
+          exclude: Optional[Iterable[str]] = None,
+          flyweights: Optional[classes.FlyweightStore] = None,
+          keep_text: bool = False,
+          **kwargs) -> Strace:
+    """Parse an strace output file.
 
+    Parameters
+    ----------
+    path : Path
+        Path to strace file. Files ending in ``.gz`` or ``.xz`` are
+        decompressed as they are read.
+    engine : str
+        Parser engine. One of ``antlr`` for the generated parser, ``fast`` for
+        the hand-written traceline parser with ANTLR fallback, ``lazy`` for
+        the fast parser with syscall arguments parsed when first accessed,
+        or ``verify`` to run both and check that they agree. With ``lazy``,
+        a line whose arguments cannot be parsed fails when its arguments are
+        accessed instead of during parsing.
+    stream : bool
+        If true, parse the file one traceline at a time instead of building
+        a parse tree for the entire file. The ``fast``, ``lazy``, and
+        ``verify`` engines always stream.
+    cache : bool
+        If true, load the parsed strace from the parse cache when the file,
+        parser version, and parse options are unchanged, and store it in the
+        cache otherwise.
+    workers : int
+        If greater than one, large files are split into chunks on line
+        boundaries that are parsed in a process pool. The chunks are parsed
+        one traceline at a time and their tracelines concatenated in order.
+        At most one process per CPU is used. Chunking pays off most with the
+        ``antlr`` engine, since the chunks are decoded in this process.
+    recover : bool
+        If true, parse one traceline at a time and skip lines that cannot be
+        parsed instead of failing the whole file. Skipped line numbers and
+        the reasons are listed in ``metadata['skipped_lines']``.
+    include : Optional[Iterable[str]]
+        If set, only keep tracelines with one of these syscall names or
+        traceline types (``Syscall``, ``Signal``, or ``ExitStatement``).
+        Filtered lines are skipped before they are parsed, so filtering
+        parses one traceline at a time.
+    exclude : Optional[Iterable[str]]
+        Drop tracelines with one of these syscall names or traceline types.
+        See ``include``.
+    flyweights : Optional[classes.FlyweightStore]
+        If set, tracelines identical to ones already in the store are
+        replaced with the shared instances.
+    keep_text : bool
+        If true, read the file into memory once, parse it from memory, and
+        keep its text in ``Strace.text`` so that it can be stored without
+        reading the file again. The text is decoded like a file opened in
+        text mode.
+    **kwargs
+        Additional strace attributes that should be set.
 
-def parse_string(string: str, **kwargs) -> Strace:
+    Returns
+    -------
+    Strace
+        Parsed strace representation.
+    """
+    _validate_engine(engine)
+    line_filter = _line_filter(include, exclude)
+    data = None
+    if keep_text:
+        with util.open_trace(path, 'rb') as fd:
+            data = fd.read()
+    if not cache:
+        strace = _parse_file(
+            path, engine, stream, workers, recover, line_filter, data
+        )
+        return _finish_parse(strace, data, flyweights, **kwargs)
+
+    # Options that affect the parse result
+    options = {
+        'engine': engine,
+        'stream': stream,
+        'recover': recover,
+        'include': None if include is None else sorted(set(include)),
+        'exclude': sorted(set(exclude or ())),
+    }
+
+    # Load from the cache, parsing on a miss. The key is computed from the
+    # file as stored, which is the text that was already read unless the
+    # file is compressed.
+    if data is not None and not util.is_compressed(path):
+        key = parse_cache.key(data, options)
+    else:
+        with open(path, 'rb') as fd:
+            key = parse_cache.key(fd.read(), options)
+    strace = parse_cache.get(key)
+    if strace is None:
+        strace = _parse_file(
+            path, engine, stream, workers, recover, line_filter, data
+        )
+        parse_cache.put(key, strace)
+    else:
+        logger.debug(f'Loaded {path} from the parse cache.')
+
+    return _finish_parse(strace, data, flyweights, **kwargs)
+
+
+def _finish_parse(strace: Strace,
+                  data: Optional[bytes],
+                  flyweights: Optional[classes.FlyweightStore],
+                  **kwargs) -> Strace:
+    """Set the attributes of a parsed strace file.
+
+    Parameters
+    ----------
+    strace : Strace
+        Parsed strace.
+    data : Optional[bytes]
+        Decompressed file contents, if they were kept.
+    flyweights : Optional[classes.FlyweightStore]
+        Flyweight store to share tracelines with. See ``parse``.
+    **kwargs
+        Additional strace attributes that should be set.
+
+    Returns
+    -------
+    Strace
+        The same strace.
+    """
+    if flyweights is not None:
+        flyweights.share(strace)
+    if data is not None:
+        text = io.TextIOWrapper(io.BytesIO(data)).read()
+        object.__setattr__(strace, 'text', text)
+    return set_attributes(strace, **kwargs)
+
+
+def parse_records(path: Path,
+                  recover: bool = False,
+                  include: Optional[Iterable[str]] = None,
+                  exclude: Optional[Iterable[str]] = None
+                  ) -> records.TraceLineRecords:
+    """Parse an strace output file into compact traceline records.
+
+    Tracelines are parsed one at a time with the fast parser, which emits
+    encoded records instead of objects. Lines it does not support are parsed
+    with ANTLR and kept as objects. Use ``TraceLineRecords.to_strace`` to
+    convert the records to a strace.
+
+    Parameters
+    ----------
+    path : Path
+        Path to strace file.
+    recover : bool
+        If true, skip lines that cannot be parsed. See ``parse``.
+    include : Optional[Iterable[str]]
+        Syscall names or traceline types to keep. See ``parse``.
+    exclude : Optional[Iterable[str]]
+        Syscall names or traceline types to drop. See ``parse``.
+
+    Returns
+    -------
+    records.TraceLineRecords
+        Traceline records.
+    """
+    line_filter = _line_filter(include, exclude)
+    trace_records = records.TraceLineRecords()
+    stream = TraceLineStream(
+        _read_lines(path, 'replace' if recover else 'strict'),
+        recover=recover,
+        line_filter=line_filter,
+        encoded=True
+    )
+    try:
+        trace_records.extend(stream)
+    except StructureException:
+        strace = _parse_input_stream(_file_stream(path))
+        if line_filter is not None:
+            line_filter.filter(strace)
+        trace_records = records.TraceLineRecords()
+        trace_records.extend(strace.trace_lines)
+        trace_records.truncated = strace.truncated
+        return trace_records
+
+    trace_records.truncated = stream.truncated
+    trace_records.skipped = stream.skipped
+    return trace_records
+
+
+def parse_string(string: str,
+                 engine: str = 'antlr',
+                 stream: bool = False,
+                 recover: bool = False,
+                 include: Optional[Iterable[str]] = None,
+                 exclude: Optional[Iterable[str]] = None,
+                 **kwargs) -> Strace:
     """Parse an strace string.
 
     Parameters
     ----------
     string : str
         String containing strace output.
+    engine : str
+        Parser engine. See ``parse``.
+    stream : bool
+        If true, parse one traceline at a time. See ``parse``.
+    recover : bool
+        If true, skip lines that cannot be parsed. See ``parse``.
+    include : Optional[Iterable[str]]
+        Syscall names or traceline types to keep. See ``parse``.
+    exclude : Optional[Iterable[str]]
+        Syscall names or traceline types to drop. See ``parse``.
+    **kwargs
+        Additional strace attributes that should be set.
 
     Returns
     -------
     Strace
         Parsed strace representation.
     """
-    return _parse_input_stream(InputStream(string), **kwargs)
+    _validate_engine(engine)
+    line_filter = _line_filter(include, exclude)
+    if (engine == 'antlr' and not stream and not recover
+            and line_filter is None):
+        return _parse_input_stream(InputStream(string), **kwargs)
+
+    # Stream tracelines
+    try:
+        return build_strace(
+            TraceLineStream(
+                _split_lines(string),
+                engine=engine,
+                recover=recover,
+                line_filter=line_filter
+            ),
+            **kwargs
+        )
+    except StructureException:
+        strace = _parse_input_stream(InputStream(string), **kwargs)
+        if line_filter is not None:
+            line_filter.filter(strace)
+        return strace
+
+
+def follow(path: Path,
+           finished: Callable[[], bool],
+           engine: str = 'antlr',
+           recover: bool = False,
+           poll_interval: float = FOLLOW_INTERVAL,
+           include: Optional[Iterable[str]] = None,
+           exclude: Optional[Iterable[str]] = None,
+           **kwargs) -> Strace:
+    """Parse an strace output file while it is being written.
+
+    Tracelines are parsed as they are written, so parsing overlaps with
+    collection and the strace is ready shortly after the traced process
+    exits. If the file as a whole is not a valid strace, a regular file is
+    parsed again once it is finished.
+
+    Parameters
+    ----------
+    path : Path
+        Path to a regular file or FIFO that strace output is written to.
+    finished : Callable[[], bool]
+        Returns true once the writer is done with a regular file. See
+        ``_follow_lines``.
+    engine : str
+        Parser engine. See ``parse``.
+    recover : bool
+        If true, skip lines that cannot be parsed. See ``parse``.
+    poll_interval : float
+        Seconds to wait for new data at the end of a regular file.
+    include : Optional[Iterable[str]]
+        Syscall names or traceline types to keep. See ``parse``.
+    exclude : Optional[Iterable[str]]
+        Syscall names or traceline types to drop. See ``parse``.
+    **kwargs
+        Additional strace attributes that should be set.
+
+    Raises
+    ------
+    StructureException
+        Raised if a FIFO does not contain a valid strace.
+
+    Returns
+    -------
+    Strace
+        Parsed strace representation.
+    """
+    lines = _follow_lines(
+        path,
+        finished,
+        poll_interval,
+        'replace' if recover else 'strict'
+    )
+    try:
+        return build_strace(
+            TraceLineStream(
+                lines,
+                engine=engine,
+                recover=recover,
+                line_filter=_line_filter(include, exclude)
+            ),
+            **kwargs
+        )
+    except StructureException:
+        if stat.S_ISFIFO(os.stat(path).st_mode):
+            raise
+
+        # Wait for the rest of the file and parse it as a whole
+        for _ in lines:
+            pass
+        return parse(
+            path,
+            engine=engine,
+            recover=recover,
+            include=include,
+            exclude=exclude,
+            **kwargs
+        )
 
 
 class StraceVisitorImpl(StraceParserVisitor):
@@ -420,9 +1832,10 @@ class StraceVisitorImpl(StraceParserVisitor):
 
         # Get syscall name
         if not resumed:
-            kwargs['name'] = ctx.syscall_start().IDENTIFIER().getText()
+            name = ctx.syscall_start().IDENTIFIER().getText()
         else:
-            kwargs['name'] = resumed.IDENTIFIER().getText()
+            name = resumed.IDENTIFIER().getText()
+        kwargs['name'] = util.intern(name)
 
         # Get syscall arguments
         kwargs['arguments'] = []
@@ -508,7 +1921,9 @@ class StraceVisitorImpl(StraceParserVisitor):
         """
         # Get identifier
         if ctx.IDENTIFIER():
-            identifier = classes.Identifier(ctx.IDENTIFIER().getText())
+            identifier = classes.Identifier(
+                util.intern(ctx.IDENTIFIER().getText())
+            )
         else:
             identifier = None
 
@@ -546,9 +1961,11 @@ class StraceVisitorImpl(StraceParserVisitor):
             return classes.NumberLiteral(_parse_number(ctx.NUMBER().getText()))
         elif ctx.STRING():
             s = ctx.STRING().getText().rstrip('.')[1:-1]
-            return classes.StringLiteral(s)
+            return classes.StringLiteral(util.intern(s))
         elif ctx.IDENTIFIER():
-            return classes.Identifier(ctx.IDENTIFIER().getText())
+            return classes.Identifier(
+                util.intern(ctx.IDENTIFIER().getText())
+            )
         else:
             return self.visit(
                 ctx.collection()
@@ -784,7 +2201,7 @@ class StraceVisitorImpl(StraceParserVisitor):
         classes.BooleanExpression
             Boolean expression parsed from ctx.
         """
-        return classes.BooleanExpression(ctx.getText())
+        return classes.BooleanExpression(util.intern(ctx.getText()))
 
     def visitReturn_notes(self, ctx: StraceParser.Return_notesContext) -> str:
         """Visit a return notes context.
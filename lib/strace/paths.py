@@ -9,3 +9,5 @@ from lib import BASE_DIR
 COMPUTED = BASE_DIR / 'computed'
 STRACE = COMPUTED / 'strace'
 RAW_STRACES = STRACE / 'raw'
+PARSE_CACHE = STRACE / 'parse-cache'
+ATN_CACHE = STRACE / 'atn-cache'
@@ -0,0 +1,343 @@
+"""Grammar profiling for the strace parser.
+
+The Python ANTLR runtime does not ship the profiling ATN simulator of the
+Java runtime. ``ProfilingATNSimulator`` collects the same core statistics for
+each parser decision: invocations, time spent predicting, SLL and full LL
+lookahead depth, fallbacks from SLL to full LL prediction, DFA cache misses,
+and ambiguities. Statistics are aggregated in a ``GrammarProfile`` across
+every parse made while profiling is active, so profiling a whole corpus shows
+which grammar rules are expensive to predict.
+
+Only decisions made by adaptive prediction are profiled. LL(1) decisions are
+generated as plain token switches and are always cheap.
+"""
+
+
+# Imports
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+from antlr4 import Parser
+from antlr4.atn.ParserATNSimulator import ParserATNSimulator
+
+
+# Constants
+# Report columns as (header, DecisionProfile attribute or property)
+REPORT_COLUMNS = [
+    ('Decision', 'decision'),
+    ('Rule', 'rule'),
+    ('Calls', 'invocations'),
+    ('Time ms', 'time_ms'),
+    ('SLL k', 'sll_mean_lookahead'),
+    ('SLL max', 'sll_max_lookahead'),
+    ('LL', 'll_fallbacks'),
+    ('LL k', 'll_mean_lookahead'),
+    ('LL max', 'll_max_lookahead'),
+    ('DFA miss', 'dfa_misses'),
+    ('Ambig', 'ambiguities'),
+]
+
+
+class DecisionProfile:
+    """Prediction statistics for a single parser decision."""
+
+    def __init__(self, decision: int, rule: str):
+        """Create empty decision statistics.
+
+        Parameters
+        ----------
+        decision : int
+            Decision number.
+        rule : str
+            Name of the rule containing the decision.
+        """
+        self.decision = decision
+        self.rule = rule
+        self.invocations = 0
+        self.time_ns = 0
+        self.sll_lookahead = 0
+        self.sll_max_lookahead = 0
+        self.ll_fallbacks = 0
+        self.ll_lookahead = 0
+        self.ll_max_lookahead = 0
+        self.dfa_misses = 0
+        self.ambiguities = 0
+
+    @property
+    def time_ms(self) -> float:
+        """Total prediction time in milliseconds."""
+        return self.time_ns / 1e6
+
+    @property
+    def sll_mean_lookahead(self) -> float:
+        """Mean number of tokens examined during SLL prediction."""
+        return self.sll_lookahead / max(self.invocations, 1)
+
+    @property
+    def ll_mean_lookahead(self) -> float:
+        """Mean number of tokens examined during full LL prediction."""
+        return self.ll_lookahead / max(self.ll_fallbacks, 1)
+
+    def add(self, other: 'DecisionProfile'):
+        """Add the statistics of another profile of the same decision.
+
+        Parameters
+        ----------
+        other : DecisionProfile
+            Statistics to add.
+        """
+        self.invocations += other.invocations
+        self.time_ns += other.time_ns
+        self.sll_lookahead += other.sll_lookahead
+        self.sll_max_lookahead = max(
+            self.sll_max_lookahead,
+            other.sll_max_lookahead
+        )
+        self.ll_fallbacks += other.ll_fallbacks
+        self.ll_lookahead += other.ll_lookahead
+        self.ll_max_lookahead = max(
+            self.ll_max_lookahead,
+            other.ll_max_lookahead
+        )
+        self.dfa_misses += other.dfa_misses
+        self.ambiguities += other.ambiguities
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a dictionary.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Report column values keyed by attribute name.
+        """
+        return {attr: getattr(self, attr) for _, attr in REPORT_COLUMNS}
+
+
+class GrammarProfile:
+    """Prediction statistics aggregated across parses."""
+
+    def __init__(self):
+        """Create an empty grammar profile."""
+        self.decisions: Dict[int, DecisionProfile] = {}
+
+    def decision(self, parser: Parser, decision: int) -> DecisionProfile:
+        """Get the statistics of a decision, creating them if needed.
+
+        Parameters
+        ----------
+        parser : Parser
+            Parser making the decision.
+        decision : int
+            Decision number.
+
+        Returns
+        -------
+        DecisionProfile
+            Decision statistics.
+        """
+        profile = self.decisions.get(decision)
+        if profile is None:
+            state = parser.atn.decisionToState[decision]
+            profile = self.decisions[decision] = DecisionProfile(
+                decision,
+                parser.ruleNames[state.ruleIndex]
+            )
+        return profile
+
+    def rules(self) -> List[DecisionProfile]:
+        """Aggregate decision statistics by rule.
+
+        Returns
+        -------
+        List[DecisionProfile]
+            Statistics for each rule with a profiled decision, with the
+            decision number set to -1.
+        """
+        rules = {}
+        for profile in self.decisions.values():
+            if profile.rule not in rules:
+                rules[profile.rule] = DecisionProfile(-1, profile.rule)
+            rules[profile.rule].add(profile)
+        return list(rules.values())
+
+    def report(self) -> str:
+        """Format the profile as text tables.
+
+        Decisions and rules are sorted by total prediction time, most
+        expensive first.
+
+        Returns
+        -------
+        str
+            Per decision and per rule tables.
+        """
+        def table(profiles: List[DecisionProfile], columns: list) -> str:
+            rows = [[header for header, _ in columns]]
+            for profile in sorted(profiles, key=lambda p: -p.time_ns):
+                row = []
+                for _, attr in columns:
+                    value = getattr(profile, attr)
+                    row.append(
+                        f'{value:.2f}' if isinstance(value, float)
+                        else str(value)
+                    )
+                rows.append(row)
+            widths = [max(map(len, column)) for column in zip(*rows)]
+            return '\n'.join(
+                '    ' + '  '.join(
+                    cell.ljust(w) if attr == 'rule' else cell.rjust(w)
+                    for cell, w, (_, attr) in zip(row, widths, columns)
+                ).rstrip()
+                for row in rows
+            )
+
+        # Rules have no decision number
+        return (
+            f'\n'
+            f'    Grammar profile by decision\n'
+            f'{table(list(self.decisions.values()), REPORT_COLUMNS)}\n'
+            f'\n'
+            f'    Grammar profile by rule\n'
+            f'{table(self.rules(), REPORT_COLUMNS[1:])}'
+        )
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Convert to a dictionary.
+
+        Returns
+        -------
+        Dict[str, List[Dict[str, Any]]]
+            Decision and rule statistics.
+        """
+        return {
+            'decisions': [
+                p.to_dict() for p in sorted(
+                    self.decisions.values(),
+                    key=lambda p: p.decision
+                )
+            ],
+            'rules': [p.to_dict() for p in self.rules()],
+        }
+
+
+class ProfilingATNSimulator(ParserATNSimulator):
+    """Parser ATN simulator that records prediction statistics.
+
+    Lookahead depth is measured the same way as the Java runtime, as the
+    number of tokens from the decision start to the last token examined.
+    """
+
+    def __init__(self, parser: Parser, profile: GrammarProfile):
+        """Create a profiling simulator for a parser.
+
+        The simulator shares the DFA cache of the parser class.
+
+        Parameters
+        ----------
+        parser : Parser
+            Generated parser.
+        profile : GrammarProfile
+            Profile to record statistics in.
+        """
+        super().__init__(
+            parser,
+            parser.atn,
+            parser.decisionsToDFA,
+            parser.sharedContextCache
+        )
+        self.profile = profile
+        self._current = None
+        self._sll_stop = -1
+        self._ll_stop = -1
+
+    def adaptivePredict(self, input, decision: int, outerContext) -> int:
+        """Predict an alternative, recording statistics.
+
+        Parameters
+        ----------
+        input : TokenStream
+            Token stream.
+        decision : int
+            Decision number.
+        outerContext : ParserRuleContext
+            Context of the decision.
+
+        Returns
+        -------
+        int
+            Predicted alternative.
+        """
+        current = self._current = self.profile.decision(self.parser, decision)
+        self._sll_stop = -1
+        self._ll_stop = -1
+        start_index = input.index
+        start = time.perf_counter_ns()
+        try:
+            return super().adaptivePredict(input, decision, outerContext)
+        finally:
+            current.time_ns += time.perf_counter_ns() - start
+            current.invocations += 1
+            if self._sll_stop >= 0:
+                k = self._sll_stop - start_index + 1
+                current.sll_lookahead += k
+                current.sll_max_lookahead = max(current.sll_max_lookahead, k)
+            if self._ll_stop >= 0:
+                k = self._ll_stop - start_index + 1
+                current.ll_lookahead += k
+                current.ll_max_lookahead = max(current.ll_max_lookahead, k)
+            self._current = None
+
+    def getExistingTargetState(self, previousD, t: int):
+        """Record SLL lookahead and look up a cached DFA edge."""
+        self._sll_stop = self._input.index
+        return super().getExistingTargetState(previousD, t)
+
+    def computeTargetState(self, dfa, previousD, t: int):
+        """Record a DFA cache miss and compute the DFA edge from the ATN."""
+        self._current.dfa_misses += 1
+        return super().computeTargetState(dfa, previousD, t)
+
+    def computeReachSet(self, closure, t: int, fullCtx: bool):
+        """Record full LL lookahead and compute the reachable ATN states."""
+        if fullCtx:
+            self._ll_stop = self._input.index
+        return super().computeReachSet(closure, t, fullCtx)
+
+    def reportAttemptingFullContext(self, dfa, conflictingAlts, configs,
+                                    startIndex: int, stopIndex: int):
+        """Record a fallback from SLL to full LL prediction."""
+        self._current.ll_fallbacks += 1
+        super().reportAttemptingFullContext(
+            dfa, conflictingAlts, configs, startIndex, stopIndex
+        )
+
+    def reportAmbiguity(self, dfa, D, startIndex: int, stopIndex: int,
+                        exact: bool, ambigAlts, configs):
+        """Record an ambiguity."""
+        self._current.ambiguities += 1
+        super().reportAmbiguity(
+            dfa, D, startIndex, stopIndex, exact, ambigAlts, configs
+        )
+
+
+# Profile that parsers record statistics in, if profiling
+active_profile: Optional[GrammarProfile] = None
+
+
+@contextmanager
+def profile_grammar() -> Iterator[GrammarProfile]:
+    """Profile every ANTLR parse in this process while in the context.
+
+    Yields
+    ------
+    GrammarProfile
+        Profile that statistics are aggregated in.
+    """
+    global active_profile
+    previous = active_profile
+    active_profile = GrammarProfile()
+    try:
+        yield active_profile
+    finally:
+        active_profile = previous
@@ -0,0 +1,374 @@
+"""Compact records of parsed tracelines.
+
+Scoring workloads mostly reduce each syscall to a hashable canonical form, so
+building the full object graph for every traceline is wasted work. The fast
+parser can instead emit encoded nodes, which are nested tuples of a class and
+its constructor arguments. ``TraceLineRecords`` stores the syscall name, pid,
+exit code, and flags of each traceline in typed arrays and deduplicates the
+encoded arguments, so repeated syscalls share a single argument tuple.
+Tracelines are converted back to ``classes`` objects on demand.
+"""
+
+
+# Imports
+from array import array
+from copy import deepcopy
+from typing import (
+    Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+)
+
+from lib.strace import classes
+
+
+# Types
+ENCODED_TRACE_LINE = Tuple[Optional[int], tuple]
+
+
+# Constants
+# Record flags
+UNFINISHED = 1
+RESUMED = 2
+HAS_PID = 4
+HAS_EXIT_CODE = 8
+UNKNOWN_EXIT_CODE = 16
+NODE = 32
+OBJECT = 64
+
+# Exit code that is not a number
+UNKNOWN_EXIT_CODE_VALUE = '?'
+
+
+def encode_node(cls: type, args: tuple, kwargs: Dict[str, Any]) -> tuple:
+    """Encode an object as a hashable node.
+
+    Parameters
+    ----------
+    cls : type
+        Class of the object.
+    args : tuple
+        Positional constructor arguments. Lists must contain encoded nodes.
+    kwargs : Dict[str, Any]
+        Keyword constructor arguments. Lists must contain encoded nodes.
+
+    Returns
+    -------
+    tuple
+        Encoded node ``(cls, args, kwargs)``, with lists converted to tuples
+        and keyword arguments as a tuple of ``(name, value)`` pairs.
+    """
+    return (
+        cls,
+        tuple(tuple(a) if type(a) is list else a for a in args),
+        tuple(
+            (k, tuple(v) if type(v) is list else v)
+            for k, v in kwargs.items()
+        ),
+    )
+
+
+def decode_node(value: Any) -> Any:
+    """Decode an encoded node into a new object.
+
+    Parameters
+    ----------
+    value : Any
+        Encoded node, tuple of encoded nodes, or primitive value.
+
+    Returns
+    -------
+    Any
+        Constructed object, list of objects, or the primitive value.
+    """
+    if type(value) is not tuple:
+        return value
+    if value and isinstance(value[0], type):
+        cls, args, kwargs = value
+        return cls(
+            *[decode_node(a) for a in args],
+            **{k: decode_node(v) for k, v in kwargs}
+        )
+    return [decode_node(v) for v in value]
+
+
+class TraceLineRecords:
+    """Array-backed container of traceline records.
+
+    Syscalls parsed by the fast parser are stored compactly. Their names and
+    encoded arguments are kept in deduplicated tables and referenced by id.
+    Other tracelines are stored as encoded nodes, and tracelines that could
+    only be parsed by ANTLR are stored as objects.
+
+    Indexing or iterating decodes new ``classes.TraceLine`` objects, so
+    modifying them does not change the records.
+    """
+
+    def __init__(self):
+        """Create an empty traceline record container."""
+        self.names: List[str] = []
+        self.values: List[Hashable] = []
+        self.name_ids = array('I')
+        self.value_ids = array('I')
+        self.pids = array('q')
+        self.exit_codes = array('q')
+        self.flags = array('B')
+        self.truncated = False
+        self.skipped: List[dict] = []
+        self._name_ids: Dict[str, int] = {}
+        self._value_ids: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        """Get the number of records.
+
+        Returns
+        -------
+        int
+            Number of records.
+        """
+        return len(self.flags)
+
+    def _name_id(self, name: str) -> int:
+        """Get the id of a name, adding it to the name table if needed.
+
+        Parameters
+        ----------
+        name : str
+            Syscall or traceline class name.
+
+        Returns
+        -------
+        int
+            Name id.
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def _value_id(self, value: Hashable) -> int:
+        """Get the id of an encoded value, adding it if needed.
+
+        Parameters
+        ----------
+        value : Hashable
+            Encoded arguments or traceline node.
+
+        Returns
+        -------
+        int
+            Value id.
+        """
+        value_id = self._value_ids.get(value)
+        if value_id is None:
+            value_id = self._value_ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def _append_record(self,
+                       name: str,
+                       value_id: int,
+                       flags: int,
+                       pid: Optional[int] = None,
+                       exit_code: int = 0):
+        """Append a record.
+
+        Parameters
+        ----------
+        name : str
+            Syscall or traceline class name.
+        value_id : int
+            Id of the encoded arguments, node, or object.
+        flags : int
+            Record flags.
+        pid : Optional[int]
+            Process identifier.
+        exit_code : int
+            Numeric exit code.
+        """
+        if pid is not None:
+            flags |= HAS_PID
+        self.name_ids.append(self._name_id(name))
+        self.value_ids.append(value_id)
+        self.pids.append(0 if pid is None else pid)
+        self.exit_codes.append(exit_code)
+        self.flags.append(flags)
+
+    def append(self, trace_line: Union[classes.TraceLine,
+                                       ENCODED_TRACE_LINE]):
+        """Append a traceline.
+
+        Parameters
+        ----------
+        trace_line : Union[classes.TraceLine, ENCODED_TRACE_LINE]
+            Parsed traceline object, or a pid and encoded traceline node as
+            returned by ``fast_parser.encode_trace_line``.
+        """
+        # Keep objects parsed by ANTLR as they are
+        if isinstance(trace_line, classes.TraceLine):
+            name = getattr(trace_line, 'name', type(trace_line).__name__)
+            self._append_record(name, len(self.values), OBJECT)
+            self.values.append(trace_line)
+            return
+
+        pid, node = trace_line
+        cls, _, kwargs = node
+        if cls is classes.Syscall:
+            kwargs = dict(kwargs)
+            exit_code = kwargs.get('exit_code')
+            flags = (
+                (UNFINISHED if kwargs['unfinished'] else 0)
+                | (RESUMED if kwargs['resumed'] else 0)
+            )
+            if exit_code == UNKNOWN_EXIT_CODE_VALUE:
+                flags |= UNKNOWN_EXIT_CODE
+                exit_code = None
+            elif exit_code is not None:
+                flags |= HAS_EXIT_CODE
+            if exit_code is None or -2 ** 63 <= exit_code < 2 ** 63:
+                self._append_record(
+                    kwargs['name'],
+                    self._value_id(kwargs['arguments']),
+                    flags,
+                    pid,
+                    exit_code or 0
+                )
+                return
+            name = kwargs['name']
+        else:
+            name = cls.__name__
+
+        # Store other tracelines and syscalls with exit codes that do not
+        # fit in the array as whole nodes
+        self._append_record(name, self._value_id(node), NODE, pid)
+
+    def extend(self, trace_lines: Iterable[Union[classes.TraceLine,
+                                                 ENCODED_TRACE_LINE]]):
+        """Append tracelines.
+
+        Parameters
+        ----------
+        trace_lines : Iterable[Union[classes.TraceLine, ENCODED_TRACE_LINE]]
+            Tracelines to append. See ``append``.
+        """
+        for trace_line in trace_lines:
+            self.append(trace_line)
+
+    def name(self, index: int) -> str:
+        """Get the name of a record.
+
+        Parameters
+        ----------
+        index : int
+            Record index.
+
+        Returns
+        -------
+        str
+            Syscall name, or the class name of other tracelines.
+        """
+        return self.names[self.name_ids[index]]
+
+    def key(self, index: int) -> Tuple[int, int]:
+        """Get the canonical key of a record.
+
+        Records with equal keys decode to tracelines with the same name and
+        arguments. Syscalls stored compactly with the same name and arguments
+        always have equal keys, regardless of their pid and exit code.
+
+        Parameters
+        ----------
+        index : int
+            Record index.
+
+        Returns
+        -------
+        Tuple[int, int]
+            Name id and value id.
+        """
+        return self.name_ids[index], self.value_ids[index]
+
+    def keys(self) -> Iterator[Tuple[int, int]]:
+        """Iterate over the canonical keys of all records.
+
+        Yields
+        ------
+        Tuple[int, int]
+            Name id and value id. See ``key``.
+        """
+        return zip(self.name_ids, self.value_ids)
+
+    def __getitem__(self, index: int) -> classes.TraceLine:
+        """Decode a record.
+
+        Parameters
+        ----------
+        index : int
+            Record index.
+
+        Returns
+        -------
+        classes.TraceLine
+            New traceline object.
+        """
+        flags = self.flags[index]
+        value = self.values[self.value_ids[index]]
+
+        if flags & OBJECT:
+            return deepcopy(value)
+        elif flags & NODE:
+            trace_line = decode_node(value)
+        else:
+            if flags & HAS_EXIT_CODE:
+                exit_code = self.exit_codes[index]
+            elif flags & UNKNOWN_EXIT_CODE:
+                exit_code = UNKNOWN_EXIT_CODE_VALUE
+            else:
+                exit_code = None
+            trace_line = classes.Syscall(
+                name=self.name(index),
+                arguments=decode_node(value),
+                unfinished=bool(flags & UNFINISHED),
+                resumed=bool(flags & RESUMED),
+                exit_code=exit_code,
+            )
+
+        if flags & HAS_PID:
+            trace_line.pid = self.pids[index]
+        return trace_line
+
+    def __iter__(self) -> Iterator[classes.TraceLine]:
+        """Decode all records.
+
+        Yields
+        ------
+        classes.TraceLine
+            New traceline object for each record, in order.
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_strace(self, **kwargs) -> classes.Strace:
+        """Decode all records into a strace.
+
+        Parameters
+        ----------
+        **kwargs
+            Additional strace attributes that should be set.
+
+        Returns
+        -------
+        classes.Strace
+            Strace with decoded tracelines. Skipped lines are listed in
+            ``metadata['skipped_lines']``.
+        """
+        strace = classes.Strace(
+            trace_lines=list(self),
+            truncated=self.truncated,
+            **kwargs
+        )
+        if self.skipped:
+            strace.metadata = {
+                **strace.metadata,
+                'skipped_lines': self.skipped,
+            }
+        return strace
@@ -0,0 +1,515 @@
+"""Compact binary serialization of straces.
+
+Straces are stored in the database in a versioned binary format instead of
+as pickles. Unpickling calls ``__setstate__`` once for every object of the
+deep trace object graph, and pickles reference classes by module path, so
+they break when classes move. The binary format instead references classes
+and attributes by name and stores every distinct string and number once.
+
+A serialized strace is a header followed by value tables and a node stream,
+all little endian::
+
+    header      magic, format version, node stream item width, and the
+                number of items in each of the following sections
+    strings     code point length of each string, then all strings as one
+                UTF-8 encoded text
+    ints        signed 64 bit integers
+    big ints    decimal strings of integers outside the 64 bit range
+    floats      64 bit floats
+    schemas     for each trace object schema, the reference of the class
+                name, the number of attributes, and the references of the
+                attribute names
+    nodes       containers and trace objects
+
+Values are referenced by their index in the concatenation of the constants
+``None``, ``False``, and ``True``, the value tables in order, and the nodes.
+A node is a code followed by references to values that precede it, so nodes
+are decoded in a single pass without recursion. Trace object nodes start
+with the code ``NUM_NODE_CODES + schema`` and list one reference per schema
+attribute. Container nodes start with one of the ``NODE_*`` codes and a
+length, except for paths, which have a single reference to their string.
+
+Only strings and numbers, which are immutable, are shared after loading.
+Every container and trace object is written as its own node, so loaded
+objects are independent, as they are when unpickled. Sharing equal trace
+objects is left to ``FlyweightStore``.
+"""
+
+
+# Imports
+from __future__ import annotations
+from array import array
+from itertools import accumulate, chain
+from pathlib import Path, PurePath
+from typing import Any, Callable, Dict, List, Tuple
+import struct
+import sys
+
+from lib.strace import classes, util
+
+
+# Constants
+MAGIC = b'DZST'
+VERSION = 1
+
+# Header layout: magic, version, node stream item width, and the number of
+# strings, bytes of string text, ints, big ints, floats, schemas, and node
+# stream items.
+_HEADER = struct.Struct('<4sBBIIIIIII')
+
+# Node codes
+NODE_LIST = 0
+NODE_TUPLE = 1
+NODE_DICT = 2
+NODE_RESTORABLE_LIST = 3
+NODE_PATH = 4
+NUM_NODE_CODES = 5
+
+# References to constants
+_CONSTANTS = (None, False, True)
+
+# Provisional references used while encoding, which are resolved once the
+# size of each table is known. The high bits hold the table.
+_TABLE_SHIFT = 40
+_TABLE_MASK = (1 << _TABLE_SHIFT) - 1
+_STRING_TABLE = 1
+_INT_TABLE = 2
+_BIG_INT_TABLE = 3
+_FLOAT_TABLE = 4
+_NODE_TABLE = 5
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+# Node stream item widths by array type code
+_WIDTHS = {'H': 2, 'I': 4}
+
+# Strings may contain lone surrogates decoded from raw trace bytes
+_TEXT_ERRORS = 'surrogatepass'
+
+
+class _Encoder:
+    """Encoder of a single strace."""
+
+    def __init__(self):
+        """Create an encoder with empty tables."""
+        self.strings: Dict[str, int] = {}
+        self.ints: Dict[int, int] = {}
+        self.big_ints: Dict[int, int] = {}
+        self.floats: Dict[bytes, int] = {}
+        self.schemas: Dict[Tuple[type, Tuple[str, ...]], int] = {}
+        self.num_nodes = 0
+        self.stream: List[int] = []
+
+    @staticmethod
+    def _table_ref(table: Dict[Any, int], key: Any, index: int) -> int:
+        """Get the provisional reference of a table entry, adding it.
+
+        Parameters
+        ----------
+        table : Dict[Any, int]
+            Table of provisional references by key.
+        key : Any
+            Entry key.
+        index : int
+            Table index, one of the ``_*_TABLE`` constants.
+
+        Returns
+        -------
+        int
+            Provisional reference.
+        """
+        ref = table.get(key)
+        if ref is None:
+            ref = table[key] = (index << _TABLE_SHIFT) + len(table)
+        return ref
+
+    def _node_ref(self, node: Tuple[int, ...]) -> int:
+        """Add a node and get its provisional reference.
+
+        Parameters
+        ----------
+        node : Tuple[int, ...]
+            Node code and references. Equal nodes are written again, since
+            containers and trace objects are mutable.
+
+        Returns
+        -------
+        int
+            Provisional reference.
+        """
+        ref = (_NODE_TABLE << _TABLE_SHIFT) + self.num_nodes
+        self.num_nodes += 1
+        self.stream.extend(node)
+        return ref
+
+    def ref(self, value: Any) -> int:
+        """Encode a value.
+
+        Parameters
+        ----------
+        value : Any
+            Value to encode.
+
+        Returns
+        -------
+        int
+            Provisional reference of the value.
+
+        Raises
+        ------
+        ValueError
+            Raised if the value cannot be serialized.
+        """
+        value_type = type(value)
+        if value_type is str:
+            return self._table_ref(self.strings, value, _STRING_TABLE)
+        if value is None:
+            return 0
+        if value_type is bool:
+            return 2 if value else 1
+        if value_type is int:
+            if _INT64_MIN <= value <= _INT64_MAX:
+                return self._table_ref(self.ints, value, _INT_TABLE)
+            return self._table_ref(self.big_ints, value, _BIG_INT_TABLE)
+        if value_type is float:
+            # Keyed by bits so that 0.0 and -0.0 stay distinct
+            return self._table_ref(
+                self.floats, struct.pack('<d', value), _FLOAT_TABLE
+            )
+
+        # Containers
+        if value_type is list or value_type is tuple:
+            code = NODE_LIST if value_type is list else NODE_TUPLE
+            return self._node_ref(
+                (code, len(value), *map(self.ref, value))
+            )
+        if value_type is classes.RestorableList:
+            return self._node_ref(
+                (NODE_RESTORABLE_LIST, len(value), *map(self.ref, value))
+            )
+        if value_type is dict:
+            return self._node_ref((
+                NODE_DICT,
+                len(value),
+                *map(self.ref, chain.from_iterable(value.items()))
+            ))
+        if isinstance(value, PurePath):
+            return self._node_ref((NODE_PATH, self.ref(str(value))))
+
+        # Trace objects
+        if isinstance(value, classes.DictRepr):
+            # Getting the state first turns lazy straces into plain straces
+            state = value.__getstate__()
+            schema_key = (type(value), tuple(state))
+            schema = self.schemas.get(schema_key)
+            if schema is None:
+                schema = self.schemas[schema_key] = len(self.schemas)
+            return self._node_ref(
+                (NUM_NODE_CODES + schema, *map(self.ref, state.values()))
+            )
+
+        raise ValueError(f'Cannot serialize {value_type.__name__} values.')
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value and the tables it references.
+
+        Parameters
+        ----------
+        value : Any
+            Root value. It must encode to a node.
+
+        Returns
+        -------
+        bytes
+            Serialized value.
+        """
+        self.ref(value)
+
+        # Schemas reference their class and attribute names
+        schema_stream = []
+        for (schema_type, names) in self.schemas:
+            schema_stream.append(self.ref(schema_type.__name__))
+            schema_stream.append(len(names))
+            schema_stream.extend(map(self.ref, names))
+
+        # Resolve provisional references now that table sizes are known
+        sizes = [
+            len(_CONSTANTS),
+            len(self.strings),
+            len(self.ints),
+            len(self.big_ints),
+            len(self.floats),
+        ]
+        offsets = list(accumulate(sizes))
+        limit = 1 << _TABLE_SHIFT
+        stream = [
+            item if item < limit
+            else offsets[(item >> _TABLE_SHIFT) - 1] + (item & _TABLE_MASK)
+            for item in chain(schema_stream, self.stream)
+        ]
+        typecode = 'H' if max(stream, default=0) < 2 ** 16 else 'I'
+
+        strings = list(self.strings)
+        text = ''.join(strings).encode('utf-8', _TEXT_ERRORS)
+        big_ints = [str(v).encode('ascii') for v in self.big_ints]
+        return b''.join([
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                _WIDTHS[typecode],
+                len(strings),
+                len(text),
+                len(self.ints),
+                len(big_ints),
+                len(self.floats),
+                len(self.schemas),
+                len(stream),
+            ),
+            _little_endian(array('I', map(len, strings))),
+            text,
+            _little_endian(array('q', self.ints)),
+            _little_endian(array('I', map(len, big_ints))),
+            *big_ints,
+            *self.floats,
+            _little_endian(array(typecode, stream)),
+        ])
+
+
+def _little_endian(values: array) -> bytes:
+    """Get the little endian bytes of an array.
+
+    Parameters
+    ----------
+    values : array
+        Array of numbers.
+
+    Returns
+    -------
+    bytes
+        Little endian representation.
+    """
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(typecode: str, data: bytes, offset: int,
+                length: int) -> Tuple[List[Any], int]:
+    """Read a little endian array.
+
+    Parameters
+    ----------
+    typecode : str
+        Array type code.
+    data : bytes
+        Serialized data.
+    offset : int
+        Offset of the array in ``data``.
+    length : int
+        Number of array items.
+
+    Returns
+    -------
+    Tuple[List[Any], int]
+        Array items and the offset following the array.
+    """
+    values = array(typecode)
+    end = offset + length * values.itemsize
+    values.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist(), end
+
+
+def _schema_setters(name: str,
+                    attributes: List[str]) -> Tuple[type, List[Callable]]:
+    """Resolve a schema to its class and attribute setters.
+
+    Attributes are set without calling ``__setattr__``, the same way
+    ``DictRepr.__setstate__`` restores them. Attributes listed in
+    ``_interned`` are interned.
+
+    Parameters
+    ----------
+    name : str
+        Class name.
+    attributes : List[str]
+        Attribute names.
+
+    Returns
+    -------
+    Tuple[type, List[Callable]]
+        Class, and a setter taking an object and value for each attribute.
+
+    Raises
+    ------
+    ValueError
+        Raised if the name is not a trace object class.
+    """
+    cls = getattr(classes, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, classes.DictRepr)):
+        raise ValueError(f'Unknown trace object class {name}.')
+
+    interned = getattr(cls, '_interned', ())
+    setters = []
+    for attribute in attributes:
+        descriptor = next(
+            (
+                klass.__dict__[attribute]
+                for klass in cls.__mro__
+                if attribute in klass.__dict__
+            ),
+            None
+        )
+        if hasattr(descriptor, '__set__'):
+            setter = descriptor.__set__
+        else:
+            def setter(obj, value, attribute=attribute):
+                object.__setattr__(obj, attribute, value)
+        if attribute in interned:
+            def setter(obj, value, setter=setter):
+                setter(obj, util.intern(value))
+        setters.append(setter)
+    return cls, setters
+
+
+def is_serialized(data: bytes) -> bool:
+    """Determine if data is a binary serialized strace.
+
+    Parameters
+    ----------
+    data : bytes
+        Stored strace data.
+
+    Returns
+    -------
+    bool
+        True if the data starts with the binary format magic. Pickles never
+        do.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def dumps(strace: classes.Strace) -> bytes:
+    """Serialize an strace.
+
+    Parameters
+    ----------
+    strace : Strace
+        Strace to serialize.
+
+    Returns
+    -------
+    bytes
+        Serialized strace.
+
+    Raises
+    ------
+    ValueError
+        Raised if the strace contains values that cannot be serialized.
+    """
+    return _Encoder().encode(strace)
+
+
+def loads(data: bytes) -> classes.Strace:
+    """Deserialize an strace.
+
+    Parameters
+    ----------
+    data : bytes
+        Serialized strace.
+
+    Returns
+    -------
+    Strace
+        Deserialized strace.
+
+    Raises
+    ------
+    ValueError
+        Raised if the data is not a serialized strace, or was written by a
+        newer format version.
+    """
+    (
+        magic, version, width, num_strings, text_size, num_ints,
+        num_big_ints, num_floats, num_schemas, stream_size
+    ) = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Data is not a serialized strace.')
+    if version > VERSION:
+        raise ValueError(f'Unsupported strace format version {version}.')
+    offset = _HEADER.size
+
+    # Value tables
+    lengths, offset = _read_array('I', data, offset, num_strings)
+    text = data[offset:offset + text_size].decode('utf-8', _TEXT_ERRORS)
+    offset += text_size
+    ends = list(accumulate(lengths))
+    strings = [
+        text[start:end] for start, end in zip(chain((0,), ends), ends)
+    ]
+    ints, offset = _read_array('q', data, offset, num_ints)
+    lengths, offset = _read_array('I', data, offset, num_big_ints)
+    big_ints = []
+    for length in lengths:
+        big_ints.append(int(data[offset:offset + length]))
+        offset += length
+    floats, offset = _read_array('d', data, offset, num_floats)
+    values = [*_CONSTANTS, *strings, *ints, *big_ints, *floats]
+    typecode = next(
+        code for code, size in _WIDTHS.items() if size == width
+    )
+    stream, offset = _read_array(typecode, data, offset, stream_size)
+
+    # Schemas
+    schemas = []
+    position = 0
+    for _ in range(num_schemas):
+        name = values[stream[position]]
+        size = stream[position + 1]
+        names = [
+            values[ref] for ref in stream[position + 2:position + 2 + size]
+        ]
+        cls, setters = _schema_setters(name, names)
+        schemas.append((cls, setters, size))
+        position += 2 + size
+
+    # Nodes. Every node only references values that precede it.
+    new = object.__new__
+    append = values.append
+    while position < stream_size:
+        code = stream[position]
+        if code >= NUM_NODE_CODES:
+            cls, setters, size = schemas[code - NUM_NODE_CODES]
+            position += 1
+            end = position + size
+            obj = new(cls)
+            for setter, ref in zip(setters, stream[position:end]):
+                setter(obj, values[ref])
+            append(obj)
+        elif code == NODE_PATH:
+            append(Path(values[stream[position + 1]]))
+            end = position + 2
+        else:
+            size = stream[position + 1]
+            position += 2
+            if code == NODE_DICT:
+                end = position + 2 * size
+                items = [values[ref] for ref in stream[position:end]]
+                append(dict(zip(items[::2], items[1::2])))
+            else:
+                end = position + size
+                items = [values[ref] for ref in stream[position:end]]
+                if code == NODE_LIST:
+                    append(items)
+                elif code == NODE_TUPLE:
+                    append(tuple(items))
+                else:
+                    append(classes.RestorableList(items))
+        position = end
+
+    strace = values[-1]
+    if not isinstance(strace, classes.Strace):
+        raise ValueError('Data is not a serialized strace.')
+    return strace
@@ -2,7 +2,141 @@
 
 
 # Imports
-from typing import Any
+from collections import deque
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, List
+import gzip
+import lzma
+import sys
+
+
+# Constants
+# Compression formats supported by the collectors and their file suffixes.
+COMPRESSIONS = {'gzip': '.gz', 'xz': '.xz'}
+OPENERS = {'.gz': gzip.open, '.xz': lzma.open}
+
+
+def is_compressed(path: Path) -> bool:
+    """Determine if a trace file is compressed.
+
+    Parameters
+    ----------
+    path : Path
+        Trace file path.
+
+    Returns
+    -------
+    bool
+        True if the file has a compressed suffix.
+    """
+    return Path(path).suffix in OPENERS
+
+
+def open_trace(path: Path, mode: str = 'rb') -> IO:
+    """Open a trace file, decompressing it transparently.
+
+    Compressed files are decompressed as they are read.
+
+    Parameters
+    ----------
+    path : Path
+        Trace file path.
+    mode : str
+        File mode.
+
+    Returns
+    -------
+    IO
+        File object.
+    """
+    return OPENERS.get(Path(path).suffix, open)(path, mode)
+
+
+def find_trace(path: Path) -> Path:
+    """Find a trace file that may have been written compressed.
+
+    Parameters
+    ----------
+    path : Path
+        Uncompressed trace file path.
+
+    Returns
+    -------
+    Path
+        ``path`` if it exists, otherwise the first existing compressed
+        variant. ``path`` is returned if no variant exists.
+    """
+    if path.exists():
+        return path
+    for suffix in OPENERS:
+        compressed = path.with_name(path.name + suffix)
+        if compressed.exists():
+            return compressed
+    return path
+
+
+def glob_traces(directory: Path, pattern: str) -> List[Path]:
+    """Find trace files, including compressed ones.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory to search.
+    pattern : str
+        Glob pattern for uncompressed trace files.
+
+    Returns
+    -------
+    List[Path]
+        Sorted matching trace files.
+    """
+    return sorted(
+        path
+        for suffix in ('', *OPENERS)
+        for path in directory.glob(pattern + suffix)
+    )
+
+
+def trace_stem(path: Path) -> str:
+    """Get the stem of a trace file, ignoring any compressed suffix.
+
+    Parameters
+    ----------
+    path : Path
+        Trace file path.
+
+    Returns
+    -------
+    str
+        File stem.
+    """
+    path = Path(path)
+    if is_compressed(path):
+        path = path.with_suffix('')
+    return path.stem
+
+
+def intern(value: Any) -> Any:
+    """Intern a string.
+
+    Interned strings are shared by every object holding an equal value, which
+    saves memory for values repeated across many straces and makes equality
+    checks in dict and set lookups an identity comparison.
+
+    Parameters
+    ----------
+    value : Any
+        Value to intern. Values that are not strings are returned unchanged.
+
+    Returns
+    -------
+    Any
+        Interned string, or the original value.
+    """
+    if type(value) is str:
+        return sys.intern(value)
+    return value
 
 
 def hashable_arguments_representation(a: Any) -> Any:
@@ -43,3 +177,47 @@ def hashable_arguments_representation(a: Any) -> Any:
         raise Exception(
             f'Cannot create a hashable representation of type {type(a)}'
         )
+
+
+def ordered_imap(executor: Executor,
+                 fn: Callable[[Any], Any],
+                 iterable: Iterable[Any],
+                 window: int) -> Iterator[Any]:
+    """Lazily map a function over an iterable using an executor.
+
+    Unlike ``Executor.map``, items are only submitted as results are consumed,
+    so at most ``window`` results are pending or buffered at a time. Results
+    are yielded in the same order as the input.
+
+    Parameters
+    ----------
+    executor : Executor
+        Executor used to run fn.
+    fn : Callable[[Any], Any]
+        Function to apply to each item. Must be picklable for process pools.
+    iterable : Iterable[Any]
+        Items to map over.
+    window : int
+        Maximum number of submitted but unconsumed items.
+
+    Yields
+    ------
+    Any
+        Result of fn for each item, in input order.
+    """
+    items = iter(iterable)
+    pending = deque()
+
+    # Fill the window
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            break
+
+    # Yield results in order, submitting a new item for each one consumed
+    while pending:
+        result = pending.popleft().result()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            break
+        yield result
@@ -2,12 +2,18 @@
 
 
 # Imports
-from argparse import _SubParsersAction
+from argparse import ArgumentParser, _SubParsersAction
+from pathlib import Path
 from typing import Any
 
 from lib.strace import COLLECTORS
+from lib.strace.parser import ENGINES
+from lib.strace.util import COMPRESSIONS
 from lib.subcommands.strace import (
+    cache_prune,
+    cache_stats,
     find_holes,
+    migrate_serialization,
     parse,
     trace_all,
     trace_argument_holes,
@@ -48,6 +54,22 @@ class Choices(set):
         return item is self.default or super().__contains__(item)
 
 
+def _add_compression_argument(parser: ArgumentParser):
+    """Add the trace file compression argument to a trace parser.
+
+    Parameters
+    ----------
+    parser : ArgumentParser
+        Trace subcommand parser.
+    """
+    parser.add_argument(
+        '--compression',
+        choices=sorted(COMPRESSIONS),
+        help='Compress trace files as they are written. Compressed traces '
+             'are decompressed transparently when parsed.'
+    )
+
+
 def init_argparse_action(action: _SubParsersAction):
     """Initialize the strace argument parser.
 
@@ -56,6 +78,39 @@ def init_argparse_action(action: _SubParsersAction):
     action : _SubParsersAction
         Strace argument parser.
     """
+    # Parse cache
+    cache_parser = action.add_parser(
+        'cache',
+        help='Inspect and manage the parse cache.'
+    )
+    cache_action = cache_parser.add_subparsers(
+        dest='cache',
+        title='Cache',
+        description='Inspect and manage the parse cache.',
+        required=True,
+    )
+    cache_stats_parser = cache_action.add_parser(
+        'stats',
+        help='Report parse cache statistics.'
+    )
+    cache_stats_parser.set_defaults(run=cache_stats.run)
+    cache_prune_parser = cache_action.add_parser(
+        'prune',
+        help='Evict least recently used parse cache entries.'
+    )
+    cache_prune_parser.add_argument(
+        '--max-size',
+        type=float,
+        help='Size in MiB to prune the cache to. Defaults to the maximum '
+             'cache size.'
+    )
+    cache_prune_parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Remove all entries.'
+    )
+    cache_prune_parser.set_defaults(run=cache_prune.run)
+
     # Find holes
     find_holes_parser = action.add_parser(
         'find-holes',
@@ -63,6 +118,13 @@ def init_argparse_action(action: _SubParsersAction):
     )
     find_holes_parser.set_defaults(run=find_holes.run)
 
+    # Migrate serialization
+    migrate_serialization_parser = action.add_parser(
+        'migrate-serialization',
+        help='Convert pickled straces in the database to the binary format.'
+    )
+    migrate_serialization_parser.set_defaults(run=migrate_serialization.run)
+
     # Parse
     parse_parser = action.add_parser(
         'parse',
@@ -75,6 +137,73 @@ def init_argparse_action(action: _SubParsersAction):
         action='store_true',
         help='Remove serialized traces and parse everything clean.'
     )
+    parse_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always parse trace files instead of loading unchanged traces '
+             'from the parse cache.'
+    )
+    parse_parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='antlr',
+        help='Parser engine. `fast` uses a hand-written traceline parser '
+             'that falls back to ANTLR for unsupported lines, `lazy` is '
+             '`fast` with syscall arguments parsed when first used, and '
+             '`verify` runs both and checks that they agree.'
+    )
+    parse_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of processes used to parse trace files. Parsed traces '
+             'are added to the database in the same order as with one '
+             'process.'
+    )
+    parse_parser.add_argument(
+        '--recover',
+        action='store_true',
+        help='Skip lines that cannot be parsed instead of failing the whole '
+             'trace. Skipped lines are recorded in the strace metadata.'
+    )
+    parse_parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of processes used to parse chunks of each large trace '
+             'file.'
+    )
+    parse_parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Parse one traceline at a time instead of building a parse '
+             'tree for each entire file. Reduces peak memory usage.'
+    )
+    parse_parser.add_argument(
+        '--profile-grammar',
+        action='store_true',
+        help='Profile parser decisions with the ANTLR engine and report '
+             'prediction statistics for each grammar decision and rule. '
+             'Disables the parse cache, parallel jobs, and workers.'
+    )
+    parse_parser.add_argument(
+        '--profile-output',
+        type=Path,
+        help='Also write the grammar profile to this JSON file.'
+    )
+    parse_parser.add_argument(
+        '--include',
+        action='append',
+        help='Only keep tracelines for this syscall name or traceline type '
+             '(Syscall, Signal, or ExitStatement). Filtered lines are not '
+             'parsed. May be specified multiple times.'
+    )
+    parse_parser.add_argument(
+        '--exclude',
+        action='append',
+        help='Drop tracelines for this syscall name or traceline type. May '
+             'be specified multiple times.'
+    )
     parse_parser.add_argument(
         '--start-at',
         action='append',
@@ -103,6 +232,7 @@ def init_argparse_action(action: _SubParsersAction):
         help='If specified, all cached raw and parsed strace files will be '
              'deleted before generating new strace files.',
     )
+    _add_compression_argument(trace_all_parser)
     trace_all_parser.set_defaults(run=trace_all.run)
 
     # Trace argument holes
@@ -110,6 +240,7 @@ def init_argparse_action(action: _SubParsersAction):
         'trace-argument-holes',
         help='Generate straces for argument holes.'
     )
+    _add_compression_argument(trace_argument_holes_parser)
     trace_argument_holes_parser.set_defaults(run=trace_argument_holes.run)
 
     # Trace playbook
@@ -138,6 +269,7 @@ def init_argparse_action(action: _SubParsersAction):
         'playbook',
         help='Playbook to trace.',
     )
+    _add_compression_argument(trace_playbook_parser)
     trace_playbook_parser.set_defaults(run=trace_playbook.run)
 
     # Trace debops
@@ -150,6 +282,24 @@ def init_argparse_action(action: _SubParsersAction):
         help='Output directory.',
         default='debops',
     )
+    trace_debops_parser.add_argument(
+        '--live',
+        action='store_true',
+        help='Parse module traces while they are collected and add them to '
+             'the database as each module exits.'
+    )
+    trace_debops_parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='antlr',
+        help='Parser engine for live parsing.'
+    )
+    trace_debops_parser.add_argument(
+        '--recover',
+        action='store_true',
+        help='Skip lines that cannot be parsed when parsing live.'
+    )
+    _add_compression_argument(trace_debops_parser)
     trace_debops_parser.set_defaults(run=trace_debops.run)
 
     # Trace parameter matching
@@ -157,6 +307,7 @@ def init_argparse_action(action: _SubParsersAction):
         'trace-parameter-matching',
         help='Generate straces for parameter matching.'
     )
+    _add_compression_argument(trace_parameter_matching_parser)
     trace_parameter_matching_parser.set_defaults(
         run=trace_parameter_matching.run
     )
@@ -166,4 +317,5 @@ def init_argparse_action(action: _SubParsersAction):
         'trace-untraced',
         help='Trace all untraced executables.'
     )
+    _add_compression_argument(trace_untraced_parser)
     trace_untraced_parser.set_defaults(run=trace_untraced.run)
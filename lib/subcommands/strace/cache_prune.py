@@ -0,0 +1,28 @@
+"""Parser CLI for pruning the parse cache."""
+
+
+# Imports
+from argparse import Namespace
+
+from lib import logger
+from lib.strace.cache import parse_cache
+
+
+def run(argv: Namespace):
+    """Evict least recently used parse cache entries.
+
+    Parameters
+    ----------
+    argv : Namespace
+        Namespace object from argparse. This must have all required arguments
+        and parameters as configured by the CLI entrypoint.
+    """
+    if argv.all:
+        max_size = 0
+    elif argv.max_size is not None:
+        max_size = int(argv.max_size * 2 ** 20)
+    else:
+        max_size = None
+
+    removed = parse_cache.prune(max_size)
+    logger.info(f'Removed {removed} parse cache entries.')
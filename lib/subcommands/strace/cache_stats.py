@@ -0,0 +1,37 @@
+"""Parser CLI for reporting parse cache statistics."""
+
+
+# Imports
+from argparse import Namespace
+from datetime import datetime
+
+from lib import logger
+from lib.strace.cache import parse_cache
+
+
+def run(argv: Namespace):
+    """Report parse cache statistics.
+
+    Parameters
+    ----------
+    argv : Namespace
+        Namespace object from argparse. This must have all required arguments
+        and parameters as configured by the CLI entrypoint.
+    """
+    stats = parse_cache.stats()
+
+    # Format access times
+    for k in ('oldest', 'newest'):
+        if stats[k] is not None:
+            stats[k] = datetime.fromtimestamp(stats[k]).isoformat(sep=' ')
+
+    logger.info(
+        f'\n'
+        f'    Directory: {stats["directory"]}\n'
+        f'    Parser version: {stats["version"]}\n'
+        f'    Entries: {stats["entries"]}\n'
+        f'    Size: {stats["size"] / 2 ** 20:.1f} MiB of '
+        f'{stats["max_size"] / 2 ** 20:.1f} MiB\n'
+        f'    Least recently used: {stats["oldest"]}\n'
+        f'    Most recently used: {stats["newest"]}'
+    )
@@ -0,0 +1,19 @@
+"""Parser CLI for converting pickled straces to the binary format."""
+
+
+# Imports
+from argparse import Namespace
+
+from lib.strace import manager
+
+
+def run(argv: Namespace):
+    """Convert pickled straces in the database to the binary format.
+
+    Parameters
+    ----------
+    argv : Namespace
+        Namespace object from argparse. This must have all required arguments
+        and parameters as configured by the CLI entrypoint.
+    """
+    manager.migrate_serialization()
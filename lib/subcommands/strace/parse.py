@@ -3,8 +3,11 @@
 
 # Imports
 from argparse import Namespace
+from contextlib import ExitStack
+import json
 
-from lib.strace import manager
+from lib import logger
+from lib.strace import manager, profiling
 
 
 def run(argv: Namespace):
@@ -27,11 +30,48 @@ def run(argv: Namespace):
             raise ValueError(f'Invalid start-at value: `{start}`')
         start_at[split[0]] = split[1]
 
+    # Parser options
+    parse_options = {
+        'engine': argv.engine,
+        'stream': argv.stream,
+        'workers': argv.workers,
+        'recover': argv.recover,
+        'include': argv.include,
+        'exclude': argv.exclude,
+        'cache': not argv.no_cache,
+    }
+
+    # Profile the ANTLR parser in this process. Cached results would skip
+    # parsing altogether.
+    jobs = argv.jobs
+    if argv.profile_grammar:
+        parse_options.update(engine='antlr', workers=1, cache=False)
+        jobs = 1
+
     # Clean if requested
     manager.clean(parsed=argv.clean)
 
     # Parse
-    if not argv.collectors:
-        manager.parse(start_at=start_at)
-    else:
-        manager.parse(set(argv.collectors), start_at=start_at)
+    with ExitStack() as stack:
+        if argv.profile_grammar:
+            profile = stack.enter_context(profiling.profile_grammar())
+        if not argv.collectors:
+            manager.parse(
+                start_at=start_at,
+                parse_options=parse_options,
+                jobs=jobs
+            )
+        else:
+            manager.parse(
+                set(argv.collectors),
+                start_at=start_at,
+                parse_options=parse_options,
+                jobs=jobs
+            )
+
+    # Report the grammar profile
+    if argv.profile_grammar:
+        logger.info(profile.report())
+        if argv.profile_output:
+            with open(argv.profile_output, 'w') as fd:
+                json.dump(profile.to_dict(), fd, indent=4)
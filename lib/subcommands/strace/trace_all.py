@@ -17,4 +17,4 @@ def run(argv: Namespace):
         and parameters as configured by the CLI entrypoint.
     """
     manager.clean(raw=argv.clean, parsed=argv.clean)
-    manager.generate_traces()
+    manager.generate_traces(compression=argv.compression)
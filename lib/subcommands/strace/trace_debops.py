@@ -4,7 +4,7 @@
 # Imports
 from argparse import Namespace
 
-from lib.strace.collection import ansible_playbook
+from lib.strace import manager
 
 
 def run(argv: Namespace):
@@ -16,4 +16,9 @@ def run(argv: Namespace):
         Namespace object from argparse. This must have all required arguments
         and parameters as configured by the CLI entrypoint.
     """
-    ansible_playbook.collect_debops(output_dir=argv.output_dir)
+    manager.trace_debops(
+        output_dir=argv.output_dir,
+        live=argv.live,
+        parse_options={'engine': argv.engine, 'recover': argv.recover},
+        compression=argv.compression,
+    )
@@ -26,4 +26,5 @@ def run(argv: Namespace):
         output_dir=argv.output_dir,
         playbook_mount_source=argv.playbook_mount_source,
         env=argv.env,
+        compression=argv.compression,
     )
@@ -16,4 +16,4 @@ def run(argv: Namespace):
         Namespace object from argparse. This must have all required arguments
         and parameters as configured by the CLI entrypoint.
     """
-    manager.trace_untraced()
+    manager.trace_untraced(compression=argv.compression)